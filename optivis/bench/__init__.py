@@ -1,6 +1,7 @@
 from __future__ import unicode_literals, division
 
 import abc
+import copy
 import weakref
 
 import labels
@@ -17,6 +18,56 @@ class AbstractBenchItem(object):
     self.paramList = paramList
     self.pykatObject = pykatObject
     
+  def __deepcopy__(self, memo):
+    """
+    Copy this item, sharing rather than copying its external (e.g. pykat) object.
+    """
+    
+    # the external object belongs to the calling program, so copies refer to the same one
+    memo[id(self.__pykatObject)] = self.__pykatObject
+    
+    item = self.__class__.__new__(self.__class__)
+    memo[id(self)] = item
+    
+    for key, value in self.__dict__.iteritems():
+      item.__dict__[key] = copy.deepcopy(value, memo)
+    
+    return item
+  
+  def fork(self):
+    """
+    Get a copy of this item with its own copies of its labels, sharing its parameter list
+    and external object. Subclasses set the rest of their attributes on the copy: their
+    own copies of the state which is changed by layouts, and this item's values of the
+    rest, which are shared rather than copied. Subclasses which add attributes must set
+    them on the copy too.
+    """
+    
+    item = self.__class__.__new__(self.__class__)
+    
+    # not changed by layouts, so shared
+    item.paramList = self.paramList
+    item.__pykatObject = self.__pykatObject
+    
+    # labels are moved by label placement, but their text and content are shared
+    item.labels = [copy.copy(label) for label in self.__labels]
+    
+    return item
+  
+  def getItemState(self):
+    """
+    Get the state of this item to pickle, as part of subclasses' state. The external
+    object is not kept, as it belongs to the calling program and is often a weak
+    reference, which can't be pickled.
+    """
+    
+    return (self.__labels, self.paramList)
+  
+  def setItemState(self, state):
+    # labels already refer to this item
+    (self.__labels, self.paramList) = state
+    self.__pykatObject = None
+  
   @abc.abstractmethod
   def getLabelOrigin(self):
     pass
@@ -13,7 +13,17 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
   
   svgDir = os.path.join(os.path.dirname(__file__), '..', 'assets')
   
-  def __init__(self, filename, size, inputNodes, outputNodes, azimuth=0, aoi=0, name=None, position=None, tooltip=None, *args, **kwargs):
+  # definitions of the nodes of every component of the class, as tuples of
+  # nodes.NodeDefinition
+  inputNodeDefinitions = ()
+  outputNodeDefinitions = ()
+  
+  def __init__(self, filename, size, inputNodes=None, outputNodes=None, azimuth=0, aoi=0, name=None, position=None, tooltip=None, *args, **kwargs):
+    """
+    inputNodes and outputNodes are lists of the component's nodes, by default bound to
+    the class's node definitions
+    """
+    
     if name is None:
       # empty name
       name = ''
@@ -21,6 +31,16 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if position is None:
       position = optivis.geometry.Coordinates(0, 0)
     
+    if inputNodes is None:
+      inputNodes = [nodes.InputNode.bind(definition, self) for definition in self.inputNodeDefinitions]
+    
+    if outputNodes is None:
+      outputNodes = [nodes.OutputNode.bind(definition, self) for definition in self.outputNodeDefinitions]
+    
+    # geometry is kept in the component's own attributes until it is added to a store
+    self.__store = None
+    self.__storeIndex = None
+    
     self.name = name
     self.filename = filename
     self.size = size
@@ -43,33 +63,210 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     return self.size
     
   def __eq__(self, other):
-    return self.__dict__ == other.__dict__
+    if self is other:
+      return True
+    
+    if not isinstance(other, AbstractComponent):
+      return False
+    
+    return self.getComparedState() == other.getComparedState()
+  
+  def __ne__(self, other):
+    return not self.__eq__(other)
+  
+  def getComparedState(self):
+    """
+    Get the state components are compared by: their attributes and geometry, without
+    cached geometry or where the geometry is kept (by the component, or in a store).
+    """
+    
+    state = dict((key, value) for key, value in self.__dict__.iteritems() if key not in ('_AbstractComponent__rotation', '_AbstractComponent__boundingBox', '_AbstractComponent__nodePlacements', '_AbstractComponent__store', '_AbstractComponent__storeIndex', '_AbstractComponent__size', '_AbstractComponent__azimuth', '_AbstractComponent__aoi', '_AbstractComponent__position'))
+    state['geometry'] = (self.size, self.azimuth, self.aoi, self.position)
+    
+    return state
+  
+  def fork(self, store=None):
+    """
+    Get a copy of this component, with its own nodes (sharing their definitions), labels
+    and geometry, sharing everything else (e.g. its name) with this component. If this
+    component is in a store and store is a fork of it (see ComponentStore.fork()), the
+    copy's geometry is kept in store at this component's index, otherwise by the copy.
+    """
+    
+    component = super(AbstractComponent, self).fork()
+    
+    # not changed by layouts, so shared
+    (component.__name, component.__filename, component.tooltip) = (self.__name, self.__filename, self.tooltip)
+    (component.__inputNodeIndices, component.__outputNodeIndices) = (self.__inputNodeIndices, self.__outputNodeIndices)
+    
+    # the nodes have the same definitions, so the node indices are still valid
+    component.__inputNodes = [node.__class__.bind(node.definition, component) for node in self.__inputNodes]
+    component.__outputNodes = [node.__class__.bind(node.definition, component) for node in self.__outputNodes]
+    
+    if self.__store is not None and store is not None:
+      store.addFork(component, self.__storeIndex)
+    else:
+      (component.__store, component.__storeIndex) = (None, None)
+      (component.__size, component.__azimuth, component.__aoi, component.__position) = (self.size, self.azimuth, self.aoi, self.position)
+      
+      component.invalidateTransform()
+    
+    return component
+  
+  def __getstate__(self):
+    """
+    Get compact state for pickling. Nodes are bound to their definitions again and cached
+    geometry is made again when unpickled. External objects, and tooltips which aren't
+    strings (e.g. functions), are not kept.
+    """
+    
+    if self.__store is not None:
+      geometry = (self.__store, self.__storeIndex)
+    else:
+      geometry = (self.__size, self.__azimuth, self.__aoi, self.__position)
+    
+    if isinstance(self.tooltip, basestring):
+      tooltip = self.tooltip
+    else:
+      tooltip = None
+    
+    return (self.__name, self.__filename, tuple(node.definition for node in self.__inputNodes), tuple(node.definition for node in self.__outputNodes), tooltip, geometry, self.getItemState())
+  
+  def __setstate__(self, state):
+    (name, filename, inputNodeDefinitions, outputNodeDefinitions, tooltip, geometry, itemState) = state
+    
+    self.__name = name
+    self.__filename = filename
+    self.__inputNodes = [nodes.InputNode.bind(definition, self) for definition in inputNodeDefinitions]
+    self.__inputNodeIndices = getDefinitionIndices(inputNodeDefinitions)
+    self.__outputNodes = [nodes.OutputNode.bind(definition, self) for definition in outputNodeDefinitions]
+    self.__outputNodeIndices = getDefinitionIndices(outputNodeDefinitions)
+    self.tooltip = tooltip
+    
+    # the store may not be unpickled yet, so its values aren't read here
+    if len(geometry) == 2:
+      (self.__store, self.__storeIndex) = geometry
+      (self.__size, self.__azimuth, self.__aoi, self.__position) = (None, None, None, None)
+    else:
+      (self.__store, self.__storeIndex) = (None, None)
+      (self.__size, self.__azimuth, self.__aoi, self.__position) = geometry
+    
+    self.invalidateTransform()
+    
+    self.setItemState(itemState)
   
   def getBoundingBox(self):
-    # get nominal corner positions
-    topLeft = self.size * optivis.geometry.Coordinates(-0.5, -0.5)
-    topRight = self.size * optivis.geometry.Coordinates(0.5, -0.5)
-    bottomLeft = self.size * optivis.geometry.Coordinates(-0.5, 0.5)
-    bottomRight = self.size * optivis.geometry.Coordinates(0.5, 0.5)
+    if self.__boundingBox is None:
+      (cos, sin) = self.getRotation()
+      
+      # nominal corner positions, rotated by azimuth
+      corners = [(x * cos - y * sin, x * sin + y * cos) for x, y in ((-self.size.x / 2, -self.size.y / 2), (self.size.x / 2, -self.size.y / 2), (-self.size.x / 2, self.size.y / 2), (self.size.x / 2, self.size.y / 2))]
+      
+      # find min and max coordinates
+      xPositions = [x for x, y in corners]
+      yPositions = [y for x, y in corners]
+      
+      # add global position
+      self.__boundingBox = (min(xPositions) + self.position.x, min(yPositions) + self.position.y, max(xPositions) + self.position.x, max(yPositions) + self.position.y)
+    
+    # new coordinates each time, as callers may change them
+    return optivis.geometry.Coordinates(self.__boundingBox[0], self.__boundingBox[1]), optivis.geometry.Coordinates(self.__boundingBox[2], self.__boundingBox[3])
+  
+  def invalidateTransform(self):
+    """
+    Forget the cached rotation, bounding box and node positions and azimuths, which
+    depend on the component's position, azimuth, size and angle of incidence. This is
+    called when they are set, so positions and sizes should be replaced rather than
+    changed in place.
+    """
+    
+    self.__rotation = None
+    self.__boundingBox = None
+    
+    # made when a node is first placed
+    self.__nodePlacements = None
+  
+  def getRotation(self):
+    """
+    Get (cosine, sine) of the azimuth.
+    """
+    
+    if self.__rotation is None:
+      azimuth = math.radians(self.azimuth)
+      
+      self.__rotation = (math.cos(azimuth), math.sin(azimuth))
+    
+    return self.__rotation
+  
+  @property
+  def store(self):
+    """
+    Store (see optivis.store) holding the component's position, azimuth, angle of
+    incidence and size, or None if they are held by the component.
+    """
+    
+    return self.__store
+  
+  @property
+  def storeIndex(self):
+    return self.__storeIndex
+  
+  def attachStore(self, store, index):
+    """
+    Keep geometry in store at index, where it has already been written. Called by
+    ComponentStore.add().
+    """
+    
+    self.__store = store
+    self.__storeIndex = index
+    
+    self.__size = None
+    self.__azimuth = None
+    self.__aoi = None
+    self.__position = None
+    
+    self.invalidateTransform()
+  
+  def detachStore(self):
+    """
+    Keep geometry in the component again. Called by ComponentStore.remove().
+    """
+    
+    (size, azimuth, aoi, position) = (self.size, self.azimuth, self.aoi, self.position)
+    
+    self.__store = None
+    self.__storeIndex = None
+    
+    self.__size = size
+    self.__azimuth = azimuth
+    self.__aoi = aoi
+    self.__position = position
+    
+    self.invalidateTransform()
+  
+  def getNodePlacement(self, definition):
+    """
+    Get ((x, y) relative to the component's centre, (x, y) absolute position, absolute
+    azimuth) of the node with the specified definition.
+    """
+    
+    if self.__nodePlacements is None:
+      self.__nodePlacements = {}
+    elif definition in self.__nodePlacements:
+      return self.__nodePlacements[definition]
     
-    # rotate corners by azimuth
-    topLeft = topLeft.rotate(self.azimuth)
-    topRight = topRight.rotate(self.azimuth)
-    bottomLeft = bottomLeft.rotate(self.azimuth)
-    bottomRight = bottomRight.rotate(self.azimuth)
+    (cos, sin) = self.getRotation()
     
-    # find min and max coordinates    
-    xPositions = [topLeft.x, topRight.x, bottomLeft.x, bottomRight.x]
-    yPositions = [topLeft.y, topRight.y, bottomLeft.y, bottomRight.y]
+    x = definition.position.x * self.size.x
+    y = definition.position.y * self.size.y
     
-    minPos = optivis.geometry.Coordinates(min(xPositions), min(yPositions))
-    maxPos = optivis.geometry.Coordinates(max(xPositions), max(yPositions))
+    (relativeX, relativeY) = (x * cos - y * sin, x * sin + y * cos)
     
-    # add global position
-    minPos = minPos.translate(self.position)
-    maxPos = maxPos.translate(self.position)
+    placement = ((relativeX, relativeY), (self.position.x + relativeX, self.position.y + relativeY), self.azimuth + (definition.aoiMultiplier * self.aoi + definition.aoiOffset))
     
-    return minPos, maxPos
+    self.__nodePlacements[definition] = placement
+    
+    return placement
   
   @property
   def name(self):
@@ -95,6 +292,9 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     
   @property
   def size(self):
+    if self.__store is not None:
+      return optivis.geometry.Coordinates(float(self.__store.width[self.__storeIndex]), float(self.__store.height[self.__storeIndex]))
+    
     return self.__size
   
   @size.setter
@@ -107,7 +307,13 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if size.x < 0 or size.y < 0:
       raise Exception('Size dimensions must be positive')
     
-    self.__size = size
+    if self.__store is not None:
+      self.__store.width[self.__storeIndex] = size.x
+      self.__store.height[self.__storeIndex] = size.y
+    else:
+      self.__size = size
+    
+    self.invalidateTransform()
   
   @property
   def inputNodes(self):
@@ -116,6 +322,7 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
   @inputNodes.setter
   def inputNodes(self, inputNodes):
     self.__inputNodes = inputNodes
+    self.__inputNodeIndices = getNodeIndices(inputNodes)
   
   @property
   def outputNodes(self):
@@ -124,9 +331,13 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
   @outputNodes.setter
   def outputNodes(self, outputNodes):
     self.__outputNodes = outputNodes
+    self.__outputNodeIndices = getNodeIndices(outputNodes)
     
   @property
   def azimuth(self):
+    if self.__store is not None:
+      return float(self.__store.azimuth[self.__storeIndex])
+    
     return self.__azimuth
   
   @azimuth.setter
@@ -134,10 +345,18 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     azimuth = float(azimuth) % 360
     
-    self.__azimuth = azimuth
+    if self.__store is not None:
+      self.__store.azimuth[self.__storeIndex] = azimuth
+    else:
+      self.__azimuth = azimuth
+    
+    self.invalidateTransform()
   
   @property
   def aoi(self):
+    if self.__store is not None:
+      return float(self.__store.aoi[self.__storeIndex])
+    
     return self.__aoi
   
   @aoi.setter
@@ -145,10 +364,18 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
     aoi = float(aoi) % 360
     
-    self.__aoi = aoi
+    if self.__store is not None:
+      self.__store.aoi[self.__storeIndex] = aoi
+    else:
+      self.__aoi = aoi
+    
+    self.invalidateTransform()
     
   @property
   def position(self):
+    if self.__store is not None:
+      return optivis.geometry.Coordinates(float(self.__store.x[self.__storeIndex]), float(self.__store.y[self.__storeIndex]))
+    
     return self.__position
   
   @position.setter
@@ -156,45 +383,176 @@ class AbstractComponent(optivis.bench.AbstractBenchItem):
     if not isinstance(position, optivis.geometry.Coordinates):
       raise Exception('Specified position is not of type optivis.geometry.Coordinates')
     
-    self.__position = position
+    if self.__store is not None:
+      self.__store.x[self.__storeIndex] = position.x
+      self.__store.y[self.__storeIndex] = position.y
+    else:
+      self.__position = position
+    
+    self.invalidateTransform()
   
   def getInputNode(self, nodeName):
-    for node in self.inputNodes:
-      if node.name == nodeName:
-	return node
-    
-    raise Exception('No input node with name {0} found'.format(nodeName))
+    return self.getInputNodes([nodeName])[0]
   
   def getOutputNode(self, nodeName):
-    for node in self.outputNodes:
-      if node.name == nodeName:
-	return node
-    
-    raise Exception('No output node with name {0} found'.format(nodeName))
+    return self.getOutputNodes([nodeName])[0]
+  
+  def getInputNodes(self, nodeNames):
+    """
+    Get list of input nodes with the specified names.
+    """
+    
+    found = findNodes(self.inputNodes, self.__inputNodeIndices, nodeNames)
+    
+    if found is None:
+      # the node list or node names may have been changed in place, so look again
+      self.__inputNodeIndices = getNodeIndices(self.inputNodes)
+      
+      checkNodeNames(self, 'input', self.__inputNodeIndices, nodeNames)
+      
+      found = findNodes(self.inputNodes, self.__inputNodeIndices, nodeNames)
+    
+    return found
+  
+  def getOutputNodes(self, nodeNames):
+    """
+    Get list of output nodes with the specified names.
+    """
+    
+    found = findNodes(self.outputNodes, self.__outputNodeIndices, nodeNames)
+    
+    if found is None:
+      # the node list or node names may have been changed in place, so look again
+      self.__outputNodeIndices = getNodeIndices(self.outputNodes)
+      
+      checkNodeNames(self, 'output', self.__outputNodeIndices, nodeNames)
+      
+      found = findNodes(self.outputNodes, self.__outputNodeIndices, nodeNames)
+    
+    return found
   
   def getAoiForConstrainedNodeAngle(self, node1, node2, angle):
-    return (angle - node1.aoiOffset - node2.aoiOffset) / (node1.aoiMultiplier - node2.aoiMultiplier)
+    """
+    Get angle of incidence which makes the absolute azimuth of node1 minus that of node2
+    equal to angle. Where there is more than one, the one nearest the current angle of
+    incidence is used.
+    """
+    
+    return getConstrainedAoi(node1, node2, angle, self.aoi)
   
   def __str__(self):
     return self.name
 
+# node indices by name, shared by node lists with the same definitions
+nodeIndexCache = {}
+
+# maximum number of node lists remembered
+nodeIndexCacheSize = 1000
+
+def getNodeIndices(nodes):
+  """
+  Get dict of the indices of nodes in the list by name. If nodes share a name, the
+  first is used. Components of the same class have nodes with the same definitions, so
+  they share one dict.
+  """
+  
+  return getDefinitionIndices(tuple(node.definition for node in nodes))
+
+def getDefinitionIndices(definitions):
+  """
+  Get dict of the indices of the nodes with the tuple of definitions by name.
+  """
+  
+  try:
+    return nodeIndexCache[definitions]
+  except KeyError:
+    pass
+  
+  nodeIndices = {}
+  
+  for index, definition in enumerate(definitions):
+    nodeIndices.setdefault(definition.name, index)
+  
+  if len(nodeIndexCache) >= nodeIndexCacheSize:
+    nodeIndexCache.clear()
+  
+  nodeIndexCache[definitions] = nodeIndices
+  
+  return nodeIndices
+
+def findNodes(nodes, nodeIndices, nodeNames):
+  """
+  Get list of the nodes with the specified names, or None if the indices don't match
+  the nodes.
+  """
+  
+  found = []
+  
+  for nodeName in nodeNames:
+    index = nodeIndices.get(nodeName)
+    
+    if index is None or index >= len(nodes) or nodes[index].name != nodeName:
+      return None
+    
+    found.append(nodes[index])
+  
+  return found
+
+def getConstrainedAoi(node1, node2, angle, aoi):
+  """
+  Solve angle = (m1 - m2) * aoi + o1 - o2 (mod 360) for aoi, where m and o are the aoi
+  multipliers and offsets of the nodes, returning the solution nearest to the specified
+  aoi.
+  """
+  
+  coefficient = node1.aoiMultiplier - node2.aoiMultiplier
+  constant = node1.aoiOffset - node2.aoiOffset
+  
+  if coefficient == 0:
+    # the angle between the nodes doesn't depend on the angle of incidence
+    if abs((angle - constant + 180) % 360 - 180) > 1e-9:
+      raise Exception('Angle between nodes {0} and {1} is always {2} degrees, so cannot be constrained to {3} degrees'.format(node1, node2, constant % 360, angle))
+    
+    return aoi
+  
+  # solutions are spaced by 360 / |coefficient|
+  solution = (angle - constant) / coefficient
+  period = 360 / abs(coefficient)
+  
+  return solution + period * math.floor((aoi - solution) / period + 0.5)
+
+def checkNodeNames(component, nodeType, nodeIndices, nodeNames):
+  missing = [nodeName for nodeName in nodeNames if nodeName not in nodeIndices]
+  
+  if len(missing) > 0:
+    # components are often unnamed, so fall back to the type of component
+    componentName = component.name if len(component.name) > 0 else component.__class__.__name__
+    
+    raise Exception('No {0} node with name {1} found on component {2}. Valid names: {3}'.format(nodeType, ', '.join(unicode(nodeName) for nodeName in missing), componentName, ', '.join(sorted(nodeIndices.keys()))))
+
 class Source(AbstractComponent):
   __metaclass__ = abc.ABCMeta
   
-  def __init__(self, outputNode, *args, **kwargs):
-    inputNodes = []
-    outputNodes = [outputNode]
+  def __init__(self, outputNode=None, *args, **kwargs):
+    """
+    outputNode is the source's node, by default bound to the class's node definition
+    """
+    
+    if outputNode is not None:
+      kwargs['outputNodes'] = [outputNode]
     
-    super(Source, self).__init__(inputNodes=inputNodes, outputNodes=outputNodes, *args, **kwargs)
+    super(Source, self).__init__(inputNodes=[], *args, **kwargs)
     
 class Laser(Source):
+  outputNodeDefinitions = (
+    nodes.NodeDefinition(name="out", position=optivis.geometry.Coordinates(0.5, 0)),
+  )
+  
   def __init__(self, *args, **kwargs):
     filename = "c-laser1.svg"
     size = optivis.geometry.Coordinates(62, 46)
     
-    outputNode = nodes.OutputNode(name="out", component=self, position=optivis.geometry.Coordinates(0.5, 0))
-    
-    super(Laser, self).__init__(filename=filename, size=size, outputNode=outputNode, *args, **kwargs)
+    super(Laser, self).__init__(filename=filename, size=size, *args, **kwargs)
 
 class Mirror(AbstractComponent):
   __metaclass__ = abc.ABCMeta
@@ -203,100 +561,100 @@ class Mirror(AbstractComponent):
     super(Mirror, self).__init__(*args, **kwargs)
 
 class CavityMirror(Mirror):
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0)),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
+  )
+  
   def __init__(self, *args, **kwargs):
     filename = "b-cav-mir.svg"
     size = optivis.geometry.Coordinates(11, 29)
     
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.InputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0)),
-      nodes.OutputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
-    ]
-    
-    super(CavityMirror, self).__init__(filename=filename, size=size, inputNodes=inputNodes, outputNodes=outputNodes, *args, **kwargs)
+    super(CavityMirror, self).__init__(filename=filename, size=size, *args, **kwargs)
 
 class SteeringMirror(Mirror):
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0)),
+  )
+  
   def __init__(self, *args, **kwargs):
     filename = "b-mir.svg"
     size = optivis.geometry.Coordinates(11, 29)
     
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0))
-    ]
-    
-    super(SteeringMirror, self).__init__(filename=filename, size=size, inputNodes=inputNodes, outputNodes=outputNodes, *args, **kwargs)
+    super(SteeringMirror, self).__init__(filename=filename, size=size, *args, **kwargs)
 
 class BeamSplitter(Mirror):
+  inputNodeDefinitions = (
+    nodes.NodeDefinition(name="frA", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="frB", position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
+    nodes.NodeDefinition(name="bkA", position=optivis.geometry.Coordinates(-0.5, 0)),
+    nodes.NodeDefinition(name="bkB", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
+  )
+  
+  outputNodeDefinitions = (
+    nodes.NodeDefinition(name="frA", position=optivis.geometry.Coordinates(0.5, 0)),
+    nodes.NodeDefinition(name="frB", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
+    nodes.NodeDefinition(name="bkA", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bkB", position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
+  )
+  
   def __init__(self, aoi=45, *args, **kwargs):
     filename = "b-bsp.svg"
     size = optivis.geometry.Coordinates(11, 29)
     
-    inputNodes = [
-      nodes.InputNode(name="frA", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.InputNode(name="frB", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
-      nodes.InputNode(name="bkA", component=self, position=optivis.geometry.Coordinates(-0.5, 0)),
-      nodes.InputNode(name="bkB", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
-    ]
-    
-    outputNodes = [
-      nodes.OutputNode(name="frA", component=self, position=optivis.geometry.Coordinates(0.5, 0)),
-      nodes.OutputNode(name="frB", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
-      nodes.OutputNode(name="bkA", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.OutputNode(name="bkB", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
-    ]
-    
-    super(BeamSplitter, self).__init__(filename=filename, size=size, inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(BeamSplitter, self).__init__(filename=filename, size=size, aoi=aoi, *args, **kwargs)
 
 class BeamSplitterCube(Mirror):
+  inputNodeDefinitions = (
+    nodes.NodeDefinition(name="frA", position=optivis.geometry.Coordinates(0, -0.5), aoiOffset=90),
+    nodes.NodeDefinition(name="frB", position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
+    nodes.NodeDefinition(name="bkA", position=optivis.geometry.Coordinates(-0.5, 0)),
+    nodes.NodeDefinition(name="bkB", position=optivis.geometry.Coordinates(0, 0.5), aoiOffset=270)
+  )
+  
+  outputNodeDefinitions = (
+    nodes.NodeDefinition(name="frA", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
+    nodes.NodeDefinition(name="frB", position=optivis.geometry.Coordinates(0, -0.5), aoiMultiplier=-1, aoiOffset=270),
+    nodes.NodeDefinition(name="bkA", position=optivis.geometry.Coordinates(0, 0.5), aoiMultiplier=-1, aoiOffset=90),
+    nodes.NodeDefinition(name="bkB", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180)
+  )
+  
   def __init__(self, aoi=0, *args, **kwargs):
     filename = "b-bspcube.svg"
     size = optivis.geometry.Coordinates(23, 23)
     
-    inputNodes = [
-      nodes.InputNode(name="frA", component=self, position=optivis.geometry.Coordinates(0, -0.5), aoiOffset=90),
-      nodes.InputNode(name="frB", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
-      nodes.InputNode(name="bkA", component=self, position=optivis.geometry.Coordinates(-0.5, 0)),
-      nodes.InputNode(name="bkB", component=self, position=optivis.geometry.Coordinates(0, 0.5), aoiOffset=270)
-    ]
-    
-    outputNodes = [
-      nodes.OutputNode(name="frA", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
-      nodes.OutputNode(name="frB", component=self, position=optivis.geometry.Coordinates(0, -0.5), aoiMultiplier=-1, aoiOffset=270),
-      nodes.OutputNode(name="bkA", component=self, position=optivis.geometry.Coordinates(0, 0.5), aoiMultiplier=-1, aoiOffset=90),
-      nodes.OutputNode(name="bkB", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180)
-    ]
-    
-    super(BeamSplitterCube, self).__init__(filename=filename, size=size, inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(BeamSplitterCube, self).__init__(filename=filename, size=size, aoi=aoi, *args, **kwargs)
 
 class Lens(AbstractComponent):
   __metaclass__ = abc.ABCMeta
   
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0)),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
+  )
+  
   def __init__(self, aoi, *args, **kwargs):
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.InputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0)),
-      nodes.OutputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
-    ]
-    
-    super(Lens, self).__init__(inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(Lens, self).__init__(aoi=aoi, *args, **kwargs)
 
 class ConvexLens(Lens):
   def __init__(self, aoi=0, *args, **kwargs):
@@ -315,20 +673,20 @@ class ConcaveLens(Lens):
 class Plate(AbstractComponent):
   __metaclass__ = abc.ABCMeta
   
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0)),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
+  )
+  
   def __init__(self, aoi, *args, **kwargs):
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.InputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0)),
-      nodes.OutputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
-    ]
-    
-    super(Plate, self).__init__(inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(Plate, self).__init__(aoi=aoi, *args, **kwargs)
 
 class QuarterWavePlate(Plate):
   def __init__(self, aoi=0, *args, **kwargs):
@@ -347,20 +705,20 @@ class HalfWavePlate(Plate):
 class Modulator(AbstractComponent):
   __metaclass__ = abc.ABCMeta
   
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(0.5, 0)),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
+  )
+  
   def __init__(self, aoi, *args, **kwargs):
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.InputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(0.5, 0)),
-      nodes.OutputNode(name="bk", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiOffset=180)
-    ]
-    
-    super(Modulator, self).__init__(inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(Modulator, self).__init__(aoi=aoi, *args, **kwargs)
     
 class ElectroopticModulator(Modulator):
   def __init__(self, aoi=0, *args, **kwargs):
@@ -378,57 +736,65 @@ class AcoustoopticModulator(Modulator):
 
 class FaradayIsolator(AbstractComponent):
   #FIXME: flip the inputs/outputs so that the front is pointing right by default
+  inputNodeDefinitions = (
+    # input node azimuth defined WRT input light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(-0.5, 0)),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
+    nodes.NodeDefinition(name="frPoA", position=optivis.geometry.Coordinates(-0.35, -0.1), aoiOffset=90),
+    nodes.NodeDefinition(name="frPoB", position=optivis.geometry.Coordinates(-0.35, 0.1), aoiMultiplier=-1, aoiOffset=90),
+    nodes.NodeDefinition(name="bkPoA", position=optivis.geometry.Coordinates(0.35, -0.1), aoiMultiplier=-1, aoiOffset=-90),
+    nodes.NodeDefinition(name="bkPoB", position=optivis.geometry.Coordinates(0.35, 0.1), aoiOffset=-90)
+  )
+  
+  outputNodeDefinitions = (
+    # output node azimuth defined WRT output light direction
+    nodes.NodeDefinition(name="fr", position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180),
+    nodes.NodeDefinition(name="bk", position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
+    nodes.NodeDefinition(name="frPoA", position=optivis.geometry.Coordinates(-0.35, -0.1), aoiMultiplier=-1, aoiOffset=90),
+    nodes.NodeDefinition(name="frPoB", position=optivis.geometry.Coordinates(-0.35, 0.1), aoiOffset=270),
+    nodes.NodeDefinition(name="bkPoA", position=optivis.geometry.Coordinates(0.35, -0.1), aoiOffset=270),
+    nodes.NodeDefinition(name="bkPoB", position=optivis.geometry.Coordinates(0.35, 0.1), aoiMultiplier=-1, aoiOffset=90)
+  )
+  
   def __init__(self, aoi=0, *args, **kwargs):
     filename = "c-isolator.svg"
     size = optivis.geometry.Coordinates(52, 23)
     
-    inputNodes = [
-      # input node azimuth defined WRT input light direction
-      nodes.InputNode(name="fr", component=self, position=optivis.geometry.Coordinates(-0.5, 0)),
-      nodes.InputNode(name="bk", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiOffset=180),
-      nodes.InputNode(name="frPoA", component=self, position=optivis.geometry.Coordinates(-0.35, -0.1), aoiOffset=90),
-      nodes.InputNode(name="frPoB", component=self, position=optivis.geometry.Coordinates(-0.35, 0.1), aoiMultiplier=-1, aoiOffset=90),
-      nodes.InputNode(name="bkPoA", component=self, position=optivis.geometry.Coordinates(0.35, -0.1), aoiMultiplier=-1, aoiOffset=-90),
-      nodes.InputNode(name="bkPoB", component=self, position=optivis.geometry.Coordinates(0.35, 0.1), aoiOffset=-90)
-    ]
-    
-    outputNodes = [
-      # output node azimuth defined WRT output light direction
-      nodes.OutputNode(name="fr", component=self, position=optivis.geometry.Coordinates(-0.5, 0), aoiMultiplier=-1, aoiOffset=180),
-      nodes.OutputNode(name="bk", component=self, position=optivis.geometry.Coordinates(0.5, 0), aoiMultiplier=-1),
-      nodes.OutputNode(name="frPoA", component=self, position=optivis.geometry.Coordinates(-0.35, -0.1), aoiMultiplier=-1, aoiOffset=90),
-      nodes.OutputNode(name="frPoB", component=self, position=optivis.geometry.Coordinates(-0.35, 0.1), aoiOffset=270),
-      nodes.OutputNode(name="bkPoA", component=self, position=optivis.geometry.Coordinates(0.35, -0.1), aoiOffset=270),
-      nodes.OutputNode(name="bkPoB", component=self, position=optivis.geometry.Coordinates(0.35, 0.1), aoiMultiplier=-1, aoiOffset=90)
-    ]
-    
-    super(FaradayIsolator, self).__init__(filename=filename, size=size, inputNodes=inputNodes, outputNodes=outputNodes, aoi=aoi, *args, **kwargs)
+    super(FaradayIsolator, self).__init__(filename=filename, size=size, aoi=aoi, *args, **kwargs)
 
 class Sink(AbstractComponent):
   __metaclass__ = abc.ABCMeta
   
-  def __init__(self, inputNode, *args, **kwargs):    
-    outputNodes = []
-    inputNodes = [inputNode]
+  def __init__(self, inputNode=None, *args, **kwargs):
+    """
+    inputNode is the sink's node, by default bound to the class's node definition
+    """
     
-    super(Sink, self).__init__(inputNodes=inputNodes, outputNodes=outputNodes, *args, **kwargs)
+    if inputNode is not None:
+      kwargs['inputNodes'] = [inputNode]
+    
+    super(Sink, self).__init__(outputNodes=[], *args, **kwargs)
  
 class Photodiode(Sink):
   # FIXME: make the input point left by default
+  inputNodeDefinitions = (
+    nodes.NodeDefinition(name="in", position=optivis.geometry.Coordinates(-0.5, 0)),
+  )
+  
   def __init__(self, *args, **kwargs):
     filename = "e-pd1.svg"
     size = optivis.geometry.Coordinates(16, 23)
     
-    inputNode = nodes.InputNode(name="in", component=self, position=optivis.geometry.Coordinates(-0.5, 0))
-    
-    super(Photodiode, self).__init__(filename=filename, size=size, inputNode=inputNode, *args, **kwargs)
+    super(Photodiode, self).__init__(filename=filename, size=size, *args, **kwargs)
     
 class Dump(Sink):
   # FIXME: make the input point left by default
+  inputNodeDefinitions = (
+    nodes.NodeDefinition(name="in", position=optivis.geometry.Coordinates(-0.5, 0)),
+  )
+  
   def __init__(self, *args, **kwargs):
     filename = "b-dump.svg"
     size = optivis.geometry.Coordinates(22, 33)
     
-    inputNode = nodes.InputNode(name="in", component=self, position=optivis.geometry.Coordinates(-0.5, 0))
-    
-    super(Dump, self).__init__(filename=filename, size=size, inputNode=inputNode, *args, **kwargs)
\ No newline at end of file
+    super(Dump, self).__init__(filename=filename, size=size, *args, **kwargs)
\ No newline at end of file
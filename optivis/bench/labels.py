@@ -40,6 +40,19 @@ class Label(AbstractLabel):
   def __str__(self):
     return "\"{0}\"".format(self.text)
 
+  def __getstate__(self):
+    return (self.__text, self.__position, self.__item, self.__azimuth, self.__offset, self.content)
+
+  def __setstate__(self, state):
+    (self.__text, self.__position, self.__item, self.__azimuth, self.__offset, self.content) = state
+
+  def __copy__(self):
+    # faster than copying by pickling protocol, as many labels are copied when forking scenes
+    label = self.__class__.__new__(self.__class__)
+    label.__setstate__(self.__getstate__())
+
+    return label
+
   @property
   def text(self):
     return self.__text
@@ -95,3 +108,63 @@ class Label(AbstractLabel):
       raise Exception('Specified offset is not of type Coordinates')
 
     self.__offset = offset
+
+  def getText(self, labelFlags=None):
+    """
+    Get text to draw, including the content enabled in labelFlags, one item per line.
+    """
+
+    content = []
+
+    if labelFlags is not None:
+      for kv in self.content.items():
+        if labelFlags.get(kv[0], False):
+          # label is turned on
+          content.append("{0} = {1}".format(kv[0], kv[1]))
+
+    return self.text + "\n" + "\n".join(content)
+
+  def getAzimuth(self):
+    """
+    Get absolute azimuth of the label text.
+    """
+
+    return self.item.getLabelAzimuth() + self.azimuth
+
+  def getPosition(self, size, offset=None):
+    """
+    Get position of the top left corner of text of the specified size, drawn with the
+    specified offset (or the label's own offset if None).
+    """
+
+    if offset is None:
+      offset = self.offset
+
+    # get nominal position
+    position = self.item.getLabelOrigin()
+
+    # translate to user-defined position
+    position = position.translate((self.position * self.item.getSize()).rotate(self.item.getLabelAzimuth()))
+
+    # move label such that the text is y-centered
+    position = position.translate(optivis.geometry.Coordinates(0, size.y / 2).flip().rotate(self.getAzimuth()))
+
+    # add offset
+    return position.translate(offset.rotate(self.item.getLabelAzimuth()))
+
+  def getBoundingBox(self, size, offset=None):
+    """
+    Get (lower, upper) bounds of text of the specified size, drawn with the specified
+    offset (or the label's own offset if None).
+    """
+
+    position = self.getPosition(size, offset)
+    azimuth = self.getAzimuth()
+
+    # text is rotated about its top left corner
+    corners = [position + optivis.geometry.Coordinates(x, y).rotate(azimuth) for x, y in ((0, 0), (size.x, 0), (0, size.y), (size.x, size.y))]
+
+    lowerBound = optivis.geometry.Coordinates(min(corner.x for corner in corners), min(corner.y for corner in corners))
+    upperBound = optivis.geometry.Coordinates(max(corner.x for corner in corners), max(corner.y for corner in corners))
+
+    return (lowerBound, upperBound)
@@ -0,0 +1,352 @@
+"""
+Component classes defined by descriptor files rather than Python code.
+
+A descriptor is a JSON file describing one component class:
+
+  {
+    "name": "PeriscopeMirror",
+    "base": "Mirror",
+    "asset": "periscope.svg",
+    "size": [11, 29],
+    "aoi": 45,
+    "inputNodes": [
+      {"name": "fr", "position": [0.5, 0], "aoiMultiplier": -1, "aoiOffset": 180}
+    ],
+    "outputNodes": [
+      {"name": "fr", "position": [0.5, 0]}
+    ]
+  }
+
+"base" (the name of an abstract class in optivis.bench.components to subclass, e.g.
+Mirror), "aoi" (the default angle of incidence) and the node lists are optional, as are
+each node's "aoiMultiplier" and "aoiOffset". Without a node list, the class has its base's
+nodes of that kind, or none if it has no base. The asset is looked for next to the
+descriptor, then in the built in assets directory.
+
+load() registers the classes described by every descriptor in a directory. Parsed
+descriptors are kept in an index file in the directory, so descriptors are only read
+again when they change. Registered classes are added to optivis.bench.components, so
+they are used in the same way as the built in components, and scenes containing them can
+be saved and loaded.
+"""
+
+from __future__ import unicode_literals, division
+
+import os
+import abc
+import json
+import marshal
+import threading
+from collections import OrderedDict
+
+import optivis.geometry
+import components
+import nodes
+
+# extension of descriptor files
+DESCRIPTOR_EXTENSION = '.json'
+
+# name of the index of parsed descriptors kept in each directory
+INDEX_FILENAME = '.optivis-library'
+
+# version of the index format, changed whenever parsed descriptors change
+INDEX_VERSION = 2
+
+class LibraryComponent(components.AbstractComponent):
+  """
+  Base of the component classes created from descriptors.
+  """
+
+  __metaclass__ = abc.ABCMeta
+
+  # asset filename and size, and default angle of incidence, of every component of the
+  # class
+  assetFilename = None
+  assetSize = None
+  defaultAoi = 0
+
+  # path of the descriptor the class was created from
+  descriptorPath = None
+
+  def __init__(self, aoi=None, *args, **kwargs):
+    if aoi is None:
+      aoi = self.defaultAoi
+
+    super(LibraryComponent, self).__init__(filename=self.assetFilename, size=self.assetSize, aoi=aoi, *args, **kwargs)
+
+def parseDescriptor(path):
+  """
+  Read descriptor file, returning it as a dict of basic types which can be stored in the
+  index. Raises an exception if the descriptor is invalid.
+  """
+
+  with open(path, 'r') as f:
+    try:
+      data = json.load(f)
+    except ValueError as e:
+      raise Exception('Component descriptor {0} is not valid JSON: {1}'.format(path, e))
+
+  if not isinstance(data, dict):
+    raise Exception('Component descriptor {0} is not a JSON object'.format(path))
+
+  for key in ('name', 'asset', 'size'):
+    if key not in data:
+      raise Exception('Component descriptor {0} has no {1}'.format(path, key))
+
+  if not isinstance(data['name'], basestring) or not isIdentifier(data['name']):
+    raise Exception('Component descriptor {0} name is not a valid class name'.format(path))
+
+  if not isinstance(data['asset'], basestring):
+    raise Exception('Component descriptor {0} asset is not a string'.format(path))
+
+  descriptor = {
+    'name': data['name'],
+    'base': data.get('base', None),
+    'asset': data['asset'],
+    'size': parsePair(path, 'size', data['size']),
+    'aoi': parseNumber(path, 'aoi', data.get('aoi', 0)),
+    'inputNodes': parseNodes(path, 'inputNodes', data.get('inputNodes', None)),
+    'outputNodes': parseNodes(path, 'outputNodes', data.get('outputNodes', None))
+  }
+
+  if descriptor['base'] is not None and not isinstance(descriptor['base'], basestring):
+    raise Exception('Component descriptor {0} base is not a string'.format(path))
+
+  return descriptor
+
+def parseNodes(path, key, data):
+  if data is None:
+    # not specified, so taken from the base class
+    return None
+
+  if not isinstance(data, list):
+    raise Exception('Component descriptor {0} {1} is not a list'.format(path, key))
+
+  parsedNodes = []
+
+  for node in data:
+    if not isinstance(node, dict) or not isinstance(node.get('name', None), basestring) or 'position' not in node:
+      raise Exception('Component descriptor {0} {1} must each have a name and position'.format(path, key))
+
+    parsedNodes.append((node['name'], parsePair(path, key, node['position']), parseNumber(path, key, node.get('aoiMultiplier', 1)), parseNumber(path, key, node.get('aoiOffset', 0))))
+
+  return tuple(parsedNodes)
+
+def parsePair(path, key, value):
+  if not isinstance(value, list) or len(value) != 2:
+    raise Exception('Component descriptor {0} {1} is not a pair of numbers'.format(path, key))
+
+  return tuple(parseNumber(path, key, number) for number in value)
+
+def parseNumber(path, key, value):
+  if isinstance(value, bool) or not isinstance(value, (int, long, float)):
+    raise Exception('Component descriptor {0} {1} is not a number'.format(path, key))
+
+  return value
+
+def isIdentifier(name):
+  return len(name) > 0 and not name[0].isdigit() and all(character.isalnum() or character == '_' for character in name) and all(ord(character) < 128 for character in name)
+
+def getNodeDefinitions(descriptorNodes):
+  return tuple(nodes.NodeDefinition(name=name, position=optivis.geometry.Coordinates(*position), aoiMultiplier=aoiMultiplier, aoiOffset=aoiOffset) for name, position, aoiMultiplier, aoiOffset in descriptorNodes)
+
+class ComponentLibrary(object):
+  def __init__(self, module=components):
+    """
+    module is the module to add registered classes to, or None to not add them to one
+    """
+
+    self.module = module
+
+    # registered component classes by name, in registration order
+    self.componentClasses = OrderedDict()
+
+    # directories can be loaded from several threads at once
+    self.lock = threading.Lock()
+
+  def createClass(self, descriptor, path):
+    """
+    Create component class from a parsed descriptor.
+    """
+
+    baseClasses = (LibraryComponent,)
+
+    if descriptor['base'] is not None:
+      base = getattr(components, descriptor['base'], None)
+
+      # concrete classes set their own asset and size, so only abstract ones (e.g. Mirror)
+      # can be subclassed
+      if not isinstance(base, type) or not issubclass(base, components.AbstractComponent) or '__metaclass__' not in vars(base):
+        raise Exception('Component descriptor {0} base {1} is not an abstract component class'.format(path, descriptor['base']))
+
+      if not issubclass(LibraryComponent, base):
+        baseClasses += (base,)
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    # assets next to the descriptor take precedence over the built in ones
+    if os.path.isfile(os.path.join(directory, descriptor['asset'])):
+      svgDir = directory
+    else:
+      svgDir = components.AbstractComponent.svgDir
+
+    attributes = {
+      '__module__': self.module.__name__ if self.module is not None else __name__,
+      '__doc__': 'Component described by {0}.'.format(path),
+      'assetFilename': descriptor['asset'],
+      'assetSize': optivis.geometry.Coordinates(*descriptor['size']),
+      'defaultAoi': descriptor['aoi'],
+      'descriptorPath': path,
+      'svgDir': svgDir
+    }
+
+    # nodes not in the descriptor are inherited
+    if descriptor['inputNodes'] is not None:
+      attributes['inputNodeDefinitions'] = getNodeDefinitions(descriptor['inputNodes'])
+
+    if descriptor['outputNodes'] is not None:
+      attributes['outputNodeDefinitions'] = getNodeDefinitions(descriptor['outputNodes'])
+
+    return type(str(descriptor['name']), baseClasses, attributes)
+
+  def register(self, componentClass):
+    """
+    Register a component class created from a descriptor, replacing any registered class
+    with the same name. Returns the class.
+    """
+
+    if not isinstance(componentClass, type) or not issubclass(componentClass, LibraryComponent):
+      raise Exception('Specified component class is not of type LibraryComponent')
+
+    name = componentClass.__name__
+
+    if self.module is not None:
+      existing = getattr(self.module, name, None)
+
+      # don't hide the built in components
+      if existing is not None and name not in self.componentClasses:
+        raise Exception('Component class {0} is already defined in {1}'.format(name, self.module.__name__))
+
+      setattr(self.module, name, componentClass)
+
+    self.componentClasses[name] = componentClass
+
+    return componentClass
+
+  def unregister(self, name):
+    if name not in self.componentClasses:
+      raise Exception('No component class with name {0} is registered'.format(name))
+
+    del(self.componentClasses[name])
+
+    if self.module is not None:
+      delattr(self.module, name)
+
+  def getComponentClass(self, name):
+    if name not in self.componentClasses:
+      raise Exception('No component class with name {0} is registered. Registered component classes: {1}'.format(name, ', '.join(self.componentClasses.keys())))
+
+    return self.componentClasses[name]
+
+  def getComponentClasses(self):
+    return self.componentClasses.values()
+
+  def getDescriptors(self, directory, indexPath=None):
+    """
+    Get list of (path, descriptor) for the descriptors in directory, in filename order,
+    from the index where they haven't changed since it was written. Descriptors which
+    can't be parsed are skipped.
+    """
+
+    if indexPath is None:
+      indexPath = os.path.join(directory, INDEX_FILENAME)
+
+    index = readIndex(indexPath)
+    newIndex = {}
+
+    descriptors = []
+
+    for filename in sorted(os.listdir(directory)):
+      if os.path.splitext(filename)[1].lower() != DESCRIPTOR_EXTENSION:
+        continue
+
+      path = os.path.join(directory, filename)
+      stat = os.stat(path)
+
+      # descriptors are read again if they have been changed
+      key = (stat.st_mtime, stat.st_size)
+
+      if filename in index and index[filename][0] == key:
+        descriptor = index[filename][1]
+      else:
+        try:
+          descriptor = parseDescriptor(path)
+        except Exception as e:
+          print "[Library] Could not load component descriptor {0}: {1}".format(path, e)
+
+          continue
+
+      newIndex[filename] = (key, descriptor)
+      descriptors.append((path, descriptor))
+
+    if newIndex != index:
+      writeIndex(indexPath, newIndex)
+
+    return descriptors
+
+  def load(self, directory, indexPath=None):
+    """
+    Register the component classes described by the descriptors in directory. indexPath
+    is the path of the index of parsed descriptors, by default in the directory.
+
+    Returns list of the registered classes.
+    """
+
+    with self.lock:
+      componentClasses = []
+
+      for path, descriptor in self.getDescriptors(directory, indexPath):
+        # a broken descriptor shouldn't stop the others being used
+        try:
+          componentClasses.append(self.register(self.createClass(descriptor, path)))
+        except Exception as e:
+          print "[Library] Could not load component descriptor {0}: {1}".format(path, e)
+
+      return componentClasses
+
+def readIndex(indexPath):
+  """
+  Get dict of (key, descriptor) by descriptor filename from the index, or an empty dict
+  if it doesn't exist or can't be read.
+  """
+
+  try:
+    with open(indexPath, 'rb') as f:
+      (version, index) = marshal.load(f)
+  except (IOError, EOFError, ValueError, TypeError):
+    return {}
+
+  if version != INDEX_VERSION or not isinstance(index, dict):
+    return {}
+
+  return index
+
+def writeIndex(indexPath, index):
+  # the library can still be used without an index, e.g. in a read only directory
+  try:
+    with open(indexPath, 'wb') as f:
+      marshal.dump((INDEX_VERSION, index), f)
+  except IOError as e:
+    print "[Library] Could not write component index {0}: {1}".format(indexPath, e)
+
+# library used by the built in component module
+library = ComponentLibrary()
+
+def load(directory, indexPath=None):
+  return library.load(directory, indexPath)
+
+def getComponentClass(name):
+  return library.getComponentClass(name)
+
+def getComponentClasses():
+  return library.getComponentClasses()
@@ -30,8 +30,9 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
     self.end = end
     self.specs = specs
 
-    # check we've not linked one component to itself
-    if self.outputNode.component == self.inputNode.component:
+    # check we've not linked one component to itself (by identity, as comparing components
+    # compares all of their attributes)
+    if self.outputNode.component is self.inputNode.component:
       raise Exception('Cannot link component directly to itself')
     
     super(AbstractLink, self).__init__(*args, **kwargs)
@@ -39,6 +40,36 @@ class AbstractLink(optivis.bench.AbstractBenchItem):
   def __str__(self):
     return "{0} --> {1}".format(self.outputNode, self.inputNode)
   
+  def fork(self, outputComponent, inputComponent):
+    """
+    Get a copy of this link between the specified forks of its components, with its own
+    length and ends, sharing its specs.
+    """
+    
+    link = super(AbstractLink, self).fork()
+    
+    link.__outputNode = nodes.getForkedNode(self.__outputNode, outputComponent)
+    link.__inputNode = nodes.getForkedNode(self.__inputNode, inputComponent)
+    
+    (link.__length, link.__start, link.__end) = (self.__length, self.__start, self.__end)
+    
+    # not changed by layouts, so shared
+    link.__specs = self.__specs
+    
+    return link
+  
+  def __getstate__(self):
+    """
+    Get compact state for pickling, without the external object.
+    """
+    
+    return (self.__outputNode, self.__inputNode, self.__length, self.__start, self.__end, self.__specs, self.getItemState())
+  
+  def __setstate__(self, state):
+    (self.__outputNode, self.__inputNode, self.__length, self.__start, self.__end, self.__specs, itemState) = state
+    
+    self.setItemState(itemState)
+  
   def getLabelOrigin(self):
     return self.start + (self.end - self.start) / 2
   
@@ -178,6 +209,12 @@ class LinkSpec(object):
     self.endMarkerColor = endMarkerColor
 
     super(LinkSpec, self).__init__(*args, **kwargs)
+  
+  def __getstate__(self):
+    return (self.width, self.color, self.pattern, self.offset, self.startMarker, self.endMarker, self.startMarkerRadius, self.endMarkerRadius, self.startMarkerColor, self.endMarkerColor)
+  
+  def __setstate__(self, state):
+    LinkSpec.__init__(self, *state)
     
   @property
   def width(self):
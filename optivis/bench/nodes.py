@@ -1,13 +1,82 @@
 from __future__ import unicode_literals, division
 
 import abc
+import copy
 
 import optivis.geometry
 import components
 
+class NodeDefinition(object):
+  """
+  Name, position and angle of incidence parameters of a node. These are the same for
+  every component of a class, so components of a class share one definition of each of
+  their nodes, and their nodes refer to it. Definitions are immutable; the position
+  should not be changed in place.
+  """
+  
+  __slots__ = ('__name', '__position', '__aoiMultiplier', '__aoiOffset')
+  
+  def __init__(self, name, position, aoiMultiplier=1, aoiOffset=0):
+    """
+    position is normalised to the component's dimensions (i.e. usually between -0.5 and 0.5)
+    
+    aoiMultiplier is the constant to multiply the component angle of incidence by
+    aoiOffset is the offset to add to the component angle of incidence
+    """
+    
+    if not isinstance(position, optivis.geometry.Coordinates):
+      raise Exception('Specified position is not of type optivis.geometry.Coordinates')
+    
+    self.__name = name
+    self.__position = position
+    self.__aoiMultiplier = aoiMultiplier
+    self.__aoiOffset = aoiOffset
+  
+  @property
+  def name(self):
+    return self.__name
+  
+  @property
+  def position(self):
+    return self.__position
+  
+  @property
+  def aoiMultiplier(self):
+    return self.__aoiMultiplier
+  
+  @property
+  def aoiOffset(self):
+    return self.__aoiOffset
+  
+  def replace(self, **kwargs):
+    """
+    Get a copy of this definition with the specified parameters changed.
+    """
+    
+    parameters = dict(name=self.name, position=self.position, aoiMultiplier=self.aoiMultiplier, aoiOffset=self.aoiOffset)
+    parameters.update(kwargs)
+    
+    return NodeDefinition(**parameters)
+  
+  def __copy__(self):
+    # immutable, so can be shared
+    return self
+  
+  def __deepcopy__(self, memo):
+    return self
+  
+  def __reduce__(self):
+    return (NodeDefinition, (self.name, self.position, self.aoiMultiplier, self.aoiOffset))
+
 class Node(object):
+  """
+  Node of a particular component, made of the node's definition and the component.
+  """
+  
   __metaclass__ = abc.ABCMeta
   
+  __slots__ = ('__definition', '__component')
+  
   def __init__(self, name, component, position, aoiMultiplier=1, aoiOffset=0):
     """
     position is normalised to the component's dimensions (i.e. usually between -0.5 and 0.5)
@@ -16,11 +85,44 @@ class Node(object):
     aoiOffset is the offset to add to the component angle of incidence
     """
     
-    self.name = name
+    self.__definition = NodeDefinition(name=name, position=position, aoiMultiplier=aoiMultiplier, aoiOffset=aoiOffset)
     self.component = component
-    self.position = position
-    self.aoiMultiplier = aoiMultiplier
-    self.aoiOffset = aoiOffset
+  
+  @classmethod
+  def bind(cls, definition, component):
+    """
+    Create node of the specified component from a shared definition. This is used by
+    components to create their nodes, so the component is not checked.
+    """
+    
+    node = cls.__new__(cls)
+    node.__definition = definition
+    node.__component = component
+    
+    return node
+  
+  @property
+  def definition(self):
+    return self.__definition
+  
+  def __deepcopy__(self, memo):
+    component = copy.deepcopy(self.__component, memo)
+    
+    # copying the component copies its nodes, which may include this one
+    if id(self) not in memo:
+      memo[id(self)] = self.__class__.bind(self.__definition, component)
+    
+    return memo[id(self)]
+  
+  def __reduce__(self):
+    # components bind their nodes to their definitions again when unpickled, so their
+    # nodes are pickled as references to them
+    location = findComponentNode(self)
+    
+    if location is not None:
+      return (getComponentNode, (self.__component,) + location)
+    
+    return (bindNode, (self.__class__, self.__definition, self.__component))
   
   def getNodeAzimuth(self):
     aoi = self.component.aoi
@@ -29,11 +131,12 @@ class Node(object):
   
   @property
   def name(self):
-    return self.__name
+    return self.__definition.name
   
   @name.setter
   def name(self, name):
-    self.__name = name
+    # definitions are shared, so replace rather than change this node's definition
+    self.__definition = self.__definition.replace(name=name)
     
   @property
   def component(self):
@@ -48,30 +151,27 @@ class Node(object):
     
   @property
   def position(self):
-    return self.__position
+    return self.__definition.position
   
   @position.setter
   def position(self, position):
-    if not isinstance(position, optivis.geometry.Coordinates):
-      raise Exception('Specified position is not of type optivis.geometry.Coordinates')
-    
-    self.__position = position
+    self.__definition = self.__definition.replace(position=position)
   
   @property
   def aoiMultiplier(self):
-    return self.__aoiMultiplier
+    return self.__definition.aoiMultiplier
   
   @aoiMultiplier.setter
   def aoiMultiplier(self, aoiMultiplier):
-    self.__aoiMultiplier = aoiMultiplier
+    self.__definition = self.__definition.replace(aoiMultiplier=aoiMultiplier)
     
   @property
   def aoiOffset(self):
-    return self.__aoiOffset
+    return self.__definition.aoiOffset
   
   @aoiOffset.setter
   def aoiOffset(self, aoiOffset):
-    self.__aoiOffset = aoiOffset
+    self.__definition = self.__definition.replace(aoiOffset=aoiOffset)
 
   @abc.abstractmethod
   def __str__(self):
@@ -82,17 +182,18 @@ class Node(object):
     Get position of node with respect to component's center
     """
     
-    return (self.position * self.component.size).rotate(self.component.azimuth)
+    # the component caches positions until it is moved, rotated or resized
+    return optivis.geometry.Coordinates(*self.component.getNodePlacement(self.__definition)[0])
   
   def getAbsolutePosition(self):
     """
     Return position of node taking account of node's component's position
     """
     
-    return self.component.position.translate(self.getRelativePosition())
+    return optivis.geometry.Coordinates(*self.component.getNodePlacement(self.__definition)[1])
   
   def getAbsoluteAzimuth(self):
-    return self.component.azimuth + self.getNodeAzimuth()
+    return self.component.getNodePlacement(self.__definition)[2]
   
   def setAbsolutePosition(self, nodeAbsolutePosition):
     """
@@ -110,6 +211,8 @@ class Node(object):
     self.component.azimuth = absoluteAzimuth - self.getNodeAzimuth()
 
 class InputNode(Node):
+  __slots__ = ()
+  
   def __init__(self, *args, **kwargs):
     super(InputNode, self).__init__(*args, **kwargs)
 
@@ -117,8 +220,50 @@ class InputNode(Node):
     return "{0}<-{1}".format(self.component, self.name)
 
 class OutputNode(Node):
+  __slots__ = ()
+  
   def __init__(self, *args, **kwargs):
     super(OutputNode, self).__init__(*args, **kwargs)
 
   def __str__(self):
-    return "{0}->{1}".format(self.component, self.name)
\ No newline at end of file
+    return "{0}->{1}".format(self.component, self.name)
+
+def findComponentNode(node):
+  """
+  Get (whether the node is an input, index) of node in its component's nodes, or None if
+  it is not one of them.
+  """
+  
+  component = node.component
+  
+  for isInput, componentNodes in ((True, component.inputNodes), (False, component.outputNodes)):
+    # nodes don't define equality, so are compared by identity
+    if node in componentNodes:
+      return (isInput, componentNodes.index(node))
+  
+  return None
+
+def getForkedNode(node, component):
+  """
+  Get the node of component, a fork of node's component, which corresponds to node.
+  """
+  
+  location = findComponentNode(node)
+  
+  if location is None:
+    return bindNode(node.__class__, node.definition, component)
+  
+  return getComponentNode(component, *location)
+
+def getComponentNode(component, isInput, index):
+  """
+  Get the input or output node of component at index. Used to unpickle nodes.
+  """
+  
+  if isInput:
+    return component.inputNodes[index]
+  
+  return component.outputNodes[index]
+
+def bindNode(nodeClass, definition, component):
+  return nodeClass.bind(definition, component)
@@ -1,8 +1,12 @@
 from __future__ import unicode_literals, division
 
+import copy
+import pickle
+
 from unittest import TestCase
 import optivis.scene
 import optivis.geometry
+import optivis.store
 import components
 import links
 
@@ -59,6 +63,161 @@ class TestComponentAttributes(TestCase):
     self.assertRaises(Exception, setattr, self.componentA, 'position', [5, 5])
     self.assertRaises(Exception, setattr, self.componentA, 'position', (5, 5))
     self.assertRaises(Exception, setattr, self.componentA, 'position', '(5, 5)')
+      
+  def test_equality(self):
+    # another component with the same attributes
+    componentB = components.Laser.__new__(components.Laser)
+    componentB.__dict__.update(self.componentA.__dict__)
+    
+    # cached geometry, and geometry kept in a store, don't make components different
+    componentB.getBoundingBox()
+    optivis.store.ComponentStore().add(componentB)
+    
+    self.assertEqual(componentB, self.componentA)
+    self.assertFalse(componentB != self.componentA)
+    
+    componentB.aoi = 10
+    
+    self.assertNotEqual(componentB, self.componentA)
+    self.assertNotEqual(self.componentA, None)
+
+class TestComponentNodes(TestCase):
+  def setUp(self):
+    self.componentA = components.BeamSplitter(name="BS")
+  
+  def test_get_node(self):
+    node = self.componentA.getInputNode('frA')
+    
+    self.assertIn(node, self.componentA.inputNodes)
+    self.assertEqual(node.name, 'frA')
+    self.assertIs(self.componentA.getOutputNode('bkB'), [node for node in self.componentA.outputNodes if node.name == 'bkB'][0])
+  
+  def test_get_nodes(self):
+    nodes = self.componentA.getInputNodes(['frA', 'bkB'])
+    
+    self.assertEqual([node.name for node in nodes], ['frA', 'bkB'])
+    self.assertEqual(self.componentA.getOutputNodes([]), [])
+  
+  def test_invalid_node_names(self):
+    with self.assertRaises(Exception) as context:
+      self.componentA.getInputNodes(['frA', 'fr', 'bk'])
+    
+    # one error naming all of the missing nodes and listing the valid ones
+    message = unicode(context.exception)
+    
+    self.assertIn('fr, bk', message)
+    self.assertIn('bkA, bkB, frA, frB', message)
+    
+    self.assertRaises(Exception, self.componentA.getOutputNode, 'in')
+  
+  def test_set_nodes(self):
+    laser = components.Laser()
+    
+    self.componentA.outputNodes = laser.outputNodes
+    
+    self.assertIs(self.componentA.getOutputNode('out'), laser.outputNodes[0])
+    self.assertRaises(Exception, self.componentA.getOutputNode, 'frA')
+  
+  def test_nodes_changed_in_place(self):
+    laser = components.Laser()
+    
+    self.componentA.outputNodes.append(laser.outputNodes[0])
+    
+    self.assertIs(self.componentA.getOutputNode('out'), laser.outputNodes[0])
+  
+  def test_node_renamed(self):
+    self.componentA.getInputNode('frA').name = 'frC'
+    
+    self.assertEqual(self.componentA.getInputNode('frC').name, 'frC')
+    self.assertRaises(Exception, self.componentA.getInputNode, 'frA')
+
+class TestNodeDefinitions(TestCase):
+  def setUp(self):
+    self.componentA = components.BeamSplitter(name="BS1")
+    self.componentB = components.BeamSplitter(name="BS2")
+  
+  def test_shared_definitions(self):
+    for nodeA, nodeB in zip(self.componentA.inputNodes, self.componentB.inputNodes):
+      self.assertIs(nodeA.definition, nodeB.definition)
+      self.assertIsNot(nodeA, nodeB)
+    
+    self.assertIs(self.componentA.getOutputNode('frB').component, self.componentA)
+    self.assertIs(self.componentB.getOutputNode('frB').component, self.componentB)
+  
+  def test_change_node(self):
+    # changing a node doesn't change the nodes of other components of the class
+    self.componentA.getInputNode('frA').position = optivis.geometry.Coordinates(0.25, 0)
+    self.componentA.getInputNode('frA').aoiOffset = 90
+    
+    self.assertEqual(self.componentA.getInputNode('frA').position, optivis.geometry.Coordinates(0.25, 0))
+    self.assertEqual(self.componentA.getInputNode('frA').aoiOffset, 90)
+    self.assertEqual(self.componentB.getInputNode('frA').position, optivis.geometry.Coordinates(0.5, 0))
+    self.assertEqual(self.componentB.getInputNode('frA').aoiOffset, 180)
+    self.assertEqual(components.BeamSplitter.inputNodeDefinitions[0].position, optivis.geometry.Coordinates(0.5, 0))
+  
+  def test_deepcopy(self):
+    componentCopy = copy.deepcopy(self.componentA)
+    
+    for node in componentCopy.inputNodes + componentCopy.outputNodes:
+      self.assertIs(node.component, componentCopy)
+    
+    self.assertIs(componentCopy.getInputNode('frA').definition, self.componentA.getInputNode('frA').definition)
+  
+  def test_pickle(self):
+    for protocol in (0, pickle.HIGHEST_PROTOCOL):
+      (componentA, componentB) = pickle.loads(pickle.dumps((self.componentA, self.componentB), protocol))
+      
+      for node in componentA.inputNodes + componentA.outputNodes:
+        self.assertIs(node.component, componentA)
+      
+      # components pickled together still share definitions
+      self.assertIs(componentA.getInputNode('bkB').definition, componentB.getInputNode('bkB').definition)
+      self.assertEqual(componentA.getInputNode('bkB').aoiMultiplier, -1)
+
+class TestComponentTransforms(TestCase):
+  def setUp(self):
+    self.component = components.BeamSplitter(name="BS", aoi=30)
+    self.node = self.component.getOutputNode('frB')
+  
+  def assertNodePlacement(self):
+    # as calculated without the cache
+    relativePosition = (self.node.position * self.component.size).rotate(self.component.azimuth)
     
-# TODO: tests for getInputNode/getOutputNode (checks whether specified node search term is string), tests for inputNodes/outputNodes setters
+    self.assertEqual(self.node.getRelativePosition(), relativePosition)
+    self.assertEqual(self.node.getAbsolutePosition(), self.component.position.translate(relativePosition))
+    self.assertAlmostEqual(self.node.getAbsoluteAzimuth(), self.component.azimuth + self.node.getNodeAzimuth())
+  
+  def test_invalidation(self):
+    self.assertNodePlacement()
+    
+    self.component.position = optivis.geometry.Coordinates(10, -20)
+    self.assertNodePlacement()
+    
+    self.component.azimuth = 60
+    self.assertNodePlacement()
+    
+    self.component.size = optivis.geometry.Coordinates(20, 40)
+    self.assertNodePlacement()
+    
+    self.component.aoi = 10
+    self.assertNodePlacement()
+    
+    # changing the node replaces its definition
+    self.node.position = optivis.geometry.Coordinates(-0.5, 0.25)
+    self.assertNodePlacement()
+  
+  def test_bounding_box(self):
+    self.component.azimuth = 90
+    self.component.position = optivis.geometry.Coordinates(100, 100)
+    
+    (lowerBound, upperBound) = self.component.getBoundingBox()
+    
+    self.assertEqual(lowerBound, optivis.geometry.Coordinates(100 - self.component.size.y / 2, 100 - self.component.size.x / 2))
+    self.assertEqual(upperBound, optivis.geometry.Coordinates(100 + self.component.size.y / 2, 100 + self.component.size.x / 2))
+    
+    # returned coordinates can be changed without changing the cache
+    lowerBound.x = 0
+    
+    self.assertEqual(self.component.getBoundingBox()[0], optivis.geometry.Coordinates(100 - self.component.size.y / 2, 100 - self.component.size.x / 2))
+
 # TODO: test for getBoundingBox() ?
\ No newline at end of file
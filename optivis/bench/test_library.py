@@ -0,0 +1,192 @@
+from __future__ import unicode_literals, division
+
+import os
+import json
+import shutil
+import tempfile
+
+from unittest import TestCase
+from xml.etree import ElementTree as et
+import optivis.geometry
+import optivis.bundle
+import optivis.scene
+import optivis.serialisation
+import components
+import library
+
+class TestComponentLibrary(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.library = library.ComponentLibrary(module=None)
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def writeDescriptor(self, filename, descriptor):
+    with open(os.path.join(self.directory, filename), 'w') as f:
+      json.dump(descriptor, f)
+  
+  def writePeriscope(self):
+    self.writeDescriptor('periscope.json', {
+      'name': 'PeriscopeMirror',
+      'base': 'Mirror',
+      'asset': 'b-mir.svg',
+      'size': [11, 29],
+      'aoi': 45,
+      'inputNodes': [{'name': 'fr', 'position': [0.5, 0], 'aoiMultiplier': -1, 'aoiOffset': 180}],
+      'outputNodes': [{'name': 'fr', 'position': [0.5, 0]}]
+    })
+  
+  def test_load(self):
+    self.writePeriscope()
+    
+    (periscopeClass,) = self.library.load(self.directory)
+    
+    self.assertIs(self.library.getComponentClass('PeriscopeMirror'), periscopeClass)
+    self.assertTrue(issubclass(periscopeClass, components.Mirror))
+    
+    mirror = periscopeClass(name="P1")
+    
+    self.assertEqual(mirror.filename, 'b-mir.svg')
+    self.assertEqual(mirror.size, optivis.geometry.Coordinates(11, 29))
+    self.assertEqual(mirror.aoi, 45)
+    self.assertEqual(mirror.svgDir, components.AbstractComponent.svgDir)
+    
+    node = mirror.getInputNode('fr')
+    
+    self.assertIs(node.component, mirror)
+    self.assertEqual(node.position, optivis.geometry.Coordinates(0.5, 0))
+    self.assertEqual((node.aoiMultiplier, node.aoiOffset), (-1, 180))
+    self.assertEqual(mirror.getOutputNode('fr').aoiMultiplier, 1)
+    
+    self.assertEqual(periscopeClass(aoi=10).aoi, 10)
+  
+  def test_base_nodes(self):
+    self.writeDescriptor('lens.json', {'name': 'ThinLens', 'base': 'Lens', 'asset': 'b-lens2.svg', 'size': [5, 23]})
+    self.writeDescriptor('plate.json', {'name': 'Plate', 'base': 'Lens', 'asset': 'b-lens2.svg', 'size': [5, 23], 'outputNodes': []})
+    self.writeDescriptor('block.json', {'name': 'Block', 'asset': 'b-lens2.svg', 'size': [5, 23]})
+    
+    self.library.load(self.directory)
+    
+    # without node lists, the base's nodes are used
+    lens = self.library.getComponentClass('ThinLens')()
+    
+    self.assertEqual([node.name for node in lens.inputNodes], ['fr', 'bk'])
+    self.assertEqual([node.name for node in lens.outputNodes], ['fr', 'bk'])
+    
+    # an empty list replaces them
+    plate = self.library.getComponentClass('Plate')()
+    
+    self.assertEqual([node.name for node in plate.inputNodes], ['fr', 'bk'])
+    self.assertEqual(plate.outputNodes, [])
+    
+    block = self.library.getComponentClass('Block')()
+    
+    self.assertEqual((block.inputNodes, block.outputNodes), ([], []))
+  
+  def test_local_asset(self):
+    self.writePeriscope()
+    
+    with open(os.path.join(self.directory, 'b-mir.svg'), 'w') as f:
+      f.write('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    
+    (periscopeClass,) = self.library.load(self.directory)
+    
+    self.assertEqual(periscopeClass.svgDir, self.directory)
+  
+  def test_namespaced_local_asset(self):
+    self.writePeriscope()
+    
+    # as saved by drawing programs
+    with open(os.path.join(self.directory, 'b-mir.svg'), 'w') as f:
+      f.write('<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="11" height="29"><g inkscape:label="Mirror"><rect width="11" height="29"/></g></svg>')
+    
+    (periscopeClass,) = self.library.load(self.directory)
+    mirror = periscopeClass()
+    
+    svgElement = et.fromstring(optivis.bundle.AssetLoader(cacheDir=False).getMarkup(mirror.svgDir, mirror.filename))
+    
+    self.assertEqual(svgElement.find('g/rect').attrib['width'], '11')
+  
+  def test_invalid_descriptors(self):
+    self.writePeriscope()
+    
+    self.writeDescriptor('a.json', {'name': 'NoSize', 'asset': 'b-mir.svg'})
+    self.writeDescriptor('b.json', {'name': 'BadNode', 'asset': 'b-mir.svg', 'size': [1, 1], 'inputNodes': [{'name': 'fr'}]})
+    self.writeDescriptor('c.json', {'name': 'BadBase', 'base': 'CavityMirror', 'asset': 'b-mir.svg', 'size': [1, 1]})
+    
+    with open(os.path.join(self.directory, 'd.json'), 'w') as f:
+      f.write('{')
+    
+    # broken descriptors are skipped
+    self.assertEqual([componentClass.__name__ for componentClass in self.library.load(self.directory)], ['PeriscopeMirror'])
+    
+    self.assertRaises(Exception, library.parseDescriptor, os.path.join(self.directory, 'a.json'))
+    self.assertRaises(Exception, library.parseDescriptor, os.path.join(self.directory, 'b.json'))
+    self.assertRaises(Exception, self.library.getComponentClass, 'BadBase')
+  
+  def test_index(self):
+    self.writePeriscope()
+    
+    self.library.load(self.directory)
+    
+    indexPath = os.path.join(self.directory, library.INDEX_FILENAME)
+    index = library.readIndex(indexPath)
+    
+    self.assertEqual(index['periscope.json'][1]['name'], 'PeriscopeMirror')
+    
+    # descriptors in the index are used rather than read again
+    (key, descriptor) = index['periscope.json']
+    descriptor['size'] = (22, 58)
+    library.writeIndex(indexPath, index)
+    
+    (periscopeClass,) = library.ComponentLibrary(module=None).load(self.directory)
+    
+    self.assertEqual(periscopeClass.assetSize, optivis.geometry.Coordinates(22, 58))
+    
+    # changed descriptors are read again
+    index['periscope.json'] = ((0, 0), descriptor)
+    library.writeIndex(indexPath, index)
+    
+    (periscopeClass,) = library.ComponentLibrary(module=None).load(self.directory)
+    
+    self.assertEqual(periscopeClass.assetSize, optivis.geometry.Coordinates(11, 29))
+  
+  def test_corrupt_index(self):
+    self.writePeriscope()
+    
+    with open(os.path.join(self.directory, library.INDEX_FILENAME), 'wb') as f:
+      f.write(b'corrupt')
+    
+    self.assertEqual(len(self.library.load(self.directory)), 1)
+  
+  def test_register_in_module(self):
+    self.writePeriscope()
+    
+    componentLibrary = library.ComponentLibrary()
+    componentLibrary.load(self.directory)
+    
+    try:
+      self.assertIs(components.PeriscopeMirror, componentLibrary.getComponentClass('PeriscopeMirror'))
+      
+      # scenes with library components can be saved and loaded
+      scene = optivis.scene.Scene()
+      laser = components.Laser(name="L1")
+      mirror = components.PeriscopeMirror(name="P1")
+      scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), 50)
+      
+      path = os.path.join(self.directory, 'scene.json')
+      optivis.serialisation.save(scene, path)
+      
+      loaded = [component for component in optivis.serialisation.load(path).getComponents() if component.name == "P1"][0]
+      
+      self.assertIsInstance(loaded, components.PeriscopeMirror)
+    finally:
+      componentLibrary.unregister('PeriscopeMirror')
+    
+    self.assertFalse(hasattr(components, 'PeriscopeMirror'))
+    
+    # built in classes can't be replaced
+    self.writeDescriptor('periscope.json', {'name': 'CavityMirror', 'asset': 'b-mir.svg', 'size': [1, 1]})
+    
+    self.assertEqual(componentLibrary.load(self.directory), [])
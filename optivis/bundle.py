@@ -0,0 +1,370 @@
+"""
+Component graphics, loaded from a prebuilt bundle of assets where possible.
+
+Component SVG files are normalised before use: comments and metadata are removed, the
+graphics are optimised (see optivis.svgoptimise), and IDs are renamed to numbered
+placeholders, so each drawing of a component can give its IDs unique values with a
+single string replacement (see getUniqueMarkup()).
+
+The built in assets can be packed into a single bundle file of normalised markup with
+
+  python -m optivis.bundle [bundle path]
+
+which by default writes assets.bundle in the optivis package. setup.py builds it when
+installing. The bundle is read with mmap, or from the package loader when optivis is
+imported from a zip file or frozen application. Without a bundle, assets are read from
+the assets directory. Normalised versions of assets not in the bundle are kept in a
+cache directory, so they are only made again when the asset changes.
+
+Bundle layout: magic string, then the length of the index as an unsigned 32 bit
+integer, then a JSON index of [offset, length] of each asset's markup by filename
+(offsets relative to the end of the index), then the UTF-8 markup of each asset.
+"""
+
+from __future__ import unicode_literals, division
+
+import os
+import sys
+import json
+import hashlib
+import mmap
+import struct
+import pkgutil
+import threading
+import itertools
+from xml.etree import ElementTree as et
+
+import optivis.svgoptimise
+
+# directory of the built in assets
+ASSET_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+
+# name of the bundle in the optivis package
+BUNDLE_FILENAME = 'assets.bundle'
+
+# start of bundle files, including the format version
+MAGIC = b'OPTIVIS-ASSETS-1\n'
+
+# placeholder IDs in normalised markup are this prefix followed by a number
+ID_PLACEHOLDER = '__optivis_id__'
+
+# elements which don't affect how assets are drawn
+METADATA_TAGS = set(['metadata', 'title', 'desc'])
+
+# optimiser used to normalise assets
+optimiser = optivis.svgoptimise.SvgOptimiser()
+
+def normaliseSvg(path, optimiser=optimiser):
+  """
+  Get normalised markup of the SVG file at path, optimised by optimiser (or not
+  optimised if it is None).
+  """
+
+  # comments are dropped by the parser
+  svgElement = et.parse(path).getroot()
+
+  # make sure we've got an SVG element as root
+  if optivis.svgoptimise.getLocalName(svgElement.tag) != 'svg':
+    raise Exception('Root element of SVG file {0} is not an \'svg\' tag'.format(path))
+
+  # remove metadata, and program specific elements and attributes, which are in other
+  # namespaces, and leave elements without a namespace, like the built in assets
+  for element in svgElement.iter():
+    element.tag = optivis.svgoptimise.getLocalName(element.tag)
+
+    for child in list(element):
+      localName = optivis.svgoptimise.getLocalName(child.tag)
+
+      if localName is None or localName in METADATA_TAGS:
+        element.remove(child)
+
+    for key in list(element.attrib.keys()):
+      (namespace, localName) = optivis.svgoptimise.splitName(key)
+
+      if namespace == optivis.svgoptimise.SVG_NAMESPACE:
+        element.attrib[localName] = element.attrib.pop(key)
+      elif namespace not in (None, optivis.svgoptimise.XLINK_NAMESPACE):
+        del(element.attrib[key])
+
+  # IDs which aren't referenced are removed by the optimiser, so check them first
+  ids = [element.attrib['id'] for element in svgElement.iter() if 'id' in element.attrib]
+
+  if len(set(ids)) != len(ids):
+    raise Exception('Found duplicate ID in SVG file {0}'.format(path))
+
+  if optimiser is not None:
+    optimiser.optimise(svgElement)
+
+  # map of IDs to placeholders
+  placeholders = {}
+
+  for element in svgElement.iter():
+    if 'id' in element.attrib:
+      placeholders[element.attrib['id']] = '{0}{1}'.format(ID_PLACEHOLDER, len(placeholders))
+
+  # replace IDs, and references to them, with placeholders
+  for element in svgElement.iter():
+    if 'id' in element.attrib:
+      element.attrib['id'] = placeholders[element.attrib['id']]
+
+    for (attrKey, attrVal) in element.attrib.items():
+      if attrKey in (optivis.svgoptimise.XLINK_HREF, 'href') and attrVal[1:] in placeholders:
+        element.attrib[attrKey] = '#' + placeholders[attrVal[1:]]
+
+        continue
+
+      for thisId, placeholder in placeholders.iteritems():
+        needle = 'url(#{0})'.format(thisId)
+
+        if needle in attrVal:
+          attrVal = attrVal.replace(needle, 'url(#{0})'.format(placeholder))
+
+          element.attrib[attrKey] = attrVal
+
+  # non-ASCII characters are written as references, so there is no XML declaration
+  return et.tostring(svgElement).decode('ascii')
+
+# numbers used to make the IDs in each drawing of a component unique
+idCounter = itertools.count()
+
+def getUniqueMarkup(markup):
+  """
+  Get normalised markup with unique IDs, so it can be combined with other markup in the
+  same document.
+  """
+
+  return markup.replace(ID_PLACEHOLDER, 'e{0}-'.format(next(idCounter)))
+
+def writeBundle(path, assetDir=ASSET_DIR, optimiser=optimiser):
+  """
+  Write a bundle of the SVG files in assetDir, normalised with optimiser, to path.
+  """
+
+  index = {}
+  data = []
+  offset = 0
+
+  for filename in sorted(os.listdir(assetDir)):
+    if os.path.splitext(filename)[1].lower() != '.svg':
+      continue
+
+    markup = normaliseSvg(os.path.join(assetDir, filename), optimiser).encode('utf-8')
+
+    index[filename] = [offset, len(markup)]
+    data.append(markup)
+    offset += len(markup)
+
+  indexData = json.dumps(index, sort_keys=True).encode('utf-8')
+
+  with open(path, 'wb') as f:
+    f.write(MAGIC)
+    f.write(struct.pack('<I', len(indexData)))
+    f.write(indexData)
+
+    for markup in data:
+      f.write(markup)
+
+class AssetBundle(object):
+  """
+  Normalised asset markup read from a bundle file or string.
+  """
+
+  def __init__(self, data):
+    """
+    data is the bundle, as a string or mmap
+    """
+
+    if data[:len(MAGIC)] != MAGIC:
+      raise Exception('Asset bundle is not in a supported format')
+
+    start = len(MAGIC) + 4
+    (indexLength,) = struct.unpack('<I', data[len(MAGIC):start])
+
+    self.data = data
+    self.index = json.loads(data[start:start + indexLength].decode('utf-8'))
+    self.dataOffset = start + indexLength
+
+  @classmethod
+  def open(cls, path):
+    """
+    Open bundle file, mapping it into memory rather than reading it.
+    """
+
+    with open(path, 'rb') as f:
+      # the map stays open after the file is closed
+      return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+  def getFilenames(self):
+    return self.index.keys()
+
+  def getMarkup(self, filename):
+    """
+    Get normalised markup of the asset with the specified filename, or None if it's not
+    in the bundle.
+    """
+
+    if filename not in self.index:
+      return None
+
+    (offset, length) = self.index[filename]
+    start = self.dataOffset + offset
+
+    return self.data[start:start + length].decode('utf-8')
+
+def loadBundle():
+  """
+  Get the bundle of built in assets, or None if it hasn't been built.
+  """
+
+  path = os.path.join(os.path.dirname(__file__), BUNDLE_FILENAME)
+
+  if os.path.isfile(path):
+    return AssetBundle.open(path)
+
+  # optivis may be imported from a zip file or frozen application, in which case the
+  # bundle is only available from its loader
+  try:
+    data = pkgutil.get_data(__name__.rsplit('.', 1)[0], BUNDLE_FILENAME)
+  except (IOError, OSError):
+    return None
+
+  if data is None:
+    return None
+
+  return AssetBundle(data)
+
+def getCacheDir():
+  """
+  Get directory normalised assets are cached in: $OPTIVIS_CACHE_DIR if set, otherwise
+  optivis/assets in the user's cache directory.
+  """
+
+  if 'OPTIVIS_CACHE_DIR' in os.environ:
+    return os.environ['OPTIVIS_CACHE_DIR']
+
+  cacheHome = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+
+  return os.path.join(cacheHome, 'optivis', 'assets')
+
+class AssetLoader(object):
+  """
+  Loads normalised asset markup, from the bundle for built in assets and otherwise from
+  the cache directory, or by reading and normalising the SVG file. Markup is remembered,
+  so each asset is only loaded once.
+  """
+
+  def __init__(self, bundle=None, cacheDir=None, optimiser=optimiser):
+    """
+    bundle is the bundle of built in assets, by default loaded when first needed
+    cacheDir is the directory to cache normalised assets in, by default getCacheDir(), or
+    False to not cache them
+    optimiser is the optimiser for assets not in the bundle
+    """
+
+    self.bundle = bundle
+    self.bundleLoaded = bundle is not None
+
+    if cacheDir is None:
+      cacheDir = getCacheDir()
+
+    self.cacheDir = cacheDir
+    self.optimiser = optimiser
+
+    self.markup = {}
+
+    # views in different threads can draw at the same time
+    self.lock = threading.Lock()
+
+  def getBundle(self):
+    if not self.bundleLoaded:
+      try:
+        self.bundle = loadBundle()
+      except Exception as e:
+        # the loose assets can still be used
+        print "[Assets] Could not load asset bundle: {0}".format(e)
+
+      self.bundleLoaded = True
+
+    return self.bundle
+
+  def getMarkup(self, svgDir, filename):
+    """
+    Get normalised markup of the asset at svgDir and filename.
+    """
+
+    key = (svgDir, filename)
+
+    with self.lock:
+      if key not in self.markup:
+        markup = None
+
+        if os.path.abspath(svgDir) == os.path.abspath(ASSET_DIR) and self.getBundle() is not None:
+          markup = self.bundle.getMarkup(filename)
+
+        if markup is None:
+          markup = self.getCachedMarkup(os.path.join(svgDir, filename))
+
+        self.markup[key] = markup
+
+      return self.markup[key]
+
+  def getCachePath(self, path):
+    """
+    Get path of the cached normalised version of the SVG file at path, which changes
+    when the file or the optimisation changes.
+    """
+
+    stat = os.stat(path)
+
+    if self.optimiser is None:
+      optimisation = None
+    else:
+      optimisation = (optivis.svgoptimise.VERSION, self.optimiser.precision)
+
+    key = repr((os.path.abspath(path), stat.st_mtime, stat.st_size, MAGIC, optimisation))
+
+    return os.path.join(self.cacheDir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.svg')
+
+  def getCachedMarkup(self, path):
+    if self.cacheDir is False:
+      return normaliseSvg(path, self.optimiser)
+
+    cachePath = self.getCachePath(path)
+
+    try:
+      with open(cachePath, 'rb') as f:
+        return f.read().decode('utf-8')
+    except IOError:
+      pass
+
+    markup = normaliseSvg(path, self.optimiser)
+
+    # assets can still be drawn if they can't be cached, e.g. in a read only home directory
+    try:
+      if not os.path.isdir(self.cacheDir):
+        os.makedirs(self.cacheDir)
+
+      # written to a temporary file first, so other processes never read part of it
+      temporaryPath = '{0}.{1}.tmp'.format(cachePath, os.getpid())
+
+      with open(temporaryPath, 'wb') as f:
+        f.write(markup.encode('utf-8'))
+
+      os.rename(temporaryPath, cachePath)
+    except (IOError, OSError) as e:
+      print "[Assets] Could not cache asset {0}: {1}".format(path, e)
+
+    return markup
+
+# loader used by the views
+loader = AssetLoader()
+
+def getMarkup(svgDir, filename):
+  return loader.getMarkup(svgDir, filename)
+
+if __name__ == '__main__':
+  bundlePath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), BUNDLE_FILENAME)
+
+  writeBundle(bundlePath)
+
+  print "[Assets] Wrote asset bundle {0}".format(bundlePath)
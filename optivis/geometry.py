@@ -3,10 +3,16 @@ from __future__ import unicode_literals, division
 import math
 
 class Coordinates(object):
+  # without a dict per instance, as scenes and layouts make very many coordinates
+  __slots__ = ('__x', '__y')
+  
   def __init__(self, x, y):
     self.x = x
     self.y = y
   
+  def __reduce__(self):
+    return (Coordinates, (self.x, self.y))
+  
   @property
   def x(self):
     return self.__x
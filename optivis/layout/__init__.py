@@ -2,27 +2,104 @@ from __future__ import unicode_literals, division
 
 import abc
 import math
+import multiprocessing
+
+import numpy
 
 import optivis
 import optivis.geometry
 import optivis.bench.components
 import optivis.bench.links
 import scale
+import partition
+import solver
+import overlap
+import labels
+import registry
+import constraints
+
+class LayoutCancelledException(Exception):
+  """
+  Raised by a layout manager when its arrangement is cancelled part way through.
+  """
+  
+  pass
 
 class AbstractLayout(object):
+  """
+  Layout manager, which positions the components of a scene along its links.
+  
+  Thread safety: layout state is held by each layout manager instance, and class
+  attributes are only read, so different scenes can be laid out at the same time by
+  different layout managers in different threads. A layout manager instance must only be
+  used by one thread at a time, apart from cancel(), which can be called from any thread.
+  Scale functions only cache scaled lengths, so they can be shared between layouts.
+  """
+  
   __metaclass__ = abc.ABCMeta
 
+  # name shown in views, which identifies the layout manager in the registry, and a short
+  # description of it
   title = "Abstract"
+  description = ""
 
-  # set of components that are part of links
-  linkedComponents = set([])
+  # minimum number of links in a scene with more than one partition for the partitions
+  # to be laid out in parallel by a pool of worker processes
+  parallelLinkThreshold = 5000
+  
+  # number of worker processes to use (None uses one per CPU)
+  processes = None
+  
+  # space left between packed partitions
+  partitionSpacing = 20
+  
+  # whether to look for overlapping items after layout, and whether to lengthen links
+  # to try to separate them
+  checkOverlaps = False
+  nudgeOverlaps = False
   
-  def __init__(self, scene, scaleFunc=None):
+  # maximum number of times to nudge links and lay out again
+  maxNudgePasses = 10
+  
+  # smallest amount to lengthen a link by when nudging
+  nudgeStep = 10
+  
+  def __init__(self, scene, scaleFunc=None, progressCallback=None):
+    """
+    progressCallback, if specified, is called with the number of links laid out so far
+    and the total number of links in the scene each time a link is laid out.
+    """
+    
     if scaleFunc is None:
       scaleFunc = scale.ScaleFunction()
     
     self.scene = scene
     self.scaleFunc = scaleFunc
+    self.progressCallback = progressCallback
+    
+    # cancellation flag, checked by the layout as it works through the links
+    self.cancelled = False
+    
+    # number of links laid out by the current arrangement
+    self.linkCount = 0
+    
+    # set of components that are part of links laid out by the current arrangement
+    self.linkedComponents = set([])
+    
+    # links attached to each component and partitions of the scene, set by arrange()
+    self.componentLinks = None
+    self.partitions = []
+    
+    # list of (link, reference component, target component, offset, direction) for each
+    # link used to place a component, set by arrange(). The target is placed at the
+    # reference position plus the offset plus the drawn link length along the direction.
+    self.placedLinks = []
+    
+    # extra drawn lengths of links, by python object id, added to separate overlapping items
+    self.linkNudges = {}
+    
+    # list of overlapping items, set by arrange() if overlaps are checked or nudged
+    self.overlaps = None
   
   @property
   def scene(self):
@@ -62,22 +139,132 @@ class AbstractLayout(object):
     # empty linked components list
     self.linkedComponents = set([])
     
-    # layout links
-    self.layoutLinks()
+    # reset progress
+    self.linkCount = 0
+    
+    self.placedLinks = []
+    
+    self.linkNudges = {}
+    
+    # check scale function doesn't draw longer links shorter than shorter ones
+    self.scaleFunc.validate([link.length for link in self.scene.links])
+    
+    # index links by the components they attach to, in scene order
+    self.componentLinks = {}
+    
+    for link in self.scene.links:
+      for component in link.getComponents():
+        componentLinks = self.componentLinks.setdefault(id(component), [])
+        
+        if link not in componentLinks:
+          componentLinks.append(link)
+    
+    # split scene into parts that are not linked to each other
+    self.partitions = partition.getPartitions(self.scene)
+    
+    if len(self.partitions) > 1 and len(self.scene.links) >= self.parallelLinkThreshold:
+      # layout partitions in worker processes
+      self.layoutPartitionsInParallel()
+    else:
+      # layout links
+      self.layoutLinks()
+    
+    # arrange partitions so that they don't overlap
+    self.packPartitions()
+    
+    if self.nudgeOverlaps:
+      # lengthen links to separate overlapping items
+      self.resolveOverlaps()
+    
+    if self.checkOverlaps or self.nudgeOverlaps:
+      self.overlaps = self.getOverlaps()
+      
+      if len(self.overlaps) > 0:
+        print "[Layout] WARNING: {0} overlapping items remain after layout".format(len(self.overlaps))
     
     # move scene positions so that left most, topmost object is at the origin
     self.normalisePositions()
   
   def layoutLinks(self):
+    for thisPartition in self.partitions:
+      self.layoutPartition(thisPartition)
+  
+  def layoutPartition(self, thisPartition):
     # loop over links attached to reference component, and also other links
     # attached to components to which these links attach the reference
-    for link in self.getComponentLinks(self.scene.reference):
+    for link in self.getComponentLinks(thisPartition.reference):
       # recursive
-      self.layoutLinkChain(link, self.scene.reference)
-      
+      self.layoutLinkChain(link, thisPartition.reference)
+  
+  def layoutPartitionsInParallel(self):
+    """
+    Layout each partition in a separate process. The partitions are sent to the workers
+    as serialised scenes, and the resulting geometry applied to this scene's components
+    and links.
+    """
+    
+    import optivis.serialisation
+    
+    # constraints are applied in the workers
+    scenes = [thisPartition.getScene(self.scene.title) for thisPartition in self.partitions]
+    tasks = [(self.__class__, self.scaleFunc, optivis.serialisation.sceneToDict(scene)) for scene in scenes]
+    
+    pool = multiprocessing.Pool(self.processes)
+    
+    try:
+      for scene, geometry in zip(scenes, pool.imap(partition.layoutPartitionScene, tasks)):
+        scene.setGeometry(geometry)
+        
+        self.linkedComponents.update(scene.getComponents())
+        
+        # report each link in the partition, stopping if the layout has been cancelled
+        for link in scene.links:
+          self.reportProgress()
+    finally:
+      pool.terminate()
+  
+  def packPartitions(self):
+    """
+    Move partitions so that their bounding boxes don't overlap.
+    """
+    
+    if len(self.partitions) < 2:
+      return
+    
+    boundingBoxes = [thisPartition.getBoundingBox() for thisPartition in self.partitions]
+    sizes = [upperBound.translate(lowerBound.flip()) for (lowerBound, upperBound) in boundingBoxes]
+    
+    positions = partition.packRectangles(sizes, self.partitionSpacing)
+    
+    for thisPartition, (lowerBound, upperBound), position in zip(self.partitions, boundingBoxes, positions):
+      thisPartition.translate(position.translate(lowerBound.flip()))
+  
+
+  def cancel(self):
+    """
+    Request that the arrangement stops. This can be called from a thread other than
+    the one running arrange(), which then raises LayoutCancelledException before
+    laying out its next link.
+    """
+    
+    self.cancelled = True
+  
+  def reportProgress(self):
+    if self.cancelled:
+      raise LayoutCancelledException('Layout of scene {0} was cancelled'.format(self.scene.title))
+    
+    # links closing a loop are visited twice, so don't count past the total
+    self.linkCount = min(self.linkCount + 1, len(self.scene.links))
+    
+    if self.progressCallback is not None:
+      self.progressCallback(self.linkCount, len(self.scene.links))
+  
   def layoutLinkChain(self, link, referenceComponent):    
     print "[Layout] Linking {0} with respect to {1}".format(link, referenceComponent)
     
+    # report progress, stopping here if the layout has been cancelled
+    self.reportProgress()
+    
     referenceNode = None
     targetNode = None
     
@@ -108,6 +295,16 @@ class AbstractLayout(object):
     # then set the position of the input component
     targetNode.setAbsolutePosition(self.getTargetNodePositionRelativeToReferenceNode(link, referenceNode))
     
+    # record how the target was placed
+    direction = optivis.geometry.Coordinates(1, 0).rotate(referenceNode.getAbsoluteAzimuth())
+    
+    if isinstance(referenceNode, optivis.bench.nodes.InputNode):
+      direction = direction.flip()
+    
+    offset = targetComponent.position.translate(referenceComponent.position.flip(), (direction * self.getDrawnLinkLength(link)).flip())
+    
+    self.placedLinks.append((link, referenceComponent, targetComponent, offset, direction))
+    
     # set link start and end positions
     link.start = link.outputNode.getAbsolutePosition()
     link.end = link.inputNode.getAbsolutePosition()
@@ -124,6 +321,9 @@ class AbstractLayout(object):
       self.layoutLinkChain(subLink, targetComponent)
     
   def getComponentLinks(self, component, avoid=None):
+    if self.componentLinks is not None:
+      return [link for link in self.componentLinks.get(id(component), []) if link != avoid]
+    
     links = []
     
     for link in self.scene.links:
@@ -156,7 +356,7 @@ class AbstractLayout(object):
     pivotAngle = referenceNode.getAbsoluteAzimuth()
     
     # position of component with respect to pivot
-    relativePosition = optivis.geometry.Coordinates(self.getScaledLinkLength(link.length), 0).rotate(pivotAngle)
+    relativePosition = optivis.geometry.Coordinates(self.getDrawnLinkLength(link), 0).rotate(pivotAngle)
     
     if isinstance(referenceNode, optivis.bench.nodes.InputNode):
       # flip position because we're going 'backwards' from input to output
@@ -178,14 +378,91 @@ class AbstractLayout(object):
       link.start = link.start.translate(offset)
       link.end = link.end.translate(offset)
     
-    for component in self.scene.getComponents():
-      component.position = component.position.translate(offset)
+    if self.scene.store is not None:
+      self.scene.store.translate(offset, self.scene.getStoreIndices())
+    else:
+      for component in self.scene.getComponents():
+        component.position = component.position.translate(offset)
     
   def getScaledLinkLength(self, length):
     return self.scaleFunc.getScaledLength(length)
+  
+  def getDrawnLinkLength(self, link):
+    return self.getScaledLinkLength(link.length) + self.linkNudges.get(id(link), 0)
+  
+  def getOverlaps(self):
+    """
+    Get list of overlapping items in the scene as currently laid out.
+    """
+    
+    return overlap.getOverlaps(self.scene)
+  
+  def resolveOverlaps(self):
+    """
+    Try to separate overlapping items by lengthening links and laying out again. For each
+    overlap, the link which placed the most recently placed of the components involved is
+    lengthened by the size of the overlap, which moves that component and those placed
+    after it away along the link. This is a heuristic, and some overlaps may remain.
+    """
+    
+    for thisPass in range(self.maxNudgePasses):
+      overlaps = self.getOverlaps()
+      
+      if len(overlaps) == 0 or not self.nudge(overlaps):
+        break
+      
+      print "[Layout] Nudging links to separate {0} overlapping items".format(len(overlaps))
+      
+      # layout again with the nudged lengths
+      self.linkedComponents = set([])
+      self.placedLinks = []
+      
+      self.layoutLinks()
+      self.packPartitions()
+  
+  def nudge(self, overlaps):
+    """
+    Lengthen links to separate the specified overlaps. Returns True if any links were
+    lengthened.
+    """
+    
+    # order in which components were placed, and the links which placed them
+    placedIndices = {}
+    placingLinks = {}
+    
+    for i, (link, referenceComponent, targetComponent, offset, direction) in enumerate(self.placedLinks):
+      placedIndices[id(targetComponent)] = i
+      placingLinks[id(targetComponent)] = link
+    
+    nudges = {}
+    
+    for thisOverlap in overlaps:
+      components = thisOverlap.getComponents()
+      
+      for item in (thisOverlap.itemA, thisOverlap.itemB):
+        if overlap.isLink(item):
+          components.extend(item.getComponents())
+      
+      # references of partitions were not placed by a link
+      components = [component for component in components if id(component) in placedIndices]
+      
+      if len(components) == 0:
+        continue
+      
+      component = max(components, key=lambda component: placedIndices[id(component)])
+      link = placingLinks[id(component)]
+      
+      nudges[id(link)] = max(nudges.get(id(link), 0), thisOverlap.size, self.nudgeStep)
+    
+    for linkId, nudge in nudges.iteritems():
+      self.linkNudges[linkId] = self.linkNudges.get(linkId, 0) + nudge
+    
+    return len(nudges) > 0
 
+@registry.register
 class StandardLayout(AbstractLayout):
   title = "Standard"
+  description = "Places each component at the end of the links to it, following angles of incidence."
 
   def __init__(self, *args, **kwargs):    
     super(StandardLayout, self).__init__(*args, **kwargs)
@@ -193,8 +470,10 @@ class StandardLayout(AbstractLayout):
   def isFixed(self, component):
     return component in self.linkedComponents
 
+@registry.register
 class ConstrainedLayout(AbstractLayout):
   title = "Constrained"
+  description = "Standard layout with the angles of incidence of components set by the scene's constraints first."
   
   def __init__(self, *args, **kwargs):
     super(ConstrainedLayout, self).__init__(*args, **kwargs)
@@ -202,32 +481,99 @@ class ConstrainedLayout(AbstractLayout):
   # override
   def layoutLinks(self, *args, **kwargs):
     # first constrain angles of optics
-    for constraint in self.scene.constraints:
-      constraint.constrain()
+    constraints.applyConstraints(self.scene.constraints)
+    
+    # python object ids of constrained components, and the constrained component each
+    # component linked to one is attached to
+    self.constrainedComponents = set(id(constraint.getCommonComponent()) for constraint in self.scene.constraints)
+    self.attachedComponents = {}
+    
+    for link in self.scene.links:
+      for thisComponent, otherComponent in zip(link.getComponents(), reversed(link.getComponents())):
+        if thisComponent is not otherComponent and id(otherComponent) in self.constrainedComponents:
+          self.attachedComponents.setdefault(id(thisComponent), otherComponent)
     
     super(ConstrainedLayout, self).layoutLinks(*args, **kwargs)
     
   def isFixed(self, component):
     if component in self.linkedComponents:
       # check if any constraints constrain this component
-      for constraint in self.scene.constraints:
-        if constraint.constrains(component):
-          print "{0} is fixed".format(component)
-          return True
+      if id(component) in self.constrainedComponents:
+        print "{0} is fixed".format(component)
+        return True
       
       # check if this is attached to a constrained component
-      for link in self.scene.links:
-        if link.hasComponent(component):
-          # this link is attached to the component
-          # is the other side constrained?
-          for thisComponent in link.getComponents():
-            if thisComponent is not component:
-              # this is the other side of the link
-              for constraint in self.scene.constraints:
-                if constraint.constrains(thisComponent):
-                  print "{0} is fixed because it's attached to fixed component {1}".format(component, thisComponent)
-                  return True
+      if id(component) in self.attachedComponents:
+        print "{0} is fixed because it's attached to fixed component {1}".format(component, self.attachedComponents[id(component)])
+        return True
     
     print "{0} is not fixed".format(component)
     
-    return False
\ No newline at end of file
+    return False
+
+@registry.register
+class SolvedLayout(ConstrainedLayout):
+  """
+  Layout which solves link lengths, node azimuths and constraints together, so that
+  closed loops such as ring cavities close. The constrained layout is used as the
+  starting point, then the positions and azimuths of all components except the
+  partition references are adjusted to minimise the residuals of the links.
+  """
+  
+  title = "Solved"
+  description = "Constrained layout with positions and azimuths solved by least squares, so that closed loops close."
+  
+  # maximum number of solver iterations
+  maxIterations = 50
+  
+  # tolerance of the solver, in scaled length units
+  tolerance = 1e-10
+  
+  def __init__(self, *args, **kwargs):
+    super(SolvedLayout, self).__init__(*args, **kwargs)
+    
+    # list of (link, position residual, azimuth residual) after arrangement
+    self.residuals = None
+  
+  # override
+  def arrange(self):
+    super(SolvedLayout, self).arrange()
+    
+    self.residuals = self.getResiduals()
+    
+    if len(self.residuals) > 0:
+      print "[Layout] Maximum residuals: position {0}, azimuth {1} degrees".format(max(residual[1] for residual in self.residuals), max(residual[2] for residual in self.residuals))
+  
+  # override
+  def layoutLinks(self, *args, **kwargs):
+    super(SolvedLayout, self).layoutLinks(*args, **kwargs)
+    
+    system = solver.LinkSystem(self.scene.links, self.scaleFunc, self.linkNudges)
+    
+    iterations = system.solve([thisPartition.reference for thisPartition in self.partitions], maxIterations=self.maxIterations, tolerance=self.tolerance)
+    
+    print "[Layout] Solved {0} links in {1} iterations".format(len(self.scene.links), iterations)
+  
+  # override
+  def isFixed(self, component):
+    # the initial layout only needs to visit each component once, as the solver closes
+    # any loops
+    return component in self.linkedComponents
+  
+  def getResiduals(self):
+    """
+    Get list of (link, position residual, azimuth residual) for the scene as currently
+    laid out. The position residual is the distance, in scaled length units, between
+    where the link's input node is and where the link's length and output node azimuth
+    put it. The azimuth residual is the difference in degrees between the link's node
+    azimuths.
+    """
+    
+    system = solver.LinkSystem(self.scene.links, self.scaleFunc, self.linkNudges)
+    
+    (positionResiduals, azimuthResiduals) = system.getResiduals(system.getState())
+    
+    positionResiduals = numpy.hypot(positionResiduals[:, 0], positionResiduals[:, 1])
+    azimuthResiduals = numpy.degrees(numpy.abs(azimuthResiduals))
+    
+    return [(link, float(position), float(azimuth)) for link, position, azimuth in zip(self.scene.links, positionResiduals, azimuthResiduals)]
@@ -1,6 +1,9 @@
 from __future__ import unicode_literals, division
 
 import abc
+import copy
+
+import numpy
 
 from optivis.bench import AbstractBenchItem
 from optivis.bench.links import AbstractLink
@@ -34,6 +37,18 @@ class AbstractConstraint():
     
     self.__componentB = component
   
+  def fork(self, componentA, componentB):
+    """
+    Get a copy of this constraint between the specified forks of its bench items.
+    """
+    
+    constraint = copy.copy(self)
+    
+    constraint.componentA = componentA
+    constraint.componentB = componentB
+    
+    return constraint
+  
   @abc.abstractmethod
   def constrain(self):
     pass
@@ -98,4 +113,55 @@ class LinkAngularConstraint(AbstractLinkConstraint):
     # get angle of incidence required for this constraint
     aoi = component.getAoiForConstrainedNodeAngle(nodeA, nodeB, self.angle)
     
-    component.aoi = aoi
\ No newline at end of file
+    component.aoi = aoi
+
+def applyConstraints(constraints):
+  """
+  Apply constraints, as constrain() does for each in turn, but solving the angles of
+  incidence set by all angular constraints at once. The solutions chosen (where there is
+  more than one) are those nearest the angles of incidence before any constraints are
+  applied, which only differs from applying them in turn where a component has more than
+  one constraint.
+  """
+  
+  angularConstraints = [constraint for constraint in constraints if isinstance(constraint, LinkAngularConstraint)]
+  
+  if len(angularConstraints) > 0:
+    commonNodes = [constraint.linkA.getNodesForCommonComponent(constraint.linkB) for constraint in angularConstraints]
+    
+    multipliersA = numpy.array([nodeA.aoiMultiplier for component, nodeA, nodeB in commonNodes], dtype=float)
+    multipliersB = numpy.array([nodeB.aoiMultiplier for component, nodeA, nodeB in commonNodes], dtype=float)
+    offsetsA = numpy.array([nodeA.aoiOffset for component, nodeA, nodeB in commonNodes], dtype=float)
+    offsetsB = numpy.array([nodeB.aoiOffset for component, nodeA, nodeB in commonNodes], dtype=float)
+    angles = numpy.array([constraint.angle for constraint in angularConstraints], dtype=float)
+    aois = numpy.array([component.aoi for component, nodeA, nodeB in commonNodes], dtype=float)
+    
+    coefficients = multipliersA - multipliersB
+    constants = offsetsA - offsetsB
+    
+    # nodes with equal multipliers are at a fixed angle to each other
+    fixed = coefficients == 0
+    
+    if numpy.any(fixed):
+      wrongAngles = numpy.abs((angles - constants + 180) % 360 - 180) > 1e-9
+      
+      for index in numpy.flatnonzero(fixed & wrongAngles):
+        (component, nodeA, nodeB) = commonNodes[index]
+        
+        raise Exception('Angle between nodes {0} and {1} is always {2} degrees, so cannot be constrained to {3} degrees'.format(nodeA, nodeB, constants[index] % 360, angles[index]))
+      
+      coefficients[fixed] = 1
+    
+    # solutions nearest the current angles of incidence, as in getConstrainedAoi()
+    solutions = (angles - constants) / coefficients
+    periods = 360 / numpy.abs(coefficients)
+    solutions += periods * numpy.floor((aois - solutions) / periods + 0.5)
+    
+    solutions[fixed] = aois[fixed]
+    
+    for (component, nodeA, nodeB), aoi in zip(commonNodes, solutions):
+      component.aoi = float(aoi)
+  
+  for constraint in constraints:
+    if not isinstance(constraint, LinkAngularConstraint):
+      constraint.constrain()
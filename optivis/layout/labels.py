@@ -0,0 +1,224 @@
+from __future__ import unicode_literals, division
+
+import abc
+import math
+
+import optivis.geometry
+import optivis.spatial
+import overlap
+
+class AbstractTextMetrics(object):
+  """
+  Measures the size of label text drawn in a particular font. Sizes are remembered by
+  (font, text), as scenes tend to have many labels with the same text, and labels are
+  measured again each time they are placed.
+  """
+
+  __metaclass__ = abc.ABCMeta
+
+  # maximum number of text sizes remembered
+  cacheSize = 10000
+
+  def __init__(self):
+    self.cache = {}
+
+  @abc.abstractmethod
+  def getFont(self):
+    """
+    Get hashable description of the font text is measured in.
+    """
+
+    pass
+
+  @abc.abstractmethod
+  def measure(self, text):
+    """
+    Get size of the specified text, as Coordinates.
+    """
+
+    pass
+
+  def getSize(self, text):
+    key = (self.getFont(), text)
+
+    if key not in self.cache:
+      if len(self.cache) >= self.cacheSize:
+        self.cache.clear()
+
+      self.cache[key] = self.measure(text)
+
+    return self.cache[key]
+
+class EstimatedTextMetrics(AbstractTextMetrics):
+  """
+  Estimates text size from the number of lines and the length of the longest line, for
+  views which can't measure text themselves.
+  """
+
+  def __init__(self, fontFamily="sans-serif", fontSize=12, charWidth=0.6, lineHeight=1.2, *args, **kwargs):
+    """
+    charWidth is the average character width, and lineHeight the line spacing, as
+    multiples of the font size
+    """
+
+    super(EstimatedTextMetrics, self).__init__(*args, **kwargs)
+
+    self.fontFamily = fontFamily
+    self.fontSize = fontSize
+    self.charWidth = charWidth
+    self.lineHeight = lineHeight
+
+  def getFont(self):
+    return (self.fontFamily, self.fontSize, self.charWidth, self.lineHeight)
+
+  def measure(self, text):
+    lines = text.split("\n")
+
+    return optivis.geometry.Coordinates(max(len(line) for line in lines) * self.charWidth * self.fontSize, len(lines) * self.lineHeight * self.fontSize)
+
+class LabelPlacer(object):
+  """
+  Chooses label offsets that avoid other labels, components and links.
+
+  Labels are placed one at a time. Each label tries its current offset, then offsets on
+  a grid around it in order of distance, and keeps the first with the lowest cost: the
+  area it overlaps components and already placed labels, plus a penalty for each link it
+  crosses. Labels don't avoid the item they are attached to. Nearby items are found with
+  a spatial index, so placing all labels takes roughly linear time.
+
+  Label bounds are the axis-aligned boxes around the (possibly rotated) text. Fixed labels
+  (e.g. those moved by the user) keep their offsets, but are avoided by the others.
+  """
+
+  # candidate offsets tried in each direction from the current offset
+  searchSteps = 2
+
+  # cost of crossing a link, as a fraction of the label's area
+  linkCost = 0.25
+
+  def __init__(self, scene, textMetrics, labelFlags=None, cellSize=None, fixedLabels=None):
+    """
+    labelFlags is the label content to draw, as used by the views
+    cellSize is the spatial index cell size (by default, the median component size)
+    fixedLabels is a list of labels which are not moved
+    """
+
+    if fixedLabels is None:
+      fixedLabels = []
+
+    self.scene = scene
+    self.textMetrics = textMetrics
+    self.labelFlags = labelFlags
+    self.cellSize = cellSize
+    self.fixedLabels = fixedLabels
+
+  def getLabels(self):
+    """
+    Get list of labels in the scene which are attached to items, in the order the views
+    draw them.
+    """
+
+    labels = []
+
+    for item in list(self.scene.links) + self.scene.getComponents():
+      if item.labels is not None:
+        labels.extend([label for label in item.labels if label.item is not None])
+
+    return labels
+
+  def getCandidateSteps(self, size):
+    """
+    Get list of (x, y) changes to the offset to try for a label of the specified size,
+    nearest first.
+    """
+
+    # steps large enough to move the label clear of an item of similar size
+    (stepX, stepY) = (max(size.x / 2, size.y), size.y)
+
+    steps = [(i * stepX, j * stepY) for i in range(-self.searchSteps, self.searchSteps + 1) for j in range(-self.searchSteps, self.searchSteps + 1)]
+    steps.sort(key=lambda step: (step[0] ** 2 + step[1] ** 2, abs(step[1]), step))
+
+    return steps
+
+  def getCost(self, index, label, box):
+    area = (box[2] - box[0]) * (box[3] - box[1])
+
+    cost = 0
+
+    for item in index.queryBox(box):
+      if item is label.item:
+        continue
+
+      segment = index.getSegment(item)
+
+      if segment is None:
+        (width, height) = optivis.spatial.getBoxOverlap(box, index.getBox(item))
+
+        if width > 0 and height > 0:
+          cost += width * height
+      elif optivis.spatial.segmentIntersectsBox(segment[0], segment[1], box):
+        cost += self.linkCost * area
+
+    return cost
+
+  def place(self):
+    """
+    Get list of (label, offset) for each label in the scene.
+    """
+
+    index = overlap.getIndex(self.scene, self.cellSize)
+
+    placements = []
+
+    fixedIds = set([id(label) for label in self.fixedLabels])
+
+    for label in self.getLabels():
+      size = self.textMetrics.getSize(label.getText(self.labelFlags))
+
+      # moving the offset translates the label's box by the offset change rotated by the
+      # item's label azimuth, so the box is only calculated once
+      labelBox = optivis.spatial.getBox(*label.getBoundingBox(size))
+
+      if id(label) in fixedIds:
+        index.addItem(label, labelBox, None, index.getBoxCells(labelBox))
+        placements.append((label, label.offset))
+
+        continue
+
+      itemAzimuth = math.radians(label.item.getLabelAzimuth())
+      (cos, sin) = (math.cos(itemAzimuth), math.sin(itemAzimuth))
+
+      best = None
+
+      for stepX, stepY in self.getCandidateSteps(size):
+        (x, y) = (stepX * cos - stepY * sin, stepX * sin + stepY * cos)
+        box = (labelBox[0] + x, labelBox[1] + y, labelBox[2] + x, labelBox[3] + y)
+
+        cost = self.getCost(index, label, box)
+
+        if best is None or cost < best[0]:
+          best = (cost, (stepX, stepY), box)
+
+          if cost == 0:
+            break
+
+      (cost, step, box) = best
+
+      # later labels avoid this one
+      index.addItem(label, box, None, index.getBoxCells(box))
+
+      placements.append((label, label.offset.translate(optivis.geometry.Coordinates(*step))))
+
+    return placements
+
+  def apply(self):
+    """
+    Set the offset of each label in the scene to its placed offset.
+    """
+
+    placements = self.place()
+
+    for label, offset in placements:
+      label.offset = offset
+
+    return placements
@@ -0,0 +1,270 @@
+from __future__ import unicode_literals, division
+
+import math
+
+import numpy
+
+import optivis.geometry
+import optivis.layout
+import partition
+import scale
+
+class ScaleOptimiser(object):
+  """
+  Finds a logarithmic scale function which makes a scene fit a target size and aspect
+  ratio, while drawing every link at least a minimum length.
+
+  A fork of the scene is laid out once to find how each component is placed relative to
+  the one before it, leaving the scene itself unchanged. Component positions are then a
+  linear function of the scaled link lengths, so candidate scale functions are tried by
+  recomputing the positions with array operations rather than laying the scene out
+  again. Layouts which adjust positions after placing components (e.g. SolvedLayout) are
+  approximated by their initial placement.
+
+  Only logarithmic scale functions are fitted, so the layout's scale function must be
+  logarithmic or linear (see checkScaleFunction()). Cancelling the layout stops the fit,
+  raising LayoutCancelledException.
+  """
+
+  def __init__(self, layout, targetSize, minimumLinkLength=10, kneeCount=40):
+    """
+    layout is a layout manager instance for the scene to fit
+    targetSize is the size, in scaled length units, to fit the scene to
+    minimumLinkLength is the shortest length, in scaled length units, to draw any link
+    kneeCount is the number of knee lengths of the logarithmic scale to try
+    """
+
+    self.checkScaleFunction(layout.scaleFunc)
+
+    self.layout = layout
+    self.targetSize = targetSize
+    self.minimumLinkLength = minimumLinkLength
+    self.kneeCount = kneeCount
+
+  @property
+  def targetSize(self):
+    return self.__targetSize
+
+  @targetSize.setter
+  def targetSize(self, targetSize):
+    if not isinstance(targetSize, optivis.geometry.Coordinates):
+      raise Exception('Specified target size is not of type optivis.geometry.Coordinates')
+
+    if targetSize.x <= 0 or targetSize.y <= 0:
+      raise Exception('Specified target size must be positive')
+
+    self.__targetSize = targetSize
+
+  @staticmethod
+  def checkScaleFunction(scaleFunc):
+    """
+    Raise an exception if scaleFunc isn't a logarithmic or linear scale function. The
+    fitted function is logarithmic, which includes linear functions in the limit of a long
+    knee, so other kinds of function (e.g. piecewise) can't be fitted.
+    """
+
+    if isinstance(scaleFunc, scale.LogScaleFunction):
+      return
+
+    if type(scaleFunc) is scale.ScaleFunction and len(scaleFunc.coefficients) <= 2 and scaleFunc.coefficients[0] == 0:
+      return
+
+    raise Exception('Only logarithmic scale functions can be fitted, so the {0} used by the layout can\'t be. Use a LogScaleFunction, or a linear ScaleFunction, to fit the scene.'.format(scaleFunc.__class__.__name__))
+
+  def checkCancelled(self, *args):
+    """
+    Raise LayoutCancelledException if the layout has been cancelled. Arguments are ignored,
+    so this can be used as a layout progress callback.
+    """
+
+    if self.layout.cancelled:
+      raise optivis.layout.LayoutCancelledException('Fitting the scale of scene {0} was cancelled'.format(self.layout.scene.title))
+
+  def optimise(self):
+    """
+    Get the scale function which best fits the scene to the target size.
+    """
+
+    scene = self.layout.scene
+
+    lengths = numpy.array([link.length for link in scene.links], dtype=float)
+    lengths = lengths[lengths > 0]
+
+    if len(lengths) == 0:
+      # nothing to scale
+      return scale.ScaleFunction()
+
+    self.prepare()
+
+    # knees between the shortest and longest links, and one far beyond the longest to
+    # allow an effectively linear scale
+    knees = numpy.append(numpy.logspace(math.log10(lengths.min()), math.log10(lengths.max()), self.kneeCount), 1000 * lengths.max())
+
+    best = None
+
+    for knee in knees:
+      self.checkCancelled()
+
+      unitScale = scale.LogScaleFunction(scale=1, knee=knee)
+
+      # component positions for scale = 1, which scale linearly with the scale
+      unitPositions = self.getPositions(unitScale.getScaledLengths(self.placedLengths)) - self.offsets
+
+      # largest scale that fits the target, but at least enough to make short links visible
+      thisScale = max(self.getFittingScale(unitPositions), self.minimumLinkLength / float(numpy.min(unitScale.getScaledLengths(lengths))))
+
+      size = self.getSize(self.offsets + thisScale * unitPositions)
+
+      (widthRatio, heightRatio) = (size.x / self.targetSize.x, size.y / self.targetSize.y)
+
+      # prefer scales that fit the target, then those that fill more of it
+      cost = (max(1, widthRatio, heightRatio), -min(1, widthRatio) * min(1, heightRatio))
+
+      if best is None or cost < best[0]:
+        best = (cost, thisScale, knee)
+
+    (cost, thisScale, knee) = best
+
+    return scale.LogScaleFunction(scale=thisScale, knee=knee)
+
+  def prepare(self):
+    """
+    Lay out a fork of the scene to find how components are placed, and set up the arrays
+    used to recompute their positions.
+    """
+
+    scene = self.layout.scene.fork()
+
+    # layout in this process, with an unscaled function, so that placed links are known,
+    # stopping if the layout is cancelled
+    probe = self.layout.__class__(scene, scaleFunc=scale.ScaleFunction(), progressCallback=self.checkCancelled)
+    probe.parallelLinkThreshold = float('inf')
+    probe.arrange()
+
+    components = scene.getComponents()
+    componentIndices = dict((id(component), i) for i, component in enumerate(components))
+
+    # extent of each component's bounding box relative to its position
+    self.lowerExtents = numpy.empty((len(components), 2))
+    self.upperExtents = numpy.empty((len(components), 2))
+
+    for i, component in enumerate(components):
+      (lowerBound, upperBound) = component.getBoundingBox()
+
+      self.lowerExtents[i] = (lowerBound.x - component.position.x, lowerBound.y - component.position.y)
+      self.upperExtents[i] = (upperBound.x - component.position.x, upperBound.y - component.position.y)
+
+    # group placed links by depth from their partition's reference, so each depth can be
+    # placed in one operation
+    depths = numpy.zeros(len(components), dtype=int)
+
+    for link, referenceComponent, targetComponent, offset, direction in probe.placedLinks:
+      depths[componentIndices[id(targetComponent)]] = depths[componentIndices[id(referenceComponent)]] + 1
+
+    placedDepths = numpy.array([depths[componentIndices[id(placedLink[2])]] for placedLink in probe.placedLinks], dtype=int)
+
+    self.placedLengths = numpy.array([placedLink[0].length for placedLink in probe.placedLinks], dtype=float)
+    self.levels = []
+
+    for depth in range(1, depths.max() + 1):
+      indices = numpy.flatnonzero(placedDepths == depth)
+
+      placedLinks = [probe.placedLinks[i] for i in indices]
+
+      self.levels.append((
+        indices,
+        numpy.array([componentIndices[id(placedLink[1])] for placedLink in placedLinks], dtype=int),
+        numpy.array([componentIndices[id(placedLink[2])] for placedLink in placedLinks], dtype=int),
+        numpy.array([(placedLink[3].x, placedLink[3].y) for placedLink in placedLinks], dtype=float).reshape(-1, 2),
+        numpy.array([(placedLink[4].x, placedLink[4].y) for placedLink in placedLinks], dtype=float).reshape(-1, 2)
+      ))
+
+    # component order and group starts for finding partition bounding boxes
+    partitionIndices = numpy.zeros(len(components), dtype=int)
+
+    for i, thisPartition in enumerate(probe.partitions):
+      for component in thisPartition.components:
+        partitionIndices[componentIndices[id(component)]] = i
+
+    self.partitionOrder = numpy.argsort(partitionIndices, kind='mergesort')
+    self.partitionStarts = numpy.flatnonzero(numpy.diff(numpy.concatenate(([-1], partitionIndices[self.partitionOrder]))))
+    self.partitionSpacing = probe.partitionSpacing
+
+    # positions with zero length links
+    self.offsets = self.getPositions(numpy.zeros(len(self.placedLengths)))
+
+  def getPositions(self, scaledLengths):
+    """
+    Get array of component positions for the specified scaled lengths of the placed
+    links, relative to the reference of each partition.
+    """
+
+    positions = numpy.zeros(self.lowerExtents.shape)
+
+    for indices, references, targets, offsets, directions in self.levels:
+      positions[targets] = positions[references] + offsets + scaledLengths[indices, numpy.newaxis] * directions
+
+    return positions
+
+  def getSize(self, positions):
+    """
+    Get size of the packed scene with components at the specified positions.
+    """
+
+    lowerBounds = numpy.minimum.reduceat((positions + self.lowerExtents)[self.partitionOrder], self.partitionStarts, axis=0)
+    upperBounds = numpy.maximum.reduceat((positions + self.upperExtents)[self.partitionOrder], self.partitionStarts, axis=0)
+
+    sizes = upperBounds - lowerBounds
+
+    if len(sizes) == 1:
+      return optivis.geometry.Coordinates(*sizes[0])
+
+    sizes = [optivis.geometry.Coordinates(*size) for size in sizes]
+    packedPositions = partition.packRectangles(sizes, self.partitionSpacing)
+
+    return optivis.geometry.Coordinates(max(position.x + size.x for position, size in zip(packedPositions, sizes)), max(position.y + size.y for position, size in zip(packedPositions, sizes)))
+
+  def fits(self, positions):
+    size = self.getSize(positions)
+
+    return size.x <= self.targetSize.x and size.y <= self.targetSize.y
+
+  def getFittingScale(self, unitPositions, iterations=20):
+    """
+    Find the largest scale at which the scene fits the target size, by bisection.
+    """
+
+    if not self.fits(self.offsets):
+      # components alone don't fit
+      return 0
+
+    # start from the scale at which the unscaled positions span the target
+    span = numpy.ptp(unitPositions, axis=0)
+
+    if not numpy.any(span > 0):
+      # scene doesn't grow with scale, so leave it to the minimum link length
+      return 0
+
+    guess = min(self.targetSize.x, self.targetSize.y) / float(numpy.max(span))
+
+    # bracket the largest scale that fits
+    if self.fits(self.offsets + guess * unitPositions):
+      (lower, upper) = (guess, 2 * guess)
+
+      while self.fits(self.offsets + upper * unitPositions):
+        (lower, upper) = (upper, 2 * upper)
+    else:
+      (lower, upper) = (guess / 2, guess)
+
+      while not self.fits(self.offsets + lower * unitPositions):
+        (lower, upper) = (lower / 2, lower)
+
+    for i in range(iterations):
+      middle = (lower + upper) / 2
+
+      if self.fits(self.offsets + middle * unitPositions):
+        lower = middle
+      else:
+        upper = middle
+
+    return lower
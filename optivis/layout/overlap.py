@@ -0,0 +1,94 @@
+from __future__ import unicode_literals, division
+
+import optivis.spatial
+
+class Overlap(object):
+  """
+  Pair of overlapping bench items, and the size of the overlap (for two components, the
+  smaller dimension of the intersection of their bounding boxes; otherwise the size of
+  the component the link crosses, or 0 for two crossing links).
+  """
+
+  def __init__(self, itemA, itemB, size):
+    self.itemA = itemA
+    self.itemB = itemB
+    self.size = size
+
+  def getComponents(self):
+    return [item for item in (self.itemA, self.itemB) if not isLink(item)]
+
+  def __str__(self):
+    return "{0} overlaps {1}".format(self.itemA, self.itemB)
+
+def isLink(item):
+  import optivis.bench.links
+
+  return isinstance(item, optivis.bench.links.AbstractLink)
+
+def getIndex(scene, cellSize=None):
+  """
+  Create a spatial index of the scene's component bounding boxes and link segments.
+  """
+
+  components = scene.getComponents()
+  boxes = [optivis.spatial.getBox(*component.getBoundingBox()) for component in components]
+
+  if cellSize is None:
+    cellSize = optivis.spatial.getCellSize(boxes)
+
+  index = optivis.spatial.GridIndex(cellSize)
+
+  for component, box in zip(components, boxes):
+    index.addItem(component, box, None, index.getBoxCells(box))
+
+  for link in scene.links:
+    index.insertSegment(link, link.start, link.end)
+
+  return index
+
+def getOverlaps(scene, cellSize=None, tolerance=1e-6):
+  """
+  Get list of Overlaps between components, components and the links passing through
+  them, and crossing links. Links are not counted as overlapping the components they
+  link, or links sharing a component with them.
+  """
+
+  index = getIndex(scene, cellSize)
+
+  # python object ids of the components of each link, which also marks items as links
+  linkComponents = dict((id(link), (id(link.outputNode.component), id(link.inputNode.component))) for link in scene.links)
+
+  overlaps = []
+
+  for itemA, itemB in index.getCandidatePairs():
+    if id(itemA) in linkComponents and id(itemB) not in linkComponents:
+      (itemA, itemB) = (itemB, itemA)
+
+    if id(itemB) not in linkComponents:
+      # two components
+      (width, height) = optivis.spatial.getBoxOverlap(index.getBox(itemA), index.getBox(itemB))
+
+      if width > tolerance and height > tolerance:
+        overlaps.append(Overlap(itemA, itemB, min(width, height)))
+    elif id(itemA) not in linkComponents:
+      # component and link
+      if id(itemA) in linkComponents[id(itemB)]:
+        continue
+
+      box = index.getBox(itemA)
+      (start, end) = index.getSegment(itemB)
+
+      if optivis.spatial.segmentIntersectsBox(start, end, box, tolerance):
+        overlaps.append(Overlap(itemA, itemB, max(box[2] - box[0], box[3] - box[1])))
+    else:
+      # two links
+      if any(componentId in linkComponents[id(itemB)] for componentId in linkComponents[id(itemA)]):
+        continue
+
+      (startA, endA) = index.getSegment(itemA)
+      (startB, endB) = index.getSegment(itemB)
+
+      if optivis.spatial.segmentsIntersect(startA, endA, startB, endB, tolerance):
+        overlaps.append(Overlap(itemA, itemB, 0))
+
+  return overlaps
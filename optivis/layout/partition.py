@@ -0,0 +1,166 @@
+from __future__ import unicode_literals, division
+
+import math
+
+import optivis.geometry
+
+class Partition(object):
+  """
+  Connected part of a scene: a set of components linked to each other, but not to any
+  other components in the scene.
+  """
+
+  def __init__(self, components, links, constraints, reference):
+    self.components = components
+    self.links = links
+    self.constraints = constraints
+    self.reference = reference
+
+  def getScene(self, title):
+    """
+    Create a scene containing only this partition's links and constraints.
+    """
+
+    import optivis.scene
+
+    return optivis.scene.Scene(title=title, reference=self.reference, links=list(self.links), constraints=list(self.constraints))
+
+  def getBoundingBox(self):
+    lowerBound = optivis.geometry.Coordinates(float('inf'), float('inf'))
+    upperBound = optivis.geometry.Coordinates(float('-inf'), float('-inf'))
+
+    for component in self.components:
+      (thisLowerBound, thisUpperBound) = component.getBoundingBox()
+
+      if thisLowerBound.x < lowerBound.x: lowerBound.x = thisLowerBound.x
+      if thisLowerBound.y < lowerBound.y: lowerBound.y = thisLowerBound.y
+      if thisUpperBound.x > upperBound.x: upperBound.x = thisUpperBound.x
+      if thisUpperBound.y > upperBound.y: upperBound.y = thisUpperBound.y
+
+    return (lowerBound, upperBound)
+
+  def translate(self, offset):
+    for component in self.components:
+      component.position = component.position.translate(offset)
+
+    for link in self.links:
+      link.start = link.start.translate(offset)
+      link.end = link.end.translate(offset)
+
+def getPartitions(scene):
+  """
+  Split scene into partitions of linked components, in the order their first links
+  appear in the scene. The partition containing the scene reference uses it as its
+  reference; the others use the output component of their first link.
+  """
+
+  # union-find over python object ids of components
+  parents = {}
+
+  def find(componentId):
+    root = componentId
+
+    while parents[root] != root:
+      root = parents[root]
+
+    # compress path
+    while parents[componentId] != root:
+      (parents[componentId], componentId) = (root, parents[componentId])
+
+    return root
+
+  for link in scene.links:
+    for component in link.getComponents():
+      parents.setdefault(id(component), id(component))
+
+    outputRoot = find(id(link.outputNode.component))
+    inputRoot = find(id(link.inputNode.component))
+
+    if outputRoot != inputRoot:
+      parents[inputRoot] = outputRoot
+
+  # group items by root, keeping scene order
+  partitionIndices = {}
+  groups = []
+
+  def getGroup(component):
+    root = find(id(component))
+
+    if root not in partitionIndices:
+      partitionIndices[root] = len(groups)
+      groups.append(([], [], []))
+
+    return groups[partitionIndices[root]]
+
+  for component in scene.getComponents():
+    getGroup(component)[0].append(component)
+
+  for link in scene.links:
+    getGroup(link.outputNode.component)[1].append(link)
+
+  for constraint in scene.constraints:
+    getGroup(constraint.linkA.outputNode.component)[2].append(constraint)
+
+  partitions = []
+
+  for (components, links, constraints) in groups:
+    if any(component is scene.reference for component in components):
+      reference = scene.reference
+    else:
+      reference = links[0].outputNode.component
+
+    partitions.append(Partition(components, links, constraints, reference))
+
+  return partitions
+
+def packRectangles(sizes, spacing=0):
+  """
+  Pack rectangles of the specified sizes into rows (shelves), tallest first, aiming for a
+  roughly square result. Returns the position of the top left corner of each rectangle.
+  """
+
+  if len(sizes) == 0:
+    return []
+
+  # aim for rows about as wide as the square root of the total area, but at least as wide as the widest rectangle
+  area = sum((size.x + spacing) * (size.y + spacing) for size in sizes)
+  rowWidth = max(max(size.x for size in sizes), math.sqrt(area))
+
+  positions = [None] * len(sizes)
+
+  x = 0
+  y = 0
+  rowHeight = 0
+
+  for i in sorted(range(len(sizes)), key=lambda i: sizes[i].y, reverse=True):
+    size = sizes[i]
+
+    if x > 0 and x + size.x > rowWidth:
+      # start a new row
+      x = 0
+      y += rowHeight + spacing
+      rowHeight = 0
+
+    positions[i] = optivis.geometry.Coordinates(x, y)
+
+    x += size.x + spacing
+    rowHeight = max(rowHeight, size.y)
+
+  return positions
+
+def layoutPartitionScene(args):
+  """
+  Lay out scene data created by optivis.serialisation.sceneToDict() and return its
+  geometry. Used to lay out partitions in worker processes.
+  """
+
+  import optivis.serialisation
+
+  (layoutManager, scaleFunc, sceneData) = args
+
+  scene = optivis.serialisation.sceneFromDict(sceneData)
+
+  layout = layoutManager(scene, scaleFunc=scaleFunc)
+  layout.arrange()
+
+  return scene.getGeometry()
@@ -0,0 +1,132 @@
+"""
+Registry of the layout managers available to views, by title.
+
+Layout managers in other packages are registered either by calling register() (which
+can also be used as a class decorator) or by declaring an entry point in the
+"optivis.layout" group of the package's setup.py:
+
+  entry_points={
+    'optivis.layout': ['mylayout = mypackage.layout:MyLayout']
+  }
+
+Entry points are loaded the first time the registered layout managers are listed.
+"""
+
+from __future__ import unicode_literals, division
+
+import inspect
+import threading
+from collections import OrderedDict
+
+# setuptools entry point group to load layout managers from
+ENTRY_POINT_GROUP = 'optivis.layout'
+
+class LayoutRegistry(object):
+  def __init__(self, entryPointGroup=ENTRY_POINT_GROUP):
+    """
+    entryPointGroup is the entry point group to load layout managers from, or None to
+    not load any
+    """
+
+    self.entryPointGroup = entryPointGroup
+
+    # layout manager classes by title, in registration order
+    self.layoutManagers = OrderedDict()
+
+    self.entryPointsLoaded = False
+
+    # views in different threads can list layout managers at the same time, so make sure
+    # entry points are only loaded once
+    self.entryPointLock = threading.Lock()
+
+  def register(self, layoutManager):
+    """
+    Register a layout manager class under its title, replacing any layout manager
+    already registered with that title. Returns the class, so this can be used as a
+    class decorator.
+    """
+
+    # imported here as the built in layout managers are registered while optivis.layout is
+    # still being imported
+    from optivis.layout import AbstractLayout
+
+    if not inspect.isclass(layoutManager) or not issubclass(layoutManager, AbstractLayout):
+      raise Exception('Specified layout manager class is not of type AbstractLayout')
+
+    if inspect.isabstract(layoutManager):
+      raise Exception('Specified layout manager class {0} is abstract'.format(layoutManager.__name__))
+
+    self.layoutManagers[layoutManager.title] = layoutManager
+
+    return layoutManager
+
+  def unregister(self, title):
+    if title not in self.layoutManagers:
+      raise Exception('No layout manager with title {0} is registered'.format(title))
+
+    del(self.layoutManagers[title])
+
+  def getEntryPoints(self):
+    """
+    Get list of the entry points declared in the group by installed packages.
+    """
+
+    if self.entryPointGroup is None:
+      return []
+
+    try:
+      import pkg_resources
+    except ImportError:
+      # setuptools is not installed, so there can't be any entry points
+      return []
+
+    return list(pkg_resources.iter_entry_points(self.entryPointGroup))
+
+  def loadEntryPoints(self):
+    """
+    Register the layout managers declared as entry points by installed packages.
+    """
+
+    with self.entryPointLock:
+      if self.entryPointsLoaded:
+        return
+
+      for entryPoint in self.getEntryPoints():
+        # a broken plugin shouldn't stop the built in layout managers being used
+        try:
+          self.register(entryPoint.load())
+        except Exception as e:
+          print "[Layout] Could not load layout manager {0}: {1}".format(entryPoint, e)
+
+      self.entryPointsLoaded = True
+
+  def getLayoutManagerClasses(self):
+    """
+    Get list of registered layout manager classes, in registration order.
+    """
+
+    if not self.entryPointsLoaded:
+      self.loadEntryPoints()
+
+    return self.layoutManagers.values()
+
+  def getLayoutManagerClass(self, title):
+    if not self.entryPointsLoaded:
+      self.loadEntryPoints()
+
+    if title not in self.layoutManagers:
+      raise Exception('No layout manager with title {0} is registered. Registered layout managers: {1}'.format(title, ', '.join(self.layoutManagers.keys())))
+
+    return self.layoutManagers[title]
+
+# registry used by views
+registry = LayoutRegistry()
+
+def register(layoutManager):
+  return registry.register(layoutManager)
+
+def getLayoutManagerClasses():
+  return registry.getLayoutManagerClasses()
+
+def getLayoutManagerClass(title):
+  return registry.getLayoutManagerClass(title)
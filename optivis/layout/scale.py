@@ -1,24 +1,104 @@
 from __future__ import unicode_literals, division
+
 import numpy
 
-class ScaleFunction(object):  
-  def __init__(self, coefficients=None):    
+class ScaleFunction(object):
+  """
+  Polynomial function mapping link lengths to the lengths they are drawn with.
+
+  Coefficients are in order of increasing power, i.e. [a, b, c] gives
+  a + b * length + c * length ** 2.
+  """
+
+  # maximum number of scaled lengths remembered by getScaledLength()
+  cacheSize = 10000
+
+  def __init__(self, coefficients=None):
     if coefficients is None:
       coefficients = [0, 1]
-    
+
     self.coefficients = coefficients
-  
+
   def getScaledLength(self, length):
-    scaledLength = 0
-    
-    for i in range(0, len(self.coefficients)):
-      scaledLength += self.coefficients[i] * length ** i
-    
+    # scenes tend to have many links of the same length, so remember scaled lengths
+    cache = self.getCache()
+
+    scaledLength = cache.get(length)
+
+    if scaledLength is None:
+      if len(cache) >= self.cacheSize:
+        cache.clear()
+
+      # returned from here rather than the cache, which another thread may clear first
+      scaledLength = float(self.getScaledLengths([length])[0])
+      cache[length] = scaledLength
+
     return scaledLength
-  
-  def validate(self):
-    roots = numpy.roots(numpy.polyder(self.coefficients))
-    
+
+  def getScaledLengths(self, lengths):
+    """
+    Get array of scaled lengths for the specified array of lengths.
+    """
+
+    # polyval takes coefficients in order of decreasing power
+    return numpy.polyval(self.coefficients[::-1], numpy.asarray(lengths, dtype=float))
+
+  def getCache(self):
+    # created on first use so that subclasses don't need to call this constructor
+    if getattr(self, '_cache', None) is None:
+      self._cache = {}
+
+    return self._cache
+
+  def clearCache(self):
+    self._cache = None
+
+  def getParameters(self):
+    """
+    Get list of the parameters defining this function.
+    """
+
+    return list(self.coefficients)
+
+  def validate(self, lengths=None):
+    """
+    Check that the function increases monotonically over the range of the specified
+    lengths (or over all positive lengths if none are specified), so that longer links
+    are never drawn shorter than shorter links.
+    """
+
+    (minimum, maximum) = self.getRange(lengths)
+
+    # derivative, in order of decreasing power
+    derivative = numpy.polyder(numpy.array(self.coefficients[::-1], dtype=float))
+
+    # real turning points inside the range
+    roots = numpy.roots(derivative) if len(derivative) > 1 else numpy.array([])
+    roots = roots[numpy.abs(roots.imag) < 1e-12].real
+    roots = roots[(roots > minimum) & (roots < maximum)]
+
+    points = numpy.concatenate(([minimum], numpy.sort(roots)))
+
+    if numpy.isfinite(maximum):
+      points = numpy.append(points, maximum)
+    else:
+      points = numpy.append(points, points[-1] + 1)
+
+    # the derivative has the same sign between turning points, so check it between each
+    if len(points) > 1:
+      points = (points[:-1] + points[1:]) / 2
+
+    if numpy.any(numpy.polyval(derivative, points) <= 0):
+      raise Exception('Scale function is not monotonically increasing between {0} and {1}'.format(minimum, maximum))
+
+  def getRange(self, lengths=None):
+    if lengths is None or len(lengths) == 0:
+      return (0, float('inf'))
+
+    lengths = numpy.asarray(lengths, dtype=float)
+
+    return (float(numpy.min(lengths)), float(numpy.max(lengths)))
+
   @property
   def coefficients(self):
     return self.__coefficients
@@ -27,9 +107,132 @@ class ScaleFunction(object):
   def coefficients(self, coefficients):
     if not isinstance(coefficients, (list, tuple)):
       raise Exception('Specified coefficients is not a list or tuple')
-    
+
     self.__coefficients = coefficients
 
+    self.clearCache()
+
 class LargeLengthScaleFunction(ScaleFunction):
   def __init__(self):
-    return super(LargeLengthScaleFunction, self).__init__(coefficients=[0, 0.3])
\ No newline at end of file
+    return super(LargeLengthScaleFunction, self).__init__(coefficients=[0, 0.3])
+
+class LogScaleFunction(ScaleFunction):
+  """
+  Logarithmic scale function, scale * knee * ln(1 + length / knee). Lengths much
+  shorter than knee are multiplied by scale, and longer lengths are compressed.
+  """
+
+  def __init__(self, scale=1, knee=100):
+    self.scale = scale
+    self.knee = knee
+
+  def getScaledLengths(self, lengths):
+    return self.scale * self.knee * numpy.log1p(numpy.asarray(lengths, dtype=float) / self.knee)
+
+  def getParameters(self):
+    return [self.scale, self.knee]
+
+  def validate(self, lengths=None):
+    (minimum, maximum) = self.getRange(lengths)
+
+    if minimum <= -self.knee:
+      raise Exception('Scale function is not defined for lengths of {0} or less'.format(-self.knee))
+
+  @property
+  def scale(self):
+    return self.__scale
+
+  @scale.setter
+  def scale(self, scale):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    scale = float(scale)
+
+    if scale <= 0:
+      raise Exception('Scale must be greater than 0')
+
+    self.__scale = scale
+
+    self.clearCache()
+
+  @property
+  def knee(self):
+    return self.__knee
+
+  @knee.setter
+  def knee(self, knee):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    knee = float(knee)
+
+    if knee <= 0:
+      raise Exception('Knee length must be greater than 0')
+
+    self.__knee = knee
+
+    self.clearCache()
+
+class PiecewiseScaleFunction(ScaleFunction):
+  """
+  Piecewise linear scale function through a list of (length, scaled length) points.
+  Lengths outside the points are extrapolated from the first or last piece.
+  """
+
+  def __init__(self, points):
+    self.points = points
+
+  def getScaledLengths(self, lengths):
+    lengths = numpy.asarray(lengths, dtype=float)
+
+    (pointLengths, pointScaledLengths) = (self.pointLengths, self.pointScaledLengths)
+
+    scaledLengths = numpy.interp(lengths, pointLengths, pointScaledLengths)
+
+    # numpy.interp holds the end values, so extrapolate outside the points
+    firstSlope = (pointScaledLengths[1] - pointScaledLengths[0]) / (pointLengths[1] - pointLengths[0])
+    lastSlope = (pointScaledLengths[-1] - pointScaledLengths[-2]) / (pointLengths[-1] - pointLengths[-2])
+
+    below = lengths < pointLengths[0]
+    above = lengths > pointLengths[-1]
+
+    scaledLengths[below] = pointScaledLengths[0] + firstSlope * (lengths[below] - pointLengths[0])
+    scaledLengths[above] = pointScaledLengths[-1] + lastSlope * (lengths[above] - pointLengths[-1])
+
+    return scaledLengths
+
+  def getParameters(self):
+    return [list(point) for point in self.points]
+
+  def validate(self, lengths=None):
+    (minimum, maximum) = self.getRange(lengths)
+
+    # pieces covering the range, including the extrapolated ends
+    starts = numpy.concatenate(([float('-inf')], self.pointLengths[1:-1]))
+    ends = numpy.concatenate((self.pointLengths[1:-1], [float('inf')]))
+    slopes = numpy.diff(self.pointScaledLengths) / numpy.diff(self.pointLengths)
+
+    used = (ends >= minimum) & (starts <= maximum)
+
+    if numpy.any(slopes[used] <= 0):
+      raise Exception('Scale function is not monotonically increasing between {0} and {1}'.format(minimum, maximum))
+
+  @property
+  def points(self):
+    return self.__points
+
+  @points.setter
+  def points(self, points):
+    points = [(float(length), float(scaledLength)) for length, scaledLength in points]
+
+    if len(points) < 2:
+      raise Exception('At least two points are required')
+
+    points = sorted(points)
+
+    if any(points[i][0] == points[i + 1][0] for i in range(len(points) - 1)):
+      raise Exception('Points must have different lengths')
+
+    self.__points = points
+
+    self.pointLengths = numpy.array([point[0] for point in points])
+    self.pointScaledLengths = numpy.array([point[1] for point in points])
+
+    self.clearCache()
@@ -0,0 +1,414 @@
+from __future__ import unicode_literals, division
+
+import math
+import heapq
+
+import numpy
+
+import optivis.geometry
+
+class LinkSystem(object):
+  """
+  System of equations relating the positions and azimuths of linked components.
+
+  Each link requires its input node to lie at its scaled length from its output node,
+  along the output node's azimuth, and requires both nodes to have the same absolute
+  azimuth. Angles of incidence (including those set by constraints) are taken from the
+  components as they are, so constraints are satisfied when the equations are.
+
+  The state of the system is a vector of (x, y, azimuth in radians) for each component.
+  """
+
+  def __init__(self, links, scaleFunc, linkNudges=None):
+    """
+    linkNudges, if specified, is a dict of extra lengths to add to the scaled lengths of
+    links, by python object id of the link.
+    """
+
+    self.links = links
+
+    # components in link order, and their indices in the state vector
+    self.components = []
+    self.componentIndices = {}
+
+    for link in links:
+      for component in (link.outputNode.component, link.inputNode.component):
+        if id(component) not in self.componentIndices:
+          self.componentIndices[id(component)] = len(self.components)
+          self.components.append(component)
+
+    # output (A) and input (B) component indices for each link
+    self.indicesA = numpy.array([self.componentIndices[id(link.outputNode.component)] for link in links], dtype=int)
+    self.indicesB = numpy.array([self.componentIndices[id(link.inputNode.component)] for link in links], dtype=int)
+
+    # node positions relative to component centres, before rotation
+    self.nodePositionsA = numpy.array([[link.outputNode.position.x * link.outputNode.component.size.x, link.outputNode.position.y * link.outputNode.component.size.y] for link in links], dtype=float).reshape(-1, 2)
+    self.nodePositionsB = numpy.array([[link.inputNode.position.x * link.inputNode.component.size.x, link.inputNode.position.y * link.inputNode.component.size.y] for link in links], dtype=float).reshape(-1, 2)
+
+    # node azimuths relative to component azimuths
+    self.nodeAzimuthsA = numpy.radians([link.outputNode.getNodeAzimuth() for link in links])
+    self.nodeAzimuthsB = numpy.radians([link.inputNode.getNodeAzimuth() for link in links])
+
+    self.lengths = numpy.asarray(scaleFunc.getScaledLengths([link.length for link in links]), dtype=float).reshape(-1)
+
+    if linkNudges is not None:
+      self.lengths += [linkNudges.get(id(link), 0) for link in links]
+
+    # weight of azimuth residuals (in radians) relative to position residuals
+    if len(links) > 0 and numpy.mean(self.lengths) > 0:
+      self.azimuthWeight = numpy.mean(self.lengths)
+    else:
+      self.azimuthWeight = 1
+
+  def getState(self):
+    state = numpy.empty(3 * len(self.components))
+
+    for i, component in enumerate(self.components):
+      state[3 * i] = component.position.x
+      state[3 * i + 1] = component.position.y
+      state[3 * i + 2] = math.radians(component.azimuth)
+
+    return state
+
+  def setState(self, state):
+    """
+    Set component positions and azimuths from the state, and draw links between their
+    nodes.
+    """
+
+    for i, component in enumerate(self.components):
+      component.position = optivis.geometry.Coordinates(float(state[3 * i]), float(state[3 * i + 1]))
+      component.azimuth = math.degrees(state[3 * i + 2])
+
+    for link in self.links:
+      link.start = link.outputNode.getAbsolutePosition()
+      link.end = link.inputNode.getAbsolutePosition()
+
+  def getResiduals(self, state):
+    """
+    Get position residuals, as an array of (x, y) for each link, and azimuth residuals
+    in radians for each link.
+    """
+
+    (xA, yA, azimuthA) = (state[3 * self.indicesA], state[3 * self.indicesA + 1], state[3 * self.indicesA + 2])
+    (xB, yB, azimuthB) = (state[3 * self.indicesB], state[3 * self.indicesB + 1], state[3 * self.indicesB + 2])
+
+    (cosA, sinA) = (numpy.cos(azimuthA), numpy.sin(azimuthA))
+    (cosB, sinB) = (numpy.cos(azimuthB), numpy.sin(azimuthB))
+
+    (nodeXA, nodeYA) = (self.nodePositionsA[:, 0], self.nodePositionsA[:, 1])
+    (nodeXB, nodeYB) = (self.nodePositionsB[:, 0], self.nodePositionsB[:, 1])
+
+    linkAzimuth = azimuthA + self.nodeAzimuthsA
+
+    positionResiduals = numpy.empty((len(self.links), 2))
+    positionResiduals[:, 0] = xB + cosB * nodeXB - sinB * nodeYB - xA - cosA * nodeXA + sinA * nodeYA - self.lengths * numpy.cos(linkAzimuth)
+    positionResiduals[:, 1] = yB + sinB * nodeXB + cosB * nodeYB - yA - sinA * nodeXA - cosA * nodeYA - self.lengths * numpy.sin(linkAzimuth)
+
+    # wrap azimuth differences into [-pi, pi)
+    azimuthResiduals = (azimuthB + self.nodeAzimuthsB - linkAzimuth + math.pi) % (2 * math.pi) - math.pi
+
+    return (positionResiduals, azimuthResiduals)
+
+  def getResidualVector(self, state):
+    (positionResiduals, azimuthResiduals) = self.getResiduals(state)
+
+    return numpy.concatenate((positionResiduals[:, 0], positionResiduals[:, 1], self.azimuthWeight * azimuthResiduals))
+
+  def getJacobians(self, state):
+    """
+    Get the derivatives of each link's (x, y, weighted azimuth) residuals with respect to
+    the (x, y, azimuth) of its output (A) and input (B) components, as two arrays of
+    3 x 3 blocks with one block for each link.
+    """
+
+    count = len(self.links)
+
+    (azimuthA, azimuthB) = (state[3 * self.indicesA + 2], state[3 * self.indicesB + 2])
+
+    (cosA, sinA) = (numpy.cos(azimuthA), numpy.sin(azimuthA))
+    (cosB, sinB) = (numpy.cos(azimuthB), numpy.sin(azimuthB))
+
+    (nodeXA, nodeYA) = (self.nodePositionsA[:, 0], self.nodePositionsA[:, 1])
+    (nodeXB, nodeYB) = (self.nodePositionsB[:, 0], self.nodePositionsB[:, 1])
+
+    linkAzimuth = azimuthA + self.nodeAzimuthsA
+
+    jacobiansA = numpy.zeros((count, 3, 3))
+    jacobiansA[:, 0, 0] = -1
+    jacobiansA[:, 0, 2] = sinA * nodeXA + cosA * nodeYA + self.lengths * numpy.sin(linkAzimuth)
+    jacobiansA[:, 1, 1] = -1
+    jacobiansA[:, 1, 2] = -cosA * nodeXA + sinA * nodeYA - self.lengths * numpy.cos(linkAzimuth)
+    jacobiansA[:, 2, 2] = -self.azimuthWeight
+
+    jacobiansB = numpy.zeros((count, 3, 3))
+    jacobiansB[:, 0, 0] = 1
+    jacobiansB[:, 0, 2] = -sinB * nodeXB - cosB * nodeYB
+    jacobiansB[:, 1, 1] = 1
+    jacobiansB[:, 1, 2] = cosB * nodeXB - sinB * nodeYB
+    jacobiansB[:, 2, 2] = self.azimuthWeight
+
+    return (jacobiansA, jacobiansB)
+
+  def getNormalEquations(self, state, residuals):
+    """
+    Get the gradient (J^T r) and Gauss-Newton Hessian (J^T J) of the residuals in blocks:
+    an array of the gradient of each component, an array of the diagonal Hessian block
+    of each component and a dict of the off-diagonal blocks by (i, j) component index
+    pair with i < j. A component's block only couples to the components it is linked to,
+    so the Hessian is as sparse as the scene.
+    """
+
+    (jacobiansA, jacobiansB) = self.getJacobians(state)
+
+    # residuals of each link as rows of (x, y, weighted azimuth)
+    linkResiduals = residuals.reshape(3, -1).T
+
+    gradient = numpy.zeros((len(self.components), 3))
+    numpy.add.at(gradient, self.indicesA, numpy.einsum('lki,lk->li', jacobiansA, linkResiduals))
+    numpy.add.at(gradient, self.indicesB, numpy.einsum('lki,lk->li', jacobiansB, linkResiduals))
+
+    diagonal = numpy.zeros((len(self.components), 3, 3))
+    numpy.add.at(diagonal, self.indicesA, numpy.einsum('lki,lkj->lij', jacobiansA, jacobiansA))
+    numpy.add.at(diagonal, self.indicesB, numpy.einsum('lki,lkj->lij', jacobiansB, jacobiansB))
+
+    # blocks coupling the lower to the higher component index of each link
+    swapped = self.indicesA > self.indicesB
+    (lower, upper) = (numpy.where(swapped[:, None, None], jacobiansB, jacobiansA), numpy.where(swapped[:, None, None], jacobiansA, jacobiansB))
+
+    blocks = numpy.einsum('lki,lkj->lij', lower, upper)
+    pairs = numpy.column_stack((numpy.minimum(self.indicesA, self.indicesB), numpy.maximum(self.indicesA, self.indicesB)))
+
+    offDiagonal = {}
+
+    for (i, j), block in zip(pairs.tolist(), blocks):
+      if (i, j) in offDiagonal:
+        # components linked more than once
+        offDiagonal[(i, j)] = offDiagonal[(i, j)] + block
+      else:
+        offDiagonal[(i, j)] = block
+
+    return (gradient, diagonal, offDiagonal)
+
+  def getLinearEstimate(self, state, free):
+    """
+    Get a state with the azimuths, and then the positions, that best satisfy the links
+    when all other terms are held. Each is linear in the quantity being changed, so
+    each is found by a single solve, which spreads out errors (e.g. those of a loop
+    that does not close) that damped least squares would take many small steps over.
+    free is an array of whether each component can move.
+    """
+
+    state = state.copy()
+
+    # graph Laplacian of the links between components that can move
+    degrees = numpy.zeros(len(self.components))
+    numpy.add.at(degrees, self.indicesA, 1)
+    numpy.add.at(degrees, self.indicesB, 1)
+
+    offDiagonal = {}
+
+    for i, j in zip(self.indicesA.tolist(), self.indicesB.tolist()):
+      if free[i] and free[j]:
+        key = (min(i, j), max(i, j))
+        offDiagonal[key] = offDiagonal.get(key, 0) - numpy.ones((1, 1))
+
+    # small regularisation keeps groups of components without a fixed one solvable
+    diagonal = (degrees[free] + 1e-9).reshape(-1, 1, 1)
+
+    indices = numpy.cumsum(free) - 1
+    offDiagonal = dict(((indices[i], indices[j]), block) for (i, j), block in offDiagonal.iteritems())
+
+    def getCorrections(residuals):
+      # minimise the sum of (residual + correction B - correction A) squared
+      gradient = numpy.zeros(len(self.components))
+      numpy.add.at(gradient, self.indicesB, residuals)
+      numpy.add.at(gradient, self.indicesA, -residuals)
+
+      corrections = numpy.zeros(len(self.components))
+      corrections[free] = solveBlockSystem(diagonal, offDiagonal, -gradient[free].reshape(-1, 1))[:, 0]
+
+      return corrections
+
+    (positionResiduals, azimuthResiduals) = self.getResiduals(state)
+    state[2::3] += getCorrections(azimuthResiduals)
+
+    (positionResiduals, azimuthResiduals) = self.getResiduals(state)
+    state[0::3] += getCorrections(positionResiduals[:, 0])
+    state[1::3] += getCorrections(positionResiduals[:, 1])
+
+    return state
+
+  def solve(self, fixedComponents, maxIterations=50, tolerance=1e-10):
+    """
+    Solve the system by damped least squares (Levenberg-Marquardt), starting from the
+    better of the current component positions and azimuths and their linear estimate.
+    The positions and azimuths of the specified components are held fixed.
+
+    Returns the number of iterations taken. Raises an exception, leaving the components
+    where they are, if the residuals are still being reduced after maxIterations.
+    """
+
+    state = self.getState()
+
+    free = numpy.ones(len(self.components), dtype=bool)
+
+    for component in fixedComponents:
+      if id(component) in self.componentIndices:
+        free[self.componentIndices[id(component)]] = False
+
+    freeIndices = numpy.flatnonzero(free)
+
+    residuals = self.getResidualVector(state)
+    cost = numpy.dot(residuals, residuals)
+
+    if cost > tolerance ** 2 and len(freeIndices) > 0:
+      newState = self.getLinearEstimate(state, free)
+
+      newResiduals = self.getResidualVector(newState)
+      newCost = numpy.dot(newResiduals, newResiduals)
+
+      if newCost < cost:
+        (state, residuals, cost) = (newState, newResiduals, newCost)
+
+    damping = 1e-3
+    iteration = 0
+    converged = cost <= tolerance ** 2 or len(freeIndices) == 0
+
+    while not converged and iteration < maxIterations:
+      iteration += 1
+
+      (gradient, hessian, offDiagonal) = self.getNormalEquations(state, residuals)
+
+      # equations of the components that can move, numbered in order
+      indices = numpy.cumsum(free) - 1
+      gradient = gradient[freeIndices]
+      hessian = hessian[freeIndices]
+      offDiagonal = dict(((indices[i], indices[j]), block) for (i, j), block in offDiagonal.iteritems() if free[i] and free[j])
+
+      diagonal = numpy.maximum(numpy.diagonal(hessian, axis1=1, axis2=2), tolerance)
+
+      improved = False
+
+      while not improved and damping < 1e12:
+        damped = hessian.copy()
+        damped[:, [0, 1, 2], [0, 1, 2]] += damping * diagonal
+
+        try:
+          step = solveBlockSystem(damped, offDiagonal, -gradient)
+        except numpy.linalg.LinAlgError:
+          damping *= 10
+          continue
+
+        newState = state.copy().reshape(-1, 3)
+        newState[freeIndices] += step
+        newState = newState.reshape(-1)
+
+        newResiduals = self.getResidualVector(newState)
+        newCost = numpy.dot(newResiduals, newResiduals)
+
+        if newCost < cost:
+          improved = True
+          damping /= 10
+        else:
+          damping *= 10
+
+      if not improved:
+        # no step reduces the residuals any further
+        converged = True
+        break
+
+      # stop when the residuals of a system that can't be solved exactly stop improving
+      converged = cost - newCost < 1e-9 * cost
+
+      (state, residuals, cost) = (newState, newResiduals, newCost)
+
+      if cost <= tolerance ** 2 or numpy.linalg.norm(step) < tolerance * (numpy.linalg.norm(state) + tolerance):
+        converged = True
+
+    if not converged:
+      raise Exception('Layout did not converge in {0} iterations (residual {1})'.format(iteration, math.sqrt(cost)))
+
+    self.setState(state)
+
+    return iteration
+
+def solveBlockSystem(diagonal, offDiagonal, vector):
+  """
+  Solve a symmetric system of equations made of square blocks, given as an array of the
+  diagonal blocks, a dict of the non-zero off-diagonal blocks by (i, j) block index pair
+  with i < j (the (j, i) block being its transpose), and an array of the rows of the
+  right hand side for each block.
+
+  Blocks are eliminated in turn, fewest neighbours first, so chains, loops and trees of
+  blocks are solved in time proportional to their size rather than its cube. Raises
+  numpy.linalg.LinAlgError if the system is singular.
+  """
+
+  diagonal = [numpy.array(block, dtype=float) for block in diagonal]
+  vector = numpy.array(vector, dtype=float)
+
+  # off-diagonal blocks of each row, by column
+  neighbours = [{} for block in diagonal]
+
+  for (i, j), block in offDiagonal.iteritems():
+    neighbours[i][j] = block
+    neighbours[j][i] = block.T
+
+  queue = [(len(blocks), i) for i, blocks in enumerate(neighbours)]
+  heapq.heapify(queue)
+
+  eliminated = [False] * len(diagonal)
+  order = []
+
+  while queue:
+    (degree, k) = heapq.heappop(queue)
+
+    # skip entries left behind when a row's neighbours changed
+    if eliminated[k] or degree != len(neighbours[k]):
+      continue
+
+    eliminated[k] = True
+
+    inverse = numpy.linalg.inv(diagonal[k])
+
+    if not numpy.all(numpy.isfinite(inverse)):
+      raise numpy.linalg.LinAlgError('Singular matrix')
+
+    blocks = neighbours[k]
+    rows = blocks.keys()
+
+    # subtract row k from the rows it's coupled to
+    for i in rows:
+      factor = numpy.dot(blocks[i].T, inverse)
+      vector[i] -= numpy.dot(factor, vector[k])
+
+      del neighbours[i][k]
+
+      for j in rows:
+        update = numpy.dot(factor, blocks[j])
+
+        if i == j:
+          diagonal[i] = diagonal[i] - update
+        elif i < j:
+          block = neighbours[i].get(j, 0) - update
+          neighbours[i][j] = block
+          neighbours[j][i] = block.T
+
+    for i in rows:
+      heapq.heappush(queue, (len(neighbours[i]), i))
+
+    order.append((k, inverse, blocks))
+
+  solution = numpy.zeros_like(vector)
+
+  # back substitute, in reverse order of elimination
+  for k, inverse, blocks in reversed(order):
+    value = vector[k].copy()
+
+    for j, block in blocks.iteritems():
+      value -= numpy.dot(block, solution[j])
+
+    solution[k] = numpy.dot(inverse, value)
+
+  return solution
@@ -0,0 +1,229 @@
+from __future__ import unicode_literals, division
+
+import json
+import hashlib
+
+import optivis.geometry
+
+class LayoutState(object):
+  """
+  Laid out geometry of a scene and the user's label offsets, keyed by stable item IDs
+  so that it can be saved and applied to the same scene when it is next opened.
+
+  The state also holds a fingerprint of everything the layout depends on (components,
+  links and their lengths, angles of incidence, constraints, reference, layout manager
+  and scale function). The geometry is only applied to a scene with the same fingerprint,
+  in which case the scene does not need to be laid out again. Label offsets are
+  applied regardless.
+  """
+
+  VERSION = 1
+
+  def __init__(self, fingerprint, components=None, links=None, labels=None):
+    if components is None:
+      components = {}
+
+    if links is None:
+      links = {}
+
+    if labels is None:
+      labels = {}
+
+    self.fingerprint = fingerprint
+    self.components = components
+    self.links = links
+    self.labels = labels
+
+  @classmethod
+  def fromLayout(cls, layout):
+    """
+    Create state from the current geometry of the layout's scene.
+    """
+
+    (componentIds, linkIds, labelIds) = LayoutState.getItemIds(layout.scene)
+
+    components = {}
+    links = {}
+    labels = {}
+
+    for component, componentId in componentIds:
+      components[componentId] = {
+        'position': [component.position.x, component.position.y],
+        'azimuth': component.azimuth,
+        'aoi': component.aoi
+      }
+
+    for link, linkId in linkIds:
+      links[linkId] = {
+        'start': [link.start.x, link.start.y],
+        'end': [link.end.x, link.end.y]
+      }
+
+    for label, labelId in labelIds:
+      labels[labelId] = {
+        'offset': [label.offset.x, label.offset.y]
+      }
+
+    return cls(LayoutState.getFingerprint(layout), components, links, labels)
+
+  def apply(self, layout):
+    """
+    Apply state to the layout's scene. Label offsets are always applied, but geometry is
+    only applied if the scene matches the fingerprint of this state.
+
+    Returns True if the geometry was applied, in which case the scene does not need to be
+    arranged, or False otherwise.
+    """
+
+    (componentIds, linkIds, labelIds) = LayoutState.getItemIds(layout.scene)
+
+    for label, labelId in labelIds:
+      if labelId in self.labels:
+        label.offset = optivis.geometry.Coordinates(*self.labels[labelId]['offset'])
+
+    if self.fingerprint != LayoutState.getFingerprint(layout):
+      return False
+
+    for component, componentId in componentIds:
+      componentState = self.components[componentId]
+
+      component.position = optivis.geometry.Coordinates(*componentState['position'])
+      component.azimuth = componentState['azimuth']
+      component.aoi = componentState['aoi']
+
+    for link, linkId in linkIds:
+      linkState = self.links[linkId]
+
+      link.start = optivis.geometry.Coordinates(*linkState['start'])
+      link.end = optivis.geometry.Coordinates(*linkState['end'])
+
+    # make sure the scene reference is what it was when laid out
+    if layout.scene.reference is None:
+      layout.scene.reference = LayoutState.getReference(layout.scene)
+
+    return True
+
+  def save(self, path):
+    data = {
+      'format': 'optivis-layout-state',
+      'version': LayoutState.VERSION,
+      'fingerprint': self.fingerprint,
+      'components': self.components,
+      'links': self.links,
+      'labels': self.labels
+    }
+
+    with open(path, 'w') as f:
+      f.write(json.dumps(data))
+
+  @classmethod
+  def load(cls, path):
+    with open(path, 'r') as f:
+      data = json.loads(f.read())
+
+    if data.get('format') != 'optivis-layout-state':
+      raise Exception('Specified file is not an Optivis layout state')
+
+    if data.get('version') > LayoutState.VERSION:
+      raise Exception('Layout state version {0} is not supported'.format(data.get('version')))
+
+    return cls(data['fingerprint'], data['components'], data['links'], data['labels'])
+
+  @staticmethod
+  def getReference(scene):
+    # layout uses the first link's output component if no reference is set
+    if scene.reference is None:
+      return scene.links[0].outputNode.component
+
+    return scene.reference
+
+  @staticmethod
+  def getItemIds(scene):
+    """
+    Get lists of (item, ID) for the components, links and labels in the scene.
+
+    Component IDs are made from the component class and name, link IDs from the IDs
+    of the components and nodes they link and label IDs from the ID of the item they
+    are attached to and their text. Duplicates are numbered in scene order.
+    """
+
+    usedIds = set([])
+
+    def getUniqueId(itemId):
+      uniqueId = itemId
+      number = 1
+
+      while uniqueId in usedIds:
+        number += 1
+        uniqueId = '{0}#{1}'.format(itemId, number)
+
+      usedIds.add(uniqueId)
+
+      return uniqueId
+
+    componentIds = []
+    linkIds = []
+    labelIds = []
+
+    # component ids by python object id, for making link ids
+    componentIdMap = {}
+
+    for component in scene.getComponents():
+      componentId = getUniqueId('{0}:{1}'.format(component.__class__.__name__, component.name))
+      componentIdMap[id(component)] = componentId
+
+      componentIds.append((component, componentId))
+
+    for link in scene.links:
+      linkId = getUniqueId('{0}.{1}->{2}.{3}'.format(componentIdMap[id(link.outputNode.component)], link.outputNode.name, componentIdMap[id(link.inputNode.component)], link.inputNode.name))
+
+      linkIds.append((link, linkId))
+
+    for item, itemId in componentIds + linkIds:
+      for label in item.labels:
+        labelIds.append((label, getUniqueId('{0}/{1}'.format(itemId, label.text))))
+
+    return (componentIds, linkIds, labelIds)
+
+  @staticmethod
+  def getFingerprint(layout):
+    """
+    Get a hash of everything that affects the layout of the scene.
+    """
+
+    scene = layout.scene
+
+    (componentIds, linkIds, labelIds) = LayoutState.getItemIds(scene)
+
+    linkIdMap = dict((id(link), linkId) for link, linkId in linkIds)
+
+    items = [layout.__class__.__name__, layout.scaleFunc.__class__.__name__, repr(layout.scaleFunc.getParameters())]
+
+    for component, componentId in componentIds:
+      items.append(componentId)
+      items.append(repr((component.size.x, component.size.y)))
+
+      # angles of incidence set by constraints are a result of the layout, not an input
+      if not any(constraint.constrains(component) for constraint in scene.constraints):
+        items.append(repr(component.aoi))
+
+    for link, linkId in linkIds:
+      items.append(linkId)
+      items.append(repr(link.length))
+
+    for constraint in scene.constraints:
+      items.append('{0}({1}, {2}, {3!r})'.format(constraint.__class__.__name__, linkIdMap[id(constraint.linkA)], linkIdMap[id(constraint.linkB)], getattr(constraint, 'angle', None)))
+
+    if len(scene.links) > 0:
+      reference = LayoutState.getReference(scene)
+      referenceIds = [componentId for component, componentId in componentIds if component is reference]
+
+      if len(referenceIds) == 0:
+        raise Exception('Scene reference {0} is not linked to any other component'.format(reference))
+
+      items.append(referenceIds[0])
+
+      # the reference's azimuth is kept by layouts and sets the orientation of the rest
+      items.append(repr(reference.azimuth))
+
+    return hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest()
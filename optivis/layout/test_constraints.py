@@ -0,0 +1,104 @@
+from __future__ import unicode_literals, division
+
+import os
+from unittest import TestCase
+
+import optivis.scene
+import optivis.layout
+import optivis.layout.constraints as constraints
+import optivis.bench.components as components
+
+def getAngle(nodeA, nodeB):
+  return (nodeA.getAbsoluteAzimuth() - nodeB.getAbsoluteAzimuth()) % 360
+
+class TestConstrainedAoi(TestCase):
+  def assertAnglesSolved(self, component):
+    nodes = component.inputNodes + component.outputNodes
+    
+    for nodeA in nodes:
+      for nodeB in nodes:
+        if nodeA.aoiMultiplier == nodeB.aoiMultiplier:
+          continue
+        
+        for angle in (0, 30, 90, 135, 270):
+          component.aoi = component.getAoiForConstrainedNodeAngle(nodeA, nodeB, angle)
+          
+          self.assertAlmostEqual((getAngle(nodeA, nodeB) - angle + 180) % 360 - 180, 0)
+  
+  def test_built_in_components(self):
+    for componentClass in (components.SteeringMirror, components.CavityMirror, components.BeamSplitter, components.BeamSplitterCube, components.ConvexLens, components.QuarterWavePlate, components.ElectroopticModulator, components.FaradayIsolator):
+      self.assertAnglesSolved(componentClass())
+  
+  def test_nearest_solution(self):
+    mirror = components.SteeringMirror(aoi=200)
+    
+    # mirrors reflect at 2 * aoi, so aoi and aoi + 180 both give the angle
+    aoi = mirror.getAoiForConstrainedNodeAngle(mirror.getInputNode('fr'), mirror.getOutputNode('fr'), 90)
+    
+    self.assertAlmostEqual(aoi % 360, 225)
+  
+  def test_fixed_angle(self):
+    cube = components.BeamSplitterCube(aoi=10)
+    
+    # the multipliers of these nodes are equal, so the angle between them is always 90
+    (nodeA, nodeB) = (cube.getInputNode('frA'), cube.getInputNode('bkA'))
+    
+    self.assertEqual(cube.getAoiForConstrainedNodeAngle(nodeA, nodeB, 90), 10)
+    self.assertRaises(Exception, cube.getAoiForConstrainedNodeAngle, nodeA, nodeB, 45)
+
+class TestApplyConstraints(TestCase):
+  def getScene(self):
+    scene = optivis.scene.Scene()
+    
+    laser = components.Laser(name="L")
+    cube = components.BeamSplitterCube(name="BS")
+    isolator = components.FaradayIsolator(name="FI")
+    mirrors = [components.SteeringMirror(name="M{0}".format(i), aoi=i * 10) for i in range(3)]
+    
+    scene.link(laser.getOutputNode('out'), cube.getInputNode('frB'), 50)
+    scene.link(cube.getOutputNode('frB'), isolator.getInputNode('bkPoB'), 50)
+    scene.link(isolator.getOutputNode('frPoA'), mirrors[0].getInputNode('fr'), 50)
+    scene.link(mirrors[0].getOutputNode('fr'), mirrors[1].getInputNode('fr'), 50)
+    scene.link(mirrors[1].getOutputNode('fr'), mirrors[2].getInputNode('fr'), 50)
+    
+    for i, angle in enumerate((70, 100, 20, 150)):
+      scene.addConstraint(constraints.LinkAngularConstraint(angle, scene.links[i], scene.links[i + 1]))
+    
+    return scene
+  
+  def test_batch(self):
+    sceneA = self.getScene()
+    sceneB = self.getScene()
+    
+    for constraint in sceneA.constraints:
+      constraint.constrain()
+    
+    constraints.applyConstraints(sceneB.constraints)
+    
+    for componentA, componentB in zip(sceneA.getComponents(), sceneB.getComponents()):
+      self.assertAlmostEqual(componentA.aoi, componentB.aoi)
+    
+    for constraint in sceneB.constraints:
+      (component, nodeA, nodeB) = constraint.linkA.getNodesForCommonComponent(constraint.linkB)
+      
+      self.assertAlmostEqual(getAngle(nodeA, nodeB), constraint.angle)
+  
+  def test_constrained_layout(self):
+    scene = self.getScene()
+    
+    with open(os.devnull, 'w') as devnull:
+      import sys
+      
+      (stdout, sys.stdout) = (sys.stdout, devnull)
+      
+      try:
+        optivis.layout.ConstrainedLayout(scene).arrange()
+      finally:
+        sys.stdout = stdout
+    
+    # the links are drawn at the constrained angles
+    for constraint in scene.constraints:
+      directionA = (constraint.linkA.end - constraint.linkA.start).getAzimuth()
+      directionB = (constraint.linkB.end - constraint.linkB.start).getAzimuth()
+      
+      self.assertAlmostEqual((directionA - directionB - constraint.angle + 180) % 360 - 180, 0, places=6)
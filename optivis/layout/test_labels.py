@@ -0,0 +1,127 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import optivis.geometry
+import optivis.scene
+import optivis.layout
+import optivis.layout.labels
+import optivis.bench.labels as labels
+import optivis.bench.components as components
+
+class CountingTextMetrics(optivis.layout.labels.EstimatedTextMetrics):
+  def __init__(self, *args, **kwargs):
+    super(CountingTextMetrics, self).__init__(*args, **kwargs)
+
+    self.measured = []
+
+  def measure(self, text):
+    self.measured.append(text)
+
+    return super(CountingTextMetrics, self).measure(text)
+
+class TestTextMetrics(TestCase):
+  def test_size(self):
+    metrics = optivis.layout.labels.EstimatedTextMetrics(fontSize=10, charWidth=0.5, lineHeight=1)
+
+    self.assertEqual(metrics.getSize("abcd\nab"), optivis.geometry.Coordinates(20, 20))
+
+  def test_cache(self):
+    metrics = CountingTextMetrics()
+
+    metrics.getSize("Mirror")
+    metrics.getSize("Mirror")
+    metrics.getSize("Laser")
+
+    self.assertEqual(metrics.measured, ["Mirror", "Laser"])
+
+    # a different font is measured again
+    metrics.fontSize = 20
+    metrics.getSize("Mirror")
+
+    self.assertEqual(metrics.measured, ["Mirror", "Laser", "Mirror"])
+
+class TestLabelGeometry(TestCase):
+  def test_bounding_box(self):
+    laser = components.Laser(labels=[labels.Label(text="Laser", position=optivis.geometry.Coordinates(0, 1), offset=optivis.geometry.Coordinates(5, 0))])
+    laser.position = optivis.geometry.Coordinates(100, 100)
+    laser.azimuth = 0
+
+    label = laser.labels[0]
+    size = optivis.geometry.Coordinates(30, 10)
+
+    # below the component by its height, moved along by the offset and centred vertically
+    (lowerBound, upperBound) = label.getBoundingBox(size)
+
+    self.assertEqual(lowerBound, optivis.geometry.Coordinates(105, 100 + laser.size.y - 5))
+    self.assertEqual(upperBound, optivis.geometry.Coordinates(135, 100 + laser.size.y + 5))
+
+  def test_text(self):
+    label = labels.Label(text="Laser", content={"power": 1, "on": True})
+
+    self.assertEqual(label.getText(), "Laser\n")
+    self.assertEqual(label.getText({"power": True, "on": False}), "Laser\npower = 1")
+
+class TestLabelPlacer(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+
+    self.metrics = optivis.layout.labels.EstimatedTextMetrics()
+
+  def test_separates_labels(self):
+    # two mirrors close together, with labels drawn in the same place by default
+    mirrorA = components.SteeringMirror(name="M1", aoi=0, labels=[labels.Label(text="Mirror one")])
+    mirrorB = components.SteeringMirror(name="M2", aoi=0, labels=[labels.Label(text="Mirror two")])
+
+    self.scene.link(mirrorA.getOutputNode('fr'), mirrorB.getInputNode('fr'), 1)
+    self.scene.reference = mirrorA
+
+    optivis.layout.StandardLayout(self.scene).arrange()
+
+    placer = optivis.layout.labels.LabelPlacer(self.scene, self.metrics)
+    placer.apply()
+
+    boxes = []
+
+    for label in placer.getLabels():
+      size = self.metrics.getSize(label.getText())
+      boxes.append(optivis.spatial.getBox(*label.getBoundingBox(size)))
+
+    self.assertFalse(optivis.spatial.boxesOverlap(boxes[0], boxes[1]))
+
+  def test_keeps_clear_labels(self):
+    laser = components.Laser(labels=[labels.Label(text="Laser", position=optivis.geometry.Coordinates(0, 1), offset=optivis.geometry.Coordinates(0, 20))])
+    photodiode = components.Photodiode(labels=[labels.Label(text="Photodiode", position=optivis.geometry.Coordinates(0, 1), offset=optivis.geometry.Coordinates(0, 20))])
+
+    self.scene.link(laser.getOutputNode('out'), photodiode.getInputNode('in'), 500)
+    self.scene.reference = laser
+
+    optivis.layout.StandardLayout(self.scene).arrange()
+
+    placements = optivis.layout.labels.LabelPlacer(self.scene, self.metrics).place()
+
+    self.assertEqual([offset for label, offset in placements], [optivis.geometry.Coordinates(0, 20)] * 2)
+
+  def test_fixed_labels(self):
+    # two mirrors close together, where the first label has been moved by the user
+    labelA = labels.Label(text="Mirror one")
+    labelB = labels.Label(text="Mirror two")
+
+    mirrorA = components.SteeringMirror(name="M1", aoi=0, labels=[labelA])
+    mirrorB = components.SteeringMirror(name="M2", aoi=0, labels=[labelB])
+
+    self.scene.link(mirrorA.getOutputNode('fr'), mirrorB.getInputNode('fr'), 1)
+    self.scene.reference = mirrorA
+
+    optivis.layout.StandardLayout(self.scene).arrange()
+
+    offset = labelA.offset
+
+    optivis.layout.labels.LabelPlacer(self.scene, self.metrics, fixedLabels=[labelA]).apply()
+
+    # the fixed label stays, and the other avoids it
+    self.assertEqual(labelA.offset, offset)
+
+    (sizeA, sizeB) = (self.metrics.getSize(labelA.getText()), self.metrics.getSize(labelB.getText()))
+
+    self.assertFalse(optivis.spatial.boxesOverlap(optivis.spatial.getBox(*labelA.getBoundingBox(sizeA)), optivis.spatial.getBox(*labelB.getBoundingBox(sizeB))))
@@ -0,0 +1,274 @@
+from __future__ import unicode_literals, division
+
+import time
+import threading
+from unittest import TestCase
+
+import optivis.geometry
+import optivis.scene
+import optivis.layout
+import optivis.bench.components as components
+
+class TestLayoutProgress(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.componentA = components.Laser()
+    self.componentB = components.SteeringMirror(aoi=45)
+    self.componentC = components.Photodiode()
+    
+    self.scene.link(self.componentA.getOutputNode('out'), self.componentB.getInputNode('fr'), 10)
+    self.scene.link(self.componentB.getOutputNode('fr'), self.componentC.getInputNode('in'), 20)
+    
+    self.scene.reference = self.componentA
+  
+  def test_progress_reported(self):
+    progress = []
+    
+    layout = optivis.layout.StandardLayout(self.scene, progressCallback=lambda count, total: progress.append((count, total)))
+    layout.arrange()
+    
+    self.assertEqual(progress, [(1, 2), (2, 2)])
+  
+  def test_cancel(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.cancel()
+    
+    self.assertRaises(optivis.layout.LayoutCancelledException, layout.arrange)
+  
+  def test_cancel_from_progress(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.progressCallback = lambda count, total: layout.cancel()
+    
+    self.assertRaises(optivis.layout.LayoutCancelledException, layout.arrange)
+    
+    # only the first link was laid out
+    self.assertEqual(layout.linkCount, 1)
+
+class TestLayoutPartitions(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    # two benches that are not linked to each other
+    for i in range(2):
+      laser = components.Laser(name='L{0}'.format(i))
+      mirror = components.SteeringMirror(name='M{0}'.format(i), aoi=45)
+      photodiode = components.Photodiode(name='PD{0}'.format(i))
+      
+      self.scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), 50)
+      self.scene.link(mirror.getOutputNode('fr'), photodiode.getInputNode('in'), 50)
+  
+  def assertPartitionsDoNotOverlap(self, layout):
+    boundingBoxes = [thisPartition.getBoundingBox() for thisPartition in layout.partitions]
+    
+    ((lowerA, upperA), (lowerB, upperB)) = boundingBoxes
+    
+    self.assertTrue(upperA.x <= lowerB.x or upperB.x <= lowerA.x or upperA.y <= lowerB.y or upperB.y <= lowerA.y)
+  
+  def test_get_partitions(self):
+    partitions = optivis.layout.partition.getPartitions(self.scene)
+    
+    self.assertEqual(len(partitions), 2)
+    self.assertEqual([len(thisPartition.components) for thisPartition in partitions], [3, 3])
+    self.assertEqual([len(thisPartition.links) for thisPartition in partitions], [2, 2])
+  
+  def test_all_partitions_laid_out(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.arrange()
+    
+    self.assertEqual(len(layout.linkedComponents), 6)
+    self.assertPartitionsDoNotOverlap(layout)
+  
+  def test_parallel_layout(self):
+    serialLayout = optivis.layout.StandardLayout(self.scene)
+    serialLayout.arrange()
+    
+    serialGeometry = self.scene.getGeometry()
+    
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.parallelLinkThreshold = 0
+    layout.processes = 2
+    layout.arrange()
+    
+    self.assertPartitionsDoNotOverlap(layout)
+    
+    for (positionA, azimuthA, aoiA), (positionB, azimuthB, aoiB) in zip(serialGeometry[0], self.scene.getGeometry()[0]):
+      self.assertAlmostEqual(positionA.x, positionB.x)
+      self.assertAlmostEqual(positionA.y, positionB.y)
+      self.assertAlmostEqual(azimuthA, azimuthB)
+  
+  def test_pack_rectangles(self):
+    sizes = [optivis.geometry.Coordinates(x, y) for x, y in [(10, 20), (30, 5), (15, 15), (40, 40), (5, 5)]]
+    positions = optivis.layout.partition.packRectangles(sizes, 2)
+    
+    for i in range(len(sizes)):
+      for j in range(i + 1, len(sizes)):
+        (a, b) = (positions[i], positions[j])
+        
+        self.assertTrue(a.x + sizes[i].x <= b.x or b.x + sizes[j].x <= a.x or a.y + sizes[i].y <= b.y or b.y + sizes[j].y <= a.y)
+
+class TestSolvedLayout(TestCase):
+  def getRing(self, aoiError=0, count=4):
+    scene = optivis.scene.Scene()
+    
+    # regular ring, which closes when each mirror turns the beam by 360 / count degrees
+    mirrors = [components.SteeringMirror(name='M{0}'.format(i), aoi=90 - 180 / count) for i in range(count)]
+    mirrors[0].aoi += aoiError
+    
+    for i in range(count):
+      scene.link(mirrors[i].getOutputNode('fr'), mirrors[(i + 1) % count].getInputNode('fr'), 100)
+    
+    scene.reference = mirrors[0]
+    
+    return scene
+  
+  def getMaximumResiduals(self, scene):
+    residuals = optivis.layout.SolvedLayout(scene).getResiduals()
+    
+    return (max(residual[1] for residual in residuals), max(residual[2] for residual in residuals))
+  
+  def test_closed_loop(self):
+    scene = self.getRing()
+    
+    layout = optivis.layout.SolvedLayout(scene)
+    layout.arrange()
+    
+    self.assertEqual(len(layout.residuals), 4)
+    
+    for link, positionResidual, azimuthResidual in layout.residuals:
+      self.assertAlmostEqual(positionResidual, 0)
+      self.assertAlmostEqual(azimuthResidual, 0)
+      
+      # links are drawn between their nodes
+      self.assertEqual(link.start, link.outputNode.getAbsolutePosition())
+      self.assertEqual(link.end, link.inputNode.getAbsolutePosition())
+  
+  def test_inconsistent_loop(self):
+    scene = self.getRing(aoiError=5)
+    
+    optivis.layout.StandardLayout(scene).arrange()
+    (standardPosition, standardAzimuth) = self.getMaximumResiduals(scene)
+    
+    optivis.layout.SolvedLayout(scene).arrange()
+    (solvedPosition, solvedAzimuth) = self.getMaximumResiduals(scene)
+    
+    # the error is spread over the loop rather than left in one link
+    self.assertLess(solvedAzimuth, standardAzimuth)
+  
+  def test_large_inconsistent_loop(self):
+    scene = self.getRing(aoiError=30, count=300)
+    
+    optivis.layout.StandardLayout(scene).arrange()
+    (standardPosition, standardAzimuth) = self.getMaximumResiduals(scene)
+    
+    start = time.time()
+    optivis.layout.SolvedLayout(scene).arrange()
+    
+    self.assertLess(time.time() - start, 2)
+    
+    (solvedPosition, solvedAzimuth) = self.getMaximumResiduals(scene)
+    
+    self.assertLess(solvedAzimuth, standardAzimuth / 10)
+  
+  def test_not_converged(self):
+    scene = self.getRing(aoiError=30, count=300)
+    
+    layout = optivis.layout.SolvedLayout(scene)
+    layout.maxIterations = 1
+    
+    self.assertRaises(Exception, layout.arrange)
+
+class TestLayoutOverlaps(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    # short links around a square, so mirrors overlap
+    mirrors = [components.SteeringMirror(name='M{0}'.format(i), aoi=45) for i in range(6)]
+    
+    for i in range(5):
+      self.scene.link(mirrors[i].getOutputNode('fr'), mirrors[i + 1].getInputNode('fr'), 5)
+  
+  def test_check_overlaps(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.checkOverlaps = True
+    layout.arrange()
+    
+    self.assertGreater(len(layout.overlaps), 0)
+    self.assertEqual(len(layout.overlaps), len(optivis.layout.overlap.getOverlaps(self.scene)))
+  
+  def test_nudge_overlaps(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.arrange()
+    
+    overlapCount = len(layout.getOverlaps())
+    
+    layout.nudgeOverlaps = True
+    layout.arrange()
+    
+    self.assertLess(len(layout.overlaps), overlapCount)
+    
+    # link lengths are not changed, only how they are drawn
+    self.assertTrue(all(link.length == 5 for link in self.scene.links))
+
+class TestLayoutThreads(TestCase):
+  # number of threads, and scenes laid out by each
+  threadCount = 8
+  sceneCount = 10
+  
+  def getScene(self, index):
+    scene = optivis.scene.Scene(title='Scene {0}'.format(index))
+    
+    # scenes of different sizes and angles, so that leaked state changes the layout
+    laser = components.Laser(name='L')
+    mirrors = [components.SteeringMirror(name='M{0}'.format(i), aoi=10 + index % 30) for i in range(2 + index % 5)]
+    
+    scene.link(laser.getOutputNode('out'), mirrors[0].getInputNode('fr'), 10 + index)
+    
+    for i in range(len(mirrors) - 1):
+      scene.link(mirrors[i].getOutputNode('fr'), mirrors[i + 1].getInputNode('fr'), 20 + i * index)
+    
+    scene.reference = laser
+    
+    return scene
+  
+  def getLayoutManager(self, index):
+    return (optivis.layout.StandardLayout, optivis.layout.ConstrainedLayout, optivis.layout.SolvedLayout)[index % 3]
+  
+  def getGeometry(self, index):
+    scene = self.getScene(index)
+    self.getLayoutManager(index)(scene).arrange()
+    
+    return [(component.position.x, component.position.y, component.azimuth) for component in scene.getComponents()]
+  
+  def test_parallel_layouts(self):
+    count = self.threadCount * self.sceneCount
+    
+    expected = [self.getGeometry(index) for index in range(count)]
+    
+    results = [None] * count
+    errors = []
+    
+    def run(thread):
+      try:
+        # build and lay out scenes in every thread at the same time
+        for index in range(thread, count, self.threadCount):
+          results[index] = self.getGeometry(index)
+      except Exception as e:
+        errors.append(e)
+    
+    threads = [threading.Thread(target=run, args=(thread,)) for thread in range(self.threadCount)]
+    
+    for thread in threads:
+      thread.start()
+    
+    for thread in threads:
+      thread.join()
+    
+    self.assertEqual(errors, [])
+    
+    for index in range(count):
+      self.assertEqual(len(results[index]), len(expected[index]))
+      
+      for result, expectedResult in zip(results[index], expected[index]):
+        for value, expectedValue in zip(result, expectedResult):
+          self.assertAlmostEqual(value, expectedValue, places=6)
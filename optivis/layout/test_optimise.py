@@ -0,0 +1,83 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import optivis.scene
+import optivis.geometry
+import optivis.layout
+import optivis.layout.optimise as optimise
+import optivis.layout.scale as scale
+import optivis.bench.components as components
+
+class TestScaleOptimiser(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    # links from millimetres to kilometres
+    lengths = [0.001, 0.5, 20, 4000, 1, 300]
+    mirrors = [components.SteeringMirror(name='M{0}'.format(i), aoi=[0, 45][i % 2]) for i in range(len(lengths) + 1)]
+    
+    for i, length in enumerate(lengths):
+      self.scene.link(mirrors[i].getOutputNode('fr'), mirrors[i + 1].getInputNode('fr'), length)
+    
+    self.lengths = lengths
+  
+  def getSize(self, scaleFunc):
+    layout = optivis.layout.StandardLayout(self.scene, scaleFunc=scaleFunc)
+    layout.arrange()
+    
+    return self.scene.getSize()
+  
+  def test_fit(self):
+    targetSize = optivis.geometry.Coordinates(800, 600)
+    
+    scaleFunc = optimise.ScaleOptimiser(optivis.layout.StandardLayout(self.scene), targetSize, minimumLinkLength=5).optimise()
+    
+    size = self.getSize(scaleFunc)
+    
+    # fits, and fills the target in at least one direction
+    self.assertLessEqual(size.x, targetSize.x + 1e-6)
+    self.assertLessEqual(size.y, targetSize.y + 1e-6)
+    self.assertGreater(max(size.x / targetSize.x, size.y / targetSize.y), 0.99)
+    
+    self.assertGreaterEqual(min(scaleFunc.getScaledLengths(self.lengths)), 5 - 1e-6)
+  
+  def test_minimum_link_length(self):
+    # too small to fit with every link visible
+    targetSize = optivis.geometry.Coordinates(100, 100)
+    
+    scaleFunc = optimise.ScaleOptimiser(optivis.layout.StandardLayout(self.scene), targetSize, minimumLinkLength=50).optimise()
+    
+    self.assertGreaterEqual(min(scaleFunc.getScaledLengths(self.lengths)), 50 - 1e-6)
+  
+  def test_scene_unchanged(self):
+    positions = [component.position for component in self.scene.getComponents()]
+    
+    optimise.ScaleOptimiser(optivis.layout.StandardLayout(self.scene), optivis.geometry.Coordinates(800, 600)).optimise()
+    
+    # the scene is laid out in a fork, so e.g. a layout running on it isn't disturbed
+    self.assertEqual([component.position for component in self.scene.getComponents()], positions)
+  
+  def test_invalid_target_size(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    
+    self.assertRaises(Exception, optimise.ScaleOptimiser, layout, (800, 600))
+    self.assertRaises(Exception, optimise.ScaleOptimiser, layout, optivis.geometry.Coordinates(0, 600))
+  
+  def test_unsupported_scale_function(self):
+    piecewise = optivis.layout.StandardLayout(self.scene, scaleFunc=scale.PiecewiseScaleFunction([(0, 0), (1, 10), (5000, 100)]))
+    quadratic = optivis.layout.StandardLayout(self.scene, scaleFunc=scale.ScaleFunction(coefficients=[0, 1, 1]))
+    
+    # would be replaced by a logarithmic function
+    self.assertRaises(Exception, optimise.ScaleOptimiser, piecewise, optivis.geometry.Coordinates(800, 600))
+    self.assertRaises(Exception, optimise.ScaleOptimiser, quadratic, optivis.geometry.Coordinates(800, 600))
+    
+    # logarithmic and linear functions can be fitted
+    optimise.ScaleOptimiser(optivis.layout.StandardLayout(self.scene, scaleFunc=scale.LogScaleFunction()), optivis.geometry.Coordinates(800, 600))
+    optimise.ScaleOptimiser(optivis.layout.StandardLayout(self.scene, scaleFunc=scale.ScaleFunction(coefficients=[0, 2])), optivis.geometry.Coordinates(800, 600))
+  
+  def test_cancelled(self):
+    layout = optivis.layout.StandardLayout(self.scene)
+    layout.cancel()
+    
+    self.assertRaises(optivis.layout.LayoutCancelledException, optimise.ScaleOptimiser(layout, optivis.geometry.Coordinates(800, 600)).optimise)
@@ -0,0 +1,60 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import pkg_resources
+
+import optivis.layout
+import optivis.layout.registry
+
+class PluginLayout(optivis.layout.StandardLayout):
+  title = "Plugin"
+  description = "Layout loaded from an entry point"
+
+class TestLayoutRegistry(TestCase):
+  def setUp(self):
+    self.registry = optivis.layout.registry.LayoutRegistry(entryPointGroup=None)
+
+  def test_built_in_layouts(self):
+    titles = [layoutManager.title for layoutManager in optivis.layout.registry.getLayoutManagerClasses()]
+
+    self.assertEqual(titles[0:3], ["Standard", "Constrained", "Solved"])
+    self.assertIs(optivis.layout.registry.getLayoutManagerClass("Solved"), optivis.layout.SolvedLayout)
+
+  def test_register(self):
+    self.assertIs(self.registry.register(PluginLayout), PluginLayout)
+    self.assertEqual(self.registry.getLayoutManagerClasses(), [PluginLayout])
+
+    self.registry.unregister("Plugin")
+    self.assertEqual(self.registry.getLayoutManagerClasses(), [])
+
+  def test_invalid_layout(self):
+    # not a layout manager
+    self.assertRaises(Exception, self.registry.register, object)
+    self.assertRaises(Exception, self.registry.register, "Plugin")
+
+    # abstract
+    self.assertRaises(Exception, self.registry.register, optivis.layout.AbstractLayout)
+
+  def test_unknown_title(self):
+    self.registry.register(PluginLayout)
+
+    with self.assertRaises(Exception) as context:
+      self.registry.getLayoutManagerClass("Missing")
+
+    # error lists the registered layout managers
+    self.assertIn("Plugin", str(context.exception))
+
+  def test_entry_points(self):
+    distribution = pkg_resources.Distribution(project_name='optivis-test-plugin', version='1.0')
+
+    entryPoints = [
+      pkg_resources.EntryPoint.parse('plugin = optivis.layout.test_registry:PluginLayout', dist=distribution),
+      pkg_resources.EntryPoint.parse('broken = optivis.layout.test_registry:MissingLayout', dist=distribution)
+    ]
+
+    registry = optivis.layout.registry.LayoutRegistry()
+    registry.getEntryPoints = lambda: entryPoints
+
+    # the broken entry point is skipped
+    self.assertEqual(registry.getLayoutManagerClasses(), [PluginLayout])
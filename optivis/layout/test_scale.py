@@ -0,0 +1,84 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+
+import numpy
+
+import optivis.layout.scale as scale
+
+class TestScaleFunction(TestCase):
+  def test_scaled_lengths(self):
+    scaleFunc = scale.ScaleFunction(coefficients=[1, 2, 3])
+    
+    lengths = [0, 1, 2.5, 10]
+    expected = [1 + 2 * length + 3 * length ** 2 for length in lengths]
+    
+    numpy.testing.assert_allclose(scaleFunc.getScaledLengths(lengths), expected)
+    
+    for length, scaledLength in zip(lengths, expected):
+      self.assertAlmostEqual(scaleFunc.getScaledLength(length), scaledLength)
+  
+  def test_cache_cleared(self):
+    scaleFunc = scale.ScaleFunction()
+    
+    self.assertEqual(scaleFunc.getScaledLength(10), 10)
+    
+    scaleFunc.coefficients = [0, 2]
+    
+    self.assertEqual(scaleFunc.getScaledLength(10), 20)
+  
+  def test_cache_cleared_by_another_thread(self):
+    class ClearedCache(dict):
+      # as if another thread cleared the cache as soon as a length is stored
+      def __setitem__(self, key, value):
+        super(ClearedCache, self).__setitem__(key, value)
+        self.clear()
+    
+    scaleFunc = scale.ScaleFunction(coefficients=[0, 2])
+    scaleFunc._cache = ClearedCache()
+    
+    self.assertEqual(scaleFunc.getScaledLength(10), 20)
+  
+  def test_validate(self):
+    # increasing for all positive lengths
+    scale.ScaleFunction(coefficients=[0, 1, 0.5]).validate()
+    
+    # turns over at a length of 50
+    scaleFunc = scale.ScaleFunction(coefficients=[0, 1, -0.01])
+    
+    scaleFunc.validate([1, 40])
+    self.assertRaises(Exception, scaleFunc.validate, [1, 60])
+    self.assertRaises(Exception, scaleFunc.validate)
+    
+    # constant
+    self.assertRaises(Exception, scale.ScaleFunction(coefficients=[5]).validate)
+
+class TestLogScaleFunction(TestCase):
+  def test_scaled_lengths(self):
+    scaleFunc = scale.LogScaleFunction(scale=2, knee=100)
+    
+    # roughly linear well below the knee, compressed above it
+    self.assertAlmostEqual(scaleFunc.getScaledLength(0.01), 0.02, places=5)
+    self.assertLess(scaleFunc.getScaledLength(10000), 2 * 10000 / 10)
+    
+    scaleFunc.validate([0, 10000])
+  
+  def test_invalid_parameters(self):
+    self.assertRaises(Exception, scale.LogScaleFunction, scale=0)
+    self.assertRaises(Exception, scale.LogScaleFunction, knee=-1)
+
+class TestPiecewiseScaleFunction(TestCase):
+  def test_scaled_lengths(self):
+    scaleFunc = scale.PiecewiseScaleFunction([(0, 0), (100, 100), (1000, 200)])
+    
+    numpy.testing.assert_allclose(scaleFunc.getScaledLengths([50, 100, 550, 1900]), [50, 100, 150, 300])
+  
+  def test_validate(self):
+    scaleFunc = scale.PiecewiseScaleFunction([(0, 0), (100, 100), (1000, 50)])
+    
+    scaleFunc.validate([10, 90])
+    self.assertRaises(Exception, scaleFunc.validate, [10, 500])
+  
+  def test_invalid_points(self):
+    self.assertRaises(Exception, scale.PiecewiseScaleFunction, [(0, 0)])
+    self.assertRaises(Exception, scale.PiecewiseScaleFunction, [(0, 0), (0, 10)])
@@ -0,0 +1,110 @@
+from __future__ import unicode_literals, division
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import optivis.scene
+import optivis.layout
+import optivis.layout.state
+import optivis.geometry
+import optivis.bench.components as components
+import optivis.bench.labels as labels
+
+class TestLayoutState(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'layout.json')
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def createScene(self, length=50):
+    scene = optivis.scene.Scene(title="Layout state")
+    
+    laser = components.Laser(name="L1")
+    mirror = components.SteeringMirror(name="M1", aoi=30, labels=[labels.Label(text="Mirror")])
+    photodiode = components.Photodiode(name="PD1")
+    
+    scene.link(laser.getOutputNode('out'), mirror.getInputNode('fr'), 100)
+    scene.link(mirror.getOutputNode('fr'), photodiode.getInputNode('in'), length)
+    
+    return scene
+  
+  def getMirror(self, scene):
+    return [component for component in scene.getComponents() if component.name == "M1"][0]
+  
+  def saveState(self):
+    scene = self.createScene()
+    
+    layout = optivis.layout.StandardLayout(scene)
+    layout.arrange()
+    
+    # user moves label
+    self.getMirror(scene).labels[0].offset = optivis.geometry.Coordinates(5, 6)
+    
+    optivis.layout.state.LayoutState.fromLayout(layout).save(self.path)
+    
+    return scene
+  
+  def test_restore(self):
+    savedScene = self.saveState()
+    
+    scene = self.createScene()
+    state = optivis.layout.state.LayoutState.load(self.path)
+    
+    self.assertTrue(state.apply(optivis.layout.StandardLayout(scene)))
+    
+    for component, savedComponent in zip(scene.getComponents(), savedScene.getComponents()):
+      self.assertEqual(component.position, savedComponent.position)
+      self.assertEqual(component.azimuth, savedComponent.azimuth)
+    
+    for link, savedLink in zip(scene.links, savedScene.links):
+      self.assertEqual(link.start, savedLink.start)
+      self.assertEqual(link.end, savedLink.end)
+    
+    self.assertEqual(self.getMirror(scene).labels[0].offset, optivis.geometry.Coordinates(5, 6))
+  
+  def test_changed_scene(self):
+    self.saveState()
+    
+    # link length differs, so the scene must be laid out again
+    scene = self.createScene(length=60)
+    state = optivis.layout.state.LayoutState.load(self.path)
+    
+    self.assertFalse(state.apply(optivis.layout.StandardLayout(scene)))
+    
+    # components are not moved
+    self.assertEqual(self.getMirror(scene).position, optivis.geometry.Coordinates(0, 0))
+    
+    # but label offsets are still restored
+    self.assertEqual(self.getMirror(scene).labels[0].offset, optivis.geometry.Coordinates(5, 6))
+  
+  def test_changed_reference_azimuth(self):
+    self.saveState()
+    
+    # the rest of the scene is laid out relative to the reference's azimuth
+    scene = self.createScene()
+    scene.links[0].outputNode.component.azimuth = 45
+    state = optivis.layout.state.LayoutState.load(self.path)
+    
+    self.assertFalse(state.apply(optivis.layout.StandardLayout(scene)))
+  
+  def test_changed_layout_manager(self):
+    self.saveState()
+    
+    scene = self.createScene()
+    state = optivis.layout.state.LayoutState.load(self.path)
+    
+    self.assertFalse(state.apply(optivis.layout.ConstrainedLayout(scene)))
+  
+  def test_duplicate_names(self):
+    scene = self.createScene()
+    
+    for component in scene.getComponents():
+      component.name = "X"
+    
+    (componentIds, linkIds, labelIds) = optivis.layout.state.LayoutState.getItemIds(scene)
+    
+    self.assertEqual(len(set(componentId for component, componentId in componentIds)), 3)
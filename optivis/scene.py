@@ -2,21 +2,59 @@ from __future__ import unicode_literals, division
 
 import datetime
 
+import numpy
+
 import geometry
 import bench.components
 import bench.links
 import layout.constraints
+import serialisation
+import store
 
 class Scene(object):
-  links = []
-  constraints = []
+  """
+  Optical scene, made of components linked to each other.
+  
+  Thread safety: all state is held by each scene instance, so different scenes can be
+  built and laid out at the same time in different threads. A scene, and the components
+  and links in it, must only be modified or laid out by one thread at a time, and
+  components must not be shared between scenes that are laid out at the same time, as
+  laying out a scene moves its components. Copy a scene with copy.deepcopy() to lay it
+  out while it is used elsewhere.
+  
+  Scenes can be pickled, e.g. to send them to other processes. External (e.g. pykat)
+  objects, and tooltips which aren't strings, are not pickled.
+  """
   
-  def __init__(self, title=None, reference=None):
+  def __init__(self, title=None, reference=None, links=None, constraints=None):
     if title is None:
       title = datetime.datetime.now().strftime('%Y-%M-%d %H:%M')
     
+    if links is None:
+      links = []
+    
+    if constraints is None:
+      constraints = []
+    
     self.title = title
     self.reference = reference
+    self.links = links
+    self.constraints = constraints
+    
+    # components' geometry is held by the components unless useStore() is called
+    self.__store = None
+    
+    self.invalidateStoreIndices()
+  
+  def __getstate__(self):
+    return (self.title, self.reference, self.links, self.constraints, self.__store)
+  
+  def __setstate__(self, state):
+    (title, reference, links, constraints, componentStore) = state
+    
+    self.__init__(title=title, reference=reference, links=links, constraints=constraints)
+    
+    self.__store = componentStore
   
   @property
   def title(self):
@@ -57,6 +95,12 @@ class Scene(object):
       raise Exception('Specified link is not of type AbstractLink')
     
     self.links.append(link)
+    
+    if self.__store is not None:
+      self.__store.add(link.inputNode.component)
+      self.__store.add(link.outputNode.component)
+    
+    self.invalidateStoreIndices()
   
   def addConstraint(self, constraint):
     if not isinstance(constraint, layout.constraints.AbstractConstraint):
@@ -64,19 +108,196 @@ class Scene(object):
     
     self.constraints.append(constraint)
   
+  def fork(self):
+    """
+    Get a copy of this scene which can be changed and laid out independently of it, e.g.
+    for each value of a parameter sweep. Unlike copy.deepcopy(), the copy shares
+    everything layouts don't change with this scene: node definitions, link specs, label
+    text and content, parameters and external objects. Components, links, nodes, labels
+    and constraints are new objects, with their own geometry, angles of incidence and
+    lengths. If this scene uses a store, the copy has a copy of its arrays, in which the
+    copied components keep their geometry.
+    """
+    
+    if self.__store is not None:
+      store = self.__store.fork()
+    else:
+      store = None
+    
+    # many objects are made and none are freed, as when loading scenes
+    with serialisation.pausedGarbageCollection():
+      # forks of components and links by the id of the original
+      forks = {}
+      
+      for component in self.getComponents():
+        forks[id(component)] = component.fork(store)
+      
+      if self.reference is not None and id(self.reference) not in forks:
+        forks[id(self.reference)] = self.reference.fork(store)
+      
+      links = []
+      
+      for link in self.links:
+        forks[id(link)] = link.fork(forks[id(link.outputNode.component)], forks[id(link.inputNode.component)])
+      
+        links.append(forks[id(link)])
+      
+      constraints = [constraint.fork(forks[id(constraint.componentA)], forks[id(constraint.componentB)]) for constraint in self.constraints]
+      
+      if self.reference is not None:
+        reference = forks[id(self.reference)]
+      else:
+        reference = None
+      
+      scene = Scene(title=self.title, reference=reference, links=links, constraints=constraints)
+      
+      scene.__store = store
+    
+    return scene
+  
   def getComponents(self):
     components = []
     
+    # ids of components already found, to avoid searching (and comparing) the list
+    seen = set([])
+    
     for link in self.links:
-      if link.inputNode.component not in components:
-	components.append(link.inputNode.component)
-      
-      if link.outputNode.component not in components:
-	components.append(link.outputNode.component)
+      for component in (link.inputNode.component, link.outputNode.component):
+        if id(component) not in seen:
+          seen.add(id(component))
+          components.append(component)
 
     return components
   
+  @property
+  def store(self):
+    """
+    Array backed store of the geometry of the scene's components (see optivis.store), or
+    None if it is not used.
+    """
+    
+    return self.__store
+  
+  def useStore(self, componentStore=None):
+    """
+    Keep the geometry of the scene's components, and components linked later, in
+    componentStore, by default a new store. Returns the store.
+    """
+    
+    if componentStore is None:
+      componentStore = store.ComponentStore(capacity=len(self.links) + 1)
+    
+    self.__store = componentStore
+    
+    for component in self.getComponents():
+      componentStore.add(component)
+    
+    self.invalidateStoreIndices()
+    
+    return componentStore
+  
+  def invalidateStoreIndices(self):
+    """
+    Forget the cached store indices, so they are found again by the next call to
+    getStoreIndices(). Call this after removing or replacing links in the list of links.
+    """
+    
+    self.__storeIndices = numpy.zeros(0, dtype=int)
+    
+    # list of links, and number of them, the indices were found for, and ids of their
+    # components
+    self.__indexedLinks = self.links
+    self.__indexedLinkCount = 0
+    self.__indexedComponentIds = set([])
+  
+  def getStoreIndices(self):
+    """
+    Get array of the store indices of the scene's components, in the order given by
+    getComponents(). The array is cached, and must not be changed. Components of links
+    appended to the list of links directly are added to the store, and their indices to
+    the array.
+    """
+    
+    if self.__store is None:
+      raise Exception('Scene does not use a store')
+    
+    if self.__indexedLinks is not self.links or len(self.links) < self.__indexedLinkCount:
+      # list of links replaced, or links removed from it
+      self.invalidateStoreIndices()
+    
+    if self.__indexedLinkCount == len(self.links):
+      return self.__storeIndices
+    
+    indices = []
+    
+    # links appended since the indices were found come after those already indexed, as
+    # do their components in getComponents()
+    for link in self.links[self.__indexedLinkCount:]:
+      for component in (link.inputNode.component, link.outputNode.component):
+        if id(component) not in self.__indexedComponentIds:
+          self.__indexedComponentIds.add(id(component))
+          
+          # add() returns the index of components already in the store
+          indices.append(self.__store.add(component))
+    
+    self.__storeIndices = numpy.concatenate((self.__storeIndices, numpy.array(indices, dtype=int)))
+    self.__indexedLinkCount = len(self.links)
+    
+    return self.__storeIndices
+  
+  def save(self, path, fileFormat=None):
+    """
+    Save scene to path, as JSON or in the compact binary format. If fileFormat is not
+    specified, it is determined from the file extension (.json or .optivis).
+    """
+    
+    serialisation.save(self, path, fileFormat=fileFormat)
+  
+  @staticmethod
+  def load(path, fileFormat=None):
+    """
+    Load scene saved with save().
+    """
+    
+    return serialisation.load(path, fileFormat=fileFormat)
+  
+  def getGeometry(self):
+    """
+    Get a snapshot of the laid out geometry of the scene. This is a tuple containing a
+    list of (position, azimuth, aoi) for each component, in the order given by
+    getComponents(), and a list of (start, end) for each link, in the order of links.
+    """
+    
+    componentGeometry = [(component.position, component.azimuth, component.aoi) for component in self.getComponents()]
+    linkGeometry = [(link.start, link.end) for link in self.links]
+    
+    return (componentGeometry, linkGeometry)
+  
+  def setGeometry(self, geometry):
+    """
+    Apply a geometry snapshot created by getGeometry() on this scene or on a copy of it.
+    """
+    
+    (componentGeometry, linkGeometry) = geometry
+    
+    components = self.getComponents()
+    
+    if len(componentGeometry) != len(components) or len(linkGeometry) != len(self.links):
+      raise Exception('Specified geometry does not match the components and links in this scene')
+    
+    for component, (position, azimuth, aoi) in zip(components, componentGeometry):
+      component.position = position
+      component.azimuth = azimuth
+      component.aoi = aoi
+    
+    for link, (start, end) in zip(self.links, linkGeometry):
+      link.start = start
+      link.end = end
+  
   def getBoundingBox(self):
+    if self.__store is not None:
+      return self.__store.getBoundingBox(self.getStoreIndices())
+    
     # set initial bounds to infinity
     lowerBound = geometry.Coordinates(float('inf'), float('inf'))
     upperBound = geometry.Coordinates(float('-inf'), float('-inf'))
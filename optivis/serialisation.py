@@ -0,0 +1,901 @@
+"""
+Saving and loading of scenes.
+
+Scenes can be saved as JSON, for interoperability with other tools, or in a compact
+binary format which is read back as a stream of records. Both formats store
+components by class and parameters, links with their specs, labels with their
+offsets and content, constraints and the scene reference.
+
+Tooltips are only saved if they are strings, and the external (e.g. pykat) objects
+attached to bench items are not saved at all.
+
+Loading only imports classes from Optivis modules, so a file can't cause other modules
+to be imported.
+"""
+
+from __future__ import unicode_literals, division
+
+import os
+import gc
+import json
+import contextlib
+import math
+import struct
+import importlib
+
+import numpy
+
+import optivis.scene
+import optivis.geometry
+import optivis.bench.components
+import optivis.bench.links
+import optivis.bench.labels
+import optivis.layout.constraints
+
+FORMAT_JSON = 'json'
+FORMAT_BINARY = 'binary'
+
+# file extensions used to guess the format when it is not specified
+EXTENSIONS = {'.json': FORMAT_JSON, '.optivis': FORMAT_BINARY}
+
+# version of the JSON format
+VERSION = 1
+
+def save(scene, path, fileFormat=None):
+  """
+  Save scene to path. The format is guessed from the file extension if not specified.
+  """
+
+  fileFormat = getFormat(path, fileFormat)
+
+  with pausedGarbageCollection():
+    if fileFormat == FORMAT_JSON:
+      with open(path, 'w') as f:
+        # dumps() uses the C encoder, unlike dump()
+        f.write(json.dumps(sceneToDict(scene)))
+    else:
+      with open(path, 'wb') as f:
+        BinarySceneWriter(f).write(scene)
+
+def load(path, fileFormat=None):
+  """
+  Load scene from path. The format is guessed from the file extension if not specified.
+  """
+
+  fileFormat = getFormat(path, fileFormat)
+
+  with pausedGarbageCollection():
+    if fileFormat == FORMAT_JSON:
+      with open(path, 'r') as f:
+        return sceneFromDict(json.load(f))
+    else:
+      with open(path, 'rb') as f:
+        return BinarySceneReader(f).read()
+
+@contextlib.contextmanager
+def pausedGarbageCollection():
+  """
+  Pause the cyclic garbage collector. Saving and loading allocate many objects without
+  freeing any, which otherwise makes the collector repeatedly scan the whole scene.
+  """
+
+  gcEnabled = gc.isenabled()
+  gc.disable()
+
+  try:
+    yield
+  finally:
+    if gcEnabled:
+      gc.enable()
+
+def getFormat(path, fileFormat=None):
+  if fileFormat is None:
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension not in EXTENSIONS:
+      raise Exception('Cannot determine scene file format from extension \'{0}\''.format(extension))
+
+    fileFormat = EXTENSIONS[extension]
+
+  if fileFormat not in (FORMAT_JSON, FORMAT_BINARY):
+    raise Exception('Specified scene file format is invalid')
+
+  return fileFormat
+
+def getClassName(obj, module):
+  """
+  Name of the object's class, relative to module if it is defined there.
+  """
+
+  if obj.__class__.__module__ == module.__name__:
+    return obj.__class__.__name__
+
+  return '{0}.{1}'.format(obj.__class__.__module__, obj.__class__.__name__)
+
+def getClass(className, module, baseClass):
+  """
+  Get class from a name created by getClassName().
+  """
+
+  if '.' in className:
+    (moduleName, className) = className.rsplit('.', 1)
+
+    # names come from files, which mustn't be able to import arbitrary modules
+    if moduleName != 'optivis' and not moduleName.startswith('optivis.'):
+      raise Exception('Class {0}.{1} is not in an Optivis module'.format(moduleName, className))
+
+    module = importlib.import_module(moduleName)
+
+  cls = getattr(module, className, None)
+
+  if cls is None or not isinstance(cls, type) or not issubclass(cls, baseClass):
+    raise Exception('Class {0} is not a subclass of {1}'.format(className, baseClass.__name__))
+
+  return cls
+
+def getTooltip(component):
+  # callable tooltips can't be saved
+  if isinstance(component.tooltip, basestring):
+    return component.tooltip
+
+  return None
+
+def getContentValue(value):
+  # content values other than basic types are saved as their string representation
+  if value is None or isinstance(value, (bool, int, long, float, basestring)):
+    return value
+
+  return unicode(value)
+
+class SceneItemFactory(object):
+  """
+  Creates components and links from saved values. Only the first component of each
+  class is made by the class's constructor; the rest, and links, are made from their
+  state like unpickled items, without their values being checked one at a time again.
+  """
+
+  def __init__(self):
+    # (class, filename, input node definitions, output node definitions) by class name
+    self.classes = {}
+
+    # indices of nodes in the components' node lists by (class, node name), which are the
+    # same for every component of a class made by the factory
+    self.nodeIndices = {}
+
+  def createComponent(self, className, name, aoi, azimuth, x, y, sizeX, sizeY, tooltip):
+    """
+    Create component from values which are checked first.
+    """
+
+    (aoi, azimuth, x, y, sizeX, sizeY) = (float(aoi), float(azimuth), float(x), float(y), float(sizeX), float(sizeY))
+
+    if not isinstance(name, basestring):
+      raise Exception('Specified name is not of type basestring')
+
+    if tooltip is not None and not isinstance(tooltip, basestring):
+      raise Exception('Specified tooltip is not of type basestring')
+
+    if sizeX < 0 or sizeY < 0:
+      raise Exception('Size dimensions must be positive')
+
+    return self.restoreComponent(className, name, aoi, azimuth, x, y, sizeX, sizeY, tooltip)
+
+  def restoreComponent(self, className, name, aoi, azimuth, x, y, sizeX, sizeY, tooltip):
+    """
+    Create component from values of the right types, with non-negative size.
+    """
+
+    try:
+      (componentClass, filename, inputNodeDefinitions, outputNodeDefinitions) = self.classes[className]
+    except KeyError:
+      componentClass = getClass(className, optivis.bench.components, optivis.bench.components.AbstractComponent)
+
+      prototype = componentClass(name=name, aoi=aoi, azimuth=azimuth, position=optivis.geometry.Coordinates(x, y), tooltip=tooltip)
+      (filename, inputNodeDefinitions, outputNodeDefinitions) = prototype.__getstate__()[1:4]
+
+      self.classes[className] = (componentClass, filename, inputNodeDefinitions, outputNodeDefinitions)
+
+    component = componentClass.__new__(componentClass)
+    component.__setstate__((name, filename, inputNodeDefinitions, outputNodeDefinitions, tooltip, (optivis.geometry.Coordinates(sizeX, sizeY), azimuth % 360, aoi % 360, optivis.geometry.Coordinates(x, y)), ([], None)))
+
+    return component
+
+  def getNode(self, component, isInput, nodeName):
+    """
+    Get input or output node of a component made by the factory.
+    """
+
+    key = (component.__class__, isInput, nodeName)
+
+    try:
+      index = self.nodeIndices[key]
+    except KeyError:
+      # raises an exception listing the valid names if there is no such node
+      if isInput:
+        index = component.inputNodes.index(component.getInputNode(nodeName))
+      else:
+        index = component.outputNodes.index(component.getOutputNode(nodeName))
+
+      self.nodeIndices[key] = index
+
+    if isInput:
+      return component.inputNodes[index]
+
+    return component.outputNodes[index]
+
+  def createLink(self, outputComponent, outputNodeName, inputComponent, inputNodeName, length, startX, startY, endX, endY, specs):
+    """
+    Create link between components made by the factory. length is None or a float, and
+    positions are floats.
+    """
+
+    if outputComponent is inputComponent:
+      raise Exception('Cannot link component directly to itself')
+
+    outputNode = self.getNode(outputComponent, False, outputNodeName)
+    inputNode = self.getNode(inputComponent, True, inputNodeName)
+
+    link = optivis.bench.links.Link.__new__(optivis.bench.links.Link)
+    link.__setstate__((outputNode, inputNode, length, optivis.geometry.Coordinates(startX, startY), optivis.geometry.Coordinates(endX, endY), specs, ([], None)))
+
+    return link
+
+def createConstraint(className, linkA, linkB, angle):
+  constraintClass = getClass(className, optivis.layout.constraints, optivis.layout.constraints.LinkAngularConstraint)
+
+  return constraintClass(angle=angle, linkA=linkA, linkB=linkB)
+
+def createScene(title):
+  return optivis.scene.Scene(title=title)
+
+def checkConstraint(constraint):
+  if not isinstance(constraint, optivis.layout.constraints.LinkAngularConstraint):
+    raise Exception('Constraint {0} cannot be saved'.format(constraint))
+
+def getLength(link):
+  # links without a length are saved with a length of NaN
+  if link.length is None:
+    return float('nan')
+
+  return link.length
+
+def getSavedLength(length):
+  if math.isnan(length):
+    return None
+
+  return length
+
+###
+# JSON form
+
+def sceneToDict(scene):
+  """
+  Convert scene to a dict of basic types suitable for JSON encoding.
+  """
+
+  components = scene.getComponents()
+  componentIndices = dict((id(component), i) for i, component in enumerate(components))
+  linkIndices = dict((id(link), i) for i, link in enumerate(scene.links))
+
+  data = {
+    'format': 'optivis-scene',
+    'version': VERSION,
+    'title': scene.title,
+    'reference': None,
+    'components': [],
+    'links': [],
+    'constraints': []
+  }
+
+  if scene.reference is not None:
+    if id(scene.reference) not in componentIndices:
+      raise Exception('Scene reference {0} is not linked to any other component'.format(scene.reference))
+
+    data['reference'] = componentIndices[id(scene.reference)]
+
+  for component in components:
+    data['components'].append({
+      'class': getClassName(component, optivis.bench.components),
+      'name': component.name,
+      'aoi': component.aoi,
+      'azimuth': component.azimuth,
+      'position': [component.position.x, component.position.y],
+      'size': [component.size.x, component.size.y],
+      'tooltip': getTooltip(component),
+      'labels': [labelToDict(label) for label in component.labels]
+    })
+
+  for link in scene.links:
+    data['links'].append({
+      'output': [componentIndices[id(link.outputNode.component)], link.outputNode.name],
+      'input': [componentIndices[id(link.inputNode.component)], link.inputNode.name],
+      'length': link.length,
+      'start': [link.start.x, link.start.y],
+      'end': [link.end.x, link.end.y],
+      'specs': [specToDict(spec) for spec in link.specs],
+      'labels': [labelToDict(label) for label in link.labels]
+    })
+
+  for constraint in scene.constraints:
+    checkConstraint(constraint)
+
+    data['constraints'].append({
+      'class': getClassName(constraint, optivis.layout.constraints),
+      'links': [linkIndices[id(constraint.linkA)], linkIndices[id(constraint.linkB)]],
+      'angle': constraint.angle
+    })
+
+  return data
+
+def sceneFromDict(data):
+  """
+  Create scene from a dict created by sceneToDict().
+  """
+
+  if data.get('format') != 'optivis-scene':
+    raise Exception('Specified data is not an Optivis scene')
+
+  if data.get('version') > VERSION:
+    raise Exception('Scene format version {0} is not supported'.format(data.get('version')))
+
+  scene = createScene(data['title'])
+
+  factory = SceneItemFactory()
+  components = []
+
+  # links with identical specs share them, like forked links
+  specs = {}
+
+  for componentData in data['components']:
+    component = factory.createComponent(componentData['class'], componentData['name'], componentData['aoi'], componentData['azimuth'], componentData['position'][0], componentData['position'][1], componentData['size'][0], componentData['size'][1], componentData['tooltip'])
+
+    if len(componentData['labels']) > 0:
+      component.labels = [labelFromDict(labelData) for labelData in componentData['labels']]
+
+    components.append(component)
+
+  for linkData in data['links']:
+    linkSpecs = []
+
+    for specData in linkData['specs']:
+      key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in specData.iteritems()))
+
+      if key not in specs:
+        specs[key] = specFromDict(specData)
+
+      linkSpecs.append(specs[key])
+
+    length = linkData['length']
+
+    if length is not None:
+      length = float(length)
+
+    (startX, startY) = [float(value) for value in linkData['start']]
+    (endX, endY) = [float(value) for value in linkData['end']]
+
+    link = factory.createLink(components[linkData['output'][0]], linkData['output'][1], components[linkData['input'][0]], linkData['input'][1], length, startX, startY, endX, endY, linkSpecs)
+
+    if len(linkData['labels']) > 0:
+      link.labels = [labelFromDict(labelData) for labelData in linkData['labels']]
+
+    scene.addLink(link)
+
+  for constraintData in data['constraints']:
+    (linkA, linkB) = [scene.links[i] for i in constraintData['links']]
+
+    scene.addConstraint(createConstraint(constraintData['class'], linkA, linkB, constraintData['angle']))
+
+  if data['reference'] is not None:
+    scene.reference = components[data['reference']]
+
+  return scene
+
+def specToDict(spec):
+  return {
+    'width': spec.width,
+    'color': spec.color,
+    'pattern': list(spec.pattern),
+    'offset': spec.offset,
+    'startMarker': spec.startMarker,
+    'endMarker': spec.endMarker,
+    'startMarkerRadius': spec.startMarkerRadius,
+    'endMarkerRadius': spec.endMarkerRadius,
+    'startMarkerColor': spec.startMarkerColor,
+    'endMarkerColor': spec.endMarkerColor
+  }
+
+def specFromDict(data):
+  return optivis.bench.links.LinkSpec(**data)
+
+def labelToDict(label):
+  return {
+    'text': label.text,
+    'position': [label.position.x, label.position.y],
+    'azimuth': label.azimuth,
+    'offset': [label.offset.x, label.offset.y],
+    'content': dict((key, getContentValue(value)) for key, value in label.content.iteritems())
+  }
+
+def labelFromDict(data):
+  return optivis.bench.labels.Label(text=data['text'], position=optivis.geometry.Coordinates(*data['position']), azimuth=data['azimuth'], offset=optivis.geometry.Coordinates(*data['offset']), content=data['content'])
+
+###
+# Binary form
+#
+# A binary scene file is a header followed by a stream of records, each starting with
+# a one byte record type. Strings are stored once in string records and referred to
+# by index, and identical link specs are stored once in spec records. Components and
+# links are stored in blocks of arrays with a row for each, which are read in one go.
+# All numbers are little endian.
+
+class BinarySceneFormat(object):
+  MAGIC = b'OPTIVIS\x00'
+
+  # version 1 files have a record for each component and link rather than blocks, and
+  # are still read
+  VERSION = 2
+
+  # no string, component or length
+  NONE = 0xFFFFFFFF
+
+  RECORD_STRING = 1
+  RECORD_TITLE = 2
+  RECORD_COMPONENT = 3
+  RECORD_SPEC = 4
+  RECORD_LINK = 5
+  RECORD_LABEL = 6
+  RECORD_CONSTRAINT = 7
+  RECORD_REFERENCE = 8
+  RECORD_END = 9
+  RECORD_COMPONENTS = 10
+  RECORD_LINKS = 11
+  RECORD_STRINGS = 12
+
+  # label owners
+  OWNER_COMPONENT = 0
+  OWNER_LINK = 1
+
+  # label content value types
+  VALUE_NONE = 0
+  VALUE_BOOL = 1
+  VALUE_INT = 2
+  VALUE_FLOAT = 3
+  VALUE_STRING = 4
+
+  header = struct.Struct(str('<8sH'))
+  recordType = struct.Struct(str('<B'))
+  index = struct.Struct(str('<I'))
+  count = struct.Struct(str('<H'))
+
+  # class, name, tooltip, aoi, azimuth, position x and y, size x and y
+  component = struct.Struct(str('<IIIdddddd'))
+
+  # width, color, offset, start marker, end marker, start marker radius, end marker radius,
+  # start marker color, end marker color, number of pattern elements
+  spec = struct.Struct(str('<dIdBBddIIH'))
+
+  # output component, output node, input component, input node, length, start x and y,
+  # end x and y, number of specs
+  link = struct.Struct(str('<IIIIdddddH'))
+
+  # owner type, owner index, text, position x and y, azimuth, offset x and y, number of content items
+  label = struct.Struct(str('<BIIdddddH'))
+
+  # content key, value type
+  contentItem = struct.Struct(str('<IB'))
+
+  # class, link A, link B, angle
+  constraint = struct.Struct(str('<IIId'))
+
+  # lengths of the strings of string blocks, which are followed by the strings
+  stringLengths = (numpy.dtype(str('<u4')), 1)
+
+  # rows of component blocks: class, name and tooltip, then aoi, azimuth, position x and
+  # y, size x and y
+  componentIndices = (numpy.dtype(str('<u4')), 3)
+  componentValues = (numpy.dtype(str('<f8')), 6)
+
+  # rows of link blocks: output component, output node, input component and input node,
+  # then length, start x and y and end x and y, then the number of specs, followed by
+  # the spec indices of every link
+  linkIndices = (numpy.dtype(str('<u4')), 4)
+  linkValues = (numpy.dtype(str('<f8')), 5)
+  linkSpecCounts = (numpy.dtype(str('<u2')), 1)
+  linkSpecIndices = (numpy.dtype(str('<u4')), 1)
+
+  boolValue = struct.Struct(str('<B'))
+  intValue = struct.Struct(str('<q'))
+  floatValue = struct.Struct(str('<d'))
+
+class BinarySceneWriter(BinarySceneFormat):
+  def __init__(self, f):
+    self.file = f
+
+    # string and spec tables
+    self.strings = {}
+    self.specs = {}
+
+  def write(self, scene):
+    self.file.write(self.header.pack(self.MAGIC, self.VERSION))
+
+    self.writeRecord(self.RECORD_TITLE, self.index, self.getString(scene.title))
+
+    components = scene.getComponents()
+    componentIndices = {}
+
+    strings = []
+    values = []
+
+    for i, component in enumerate(components):
+      componentIndices[id(component)] = i
+
+      (position, size) = (component.position, component.size)
+
+      strings.extend((getClassName(component, optivis.bench.components), component.name, getTooltip(component)))
+      values.append((component.aoi, component.azimuth, position.x, position.y, size.x, size.y))
+
+    # strings are written before the block which refers to them
+    indices = self.getStrings(strings)
+
+    self.writeRecord(self.RECORD_COMPONENTS, self.index, len(components))
+    self.writeArray(self.componentIndices, indices)
+    self.writeArray(self.componentValues, values)
+
+    for i, component in enumerate(components):
+      for label in component.labels:
+        self.writeLabel(self.OWNER_COMPONENT, i, label)
+
+    linkIndices = {}
+
+    strings = []
+    values = []
+    specCounts = []
+    specIndices = []
+
+    for i, link in enumerate(scene.links):
+      linkIndices[id(link)] = i
+
+      (outputNode, inputNode, start, end) = (link.outputNode, link.inputNode, link.start, link.end)
+
+      strings.extend((outputNode.name, inputNode.name))
+      values.append((getLength(link), start.x, start.y, end.x, end.y))
+
+      # as are specs
+      linkSpecIndices = [self.getSpec(spec) for spec in link.specs]
+
+      specCounts.append(len(linkSpecIndices))
+      specIndices.extend(linkSpecIndices)
+
+    nodeNames = self.getStrings(strings)
+
+    indices = [(componentIndices[id(link.outputNode.component)], nodeNames[2 * i], componentIndices[id(link.inputNode.component)], nodeNames[2 * i + 1]) for i, link in enumerate(scene.links)]
+
+    self.writeRecord(self.RECORD_LINKS, self.index, len(scene.links))
+    self.writeArray(self.linkIndices, indices)
+    self.writeArray(self.linkValues, values)
+    self.writeArray(self.linkSpecCounts, specCounts)
+    self.writeArray(self.linkSpecIndices, specIndices)
+
+    for i, link in enumerate(scene.links):
+      for label in link.labels:
+        self.writeLabel(self.OWNER_LINK, i, label)
+
+    for constraint in scene.constraints:
+      checkConstraint(constraint)
+
+      self.writeRecord(self.RECORD_CONSTRAINT, self.constraint, self.getString(getClassName(constraint, optivis.layout.constraints)), linkIndices[id(constraint.linkA)], linkIndices[id(constraint.linkB)], constraint.angle)
+
+    if scene.reference is not None:
+      if id(scene.reference) not in componentIndices:
+        raise Exception('Scene reference {0} is not linked to any other component'.format(scene.reference))
+
+      self.writeRecord(self.RECORD_REFERENCE, self.index, componentIndices[id(scene.reference)])
+
+    self.file.write(self.recordType.pack(self.RECORD_END))
+
+  def writeRecord(self, recordType, recordStruct, *values):
+    self.file.write(self.recordType.pack(recordType) + recordStruct.pack(*values))
+
+  def writeArray(self, arrayFormat, rows):
+    (dtype, width) = arrayFormat
+
+    # rows may also be given as a flat list
+    self.file.write(numpy.array(rows, dtype=dtype).reshape(-1, width).tostring())
+
+  def getString(self, string):
+    """
+    Get index of string in the string table, writing a string record if it's not yet in the table.
+    """
+
+    if string is None:
+      return self.NONE
+
+    if string not in self.strings:
+      data = string.encode('utf-8')
+
+      self.file.write(self.recordType.pack(self.RECORD_STRING) + self.index.pack(len(data)) + data)
+
+      self.strings[string] = len(self.strings)
+
+    return self.strings[string]
+
+  def getStrings(self, strings):
+    """
+    Get list of the indices of strings in the string table, writing those not yet in the
+    table in a string block.
+    """
+
+    indices = []
+    data = []
+
+    for string in strings:
+      if string is None:
+        indices.append(self.NONE)
+        continue
+
+      index = self.strings.get(string)
+
+      if index is None:
+        index = self.strings[string] = len(self.strings)
+
+        data.append(string.encode('utf-8'))
+
+      indices.append(index)
+
+    if len(data) > 0:
+      self.writeRecord(self.RECORD_STRINGS, self.index, len(data))
+      self.writeArray(self.stringLengths, [len(stringData) for stringData in data])
+      self.file.write(b''.join(data))
+
+    return indices
+
+  def getSpec(self, spec):
+    """
+    Get index of spec in the spec table, writing a spec record if an identical spec is not yet in the table.
+    """
+
+    key = (spec.width, spec.color, spec.offset, bool(spec.startMarker), bool(spec.endMarker), spec.startMarkerRadius, spec.endMarkerRadius, spec.startMarkerColor, spec.endMarkerColor, tuple(spec.pattern))
+
+    if key not in self.specs:
+      values = list(key[:-1])
+
+      # replace strings with string table indices
+      for i in (1, 7, 8):
+        values[i] = self.getString(values[i])
+
+      self.writeRecord(self.RECORD_SPEC, self.spec, *(values + [len(spec.pattern)]))
+      self.file.write(struct.pack(str('<{0}d'.format(len(spec.pattern))), *spec.pattern))
+
+      self.specs[key] = len(self.specs)
+
+    return self.specs[key]
+
+  def writeLabel(self, ownerType, ownerIndex, label):
+    # string records can't appear within the label record, so add the label's strings to the table first
+    text = self.getString(label.text)
+    content = []
+
+    for key, value in label.content.iteritems():
+      value = getContentValue(value)
+
+      if isinstance(value, basestring):
+        self.getString(value)
+
+      content.append((self.getString(key), value))
+
+    self.writeRecord(self.RECORD_LABEL, self.label, ownerType, ownerIndex, text, label.position.x, label.position.y, label.azimuth, label.offset.x, label.offset.y, len(content))
+
+    for keyIndex, value in content:
+      if value is None:
+        self.file.write(self.contentItem.pack(keyIndex, self.VALUE_NONE))
+      elif isinstance(value, bool):
+        self.file.write(self.contentItem.pack(keyIndex, self.VALUE_BOOL) + self.boolValue.pack(value))
+      elif isinstance(value, (int, long)):
+        self.file.write(self.contentItem.pack(keyIndex, self.VALUE_INT) + self.intValue.pack(value))
+      elif isinstance(value, float):
+        self.file.write(self.contentItem.pack(keyIndex, self.VALUE_FLOAT) + self.floatValue.pack(value))
+      else:
+        valueIndex = self.getString(value)
+
+        self.file.write(self.contentItem.pack(keyIndex, self.VALUE_STRING) + self.index.pack(valueIndex))
+
+class BinarySceneReader(BinarySceneFormat):
+  """
+  Reads a binary scene from a file object as a stream of records, creating scene items
+  as it goes. The file is read in chunks, so it is never held in memory in full.
+  """
+
+  chunkSize = 1 << 16
+
+  def __init__(self, f):
+    self.file = f
+
+    self.buffer = b''
+    self.offset = 0
+
+  def read(self):
+    (magic, version) = self.unpack(self.header)
+
+    if magic != self.MAGIC:
+      raise Exception('Specified file is not an Optivis binary scene')
+
+    if version > self.VERSION:
+      raise Exception('Scene format version {0} is not supported'.format(version))
+
+    scene = None
+    strings = []
+    specs = []
+    factory = SceneItemFactory()
+    components = []
+    links = []
+    labels = {}
+
+    while True:
+      (recordType,) = self.unpack(self.recordType)
+
+      if recordType == self.RECORD_STRING:
+        (length,) = self.unpack(self.index)
+
+        strings.append(self.readBytes(length).decode('utf-8'))
+      elif recordType == self.RECORD_STRINGS:
+        (count,) = self.unpack(self.index)
+
+        lengths = self.readArray(self.stringLengths, count).tolist()
+        data = self.readBytes(sum(length for (length,) in lengths))
+
+        offset = 0
+
+        for (length,) in lengths:
+          strings.append(data[offset:offset + length].decode('utf-8'))
+          offset += length
+      elif recordType == self.RECORD_TITLE:
+        (title,) = self.unpack(self.index)
+
+        scene = createScene(strings[title])
+      elif recordType == self.RECORD_COMPONENT:
+        (className, name, tooltip, aoi, azimuth, x, y, sizeX, sizeY) = self.unpack(self.component)
+
+        components.append(factory.createComponent(strings[className], strings[name], aoi, azimuth, x, y, sizeX, sizeY, self.getString(strings, tooltip)))
+      elif recordType == self.RECORD_COMPONENTS:
+        (count,) = self.unpack(self.index)
+
+        indices = self.readArray(self.componentIndices, count)
+        values = self.readArray(self.componentValues, count)
+
+        # the values are checked for the whole block at once
+        if numpy.any(values[:, 4:] < 0):
+          raise Exception('Size dimensions must be positive')
+
+        for (className, name, tooltip), (aoi, azimuth, x, y, sizeX, sizeY) in zip(indices.tolist(), values.tolist()):
+          components.append(factory.restoreComponent(strings[className], strings[name], aoi, azimuth, x, y, sizeX, sizeY, self.getString(strings, tooltip)))
+      elif recordType == self.RECORD_SPEC:
+        values = self.unpack(self.spec)
+        pattern = list(self.unpack(struct.Struct(str('<{0}d'.format(values[-1])))))
+
+        # links with identical specs share them, like forked links
+        specs.append(self.createSpec(values[0], strings[values[1]], values[2], bool(values[3]), bool(values[4]), values[5], values[6], strings[values[7]], strings[values[8]], pattern))
+      elif recordType == self.RECORD_LINK:
+        (outputComponent, outputNode, inputComponent, inputNode, length, startX, startY, endX, endY, specCount) = self.unpack(self.link)
+        specIndices = self.unpack(struct.Struct(str('<{0}I'.format(specCount))))
+
+        link = factory.createLink(components[outputComponent], strings[outputNode], components[inputComponent], strings[inputNode], getSavedLength(length), startX, startY, endX, endY, [specs[i] for i in specIndices])
+
+        scene.addLink(link)
+        links.append(link)
+      elif recordType == self.RECORD_LINKS:
+        (count,) = self.unpack(self.index)
+
+        indices = self.readArray(self.linkIndices, count).tolist()
+        values = self.readArray(self.linkValues, count).tolist()
+        specCounts = self.readArray(self.linkSpecCounts, count).tolist()
+        specIndices = self.readArray(self.linkSpecIndices, sum(specCount for (specCount,) in specCounts)).tolist()
+
+        specOffset = 0
+
+        for (outputComponent, outputNode, inputComponent, inputNode), (length, startX, startY, endX, endY), (specCount,) in zip(indices, values, specCounts):
+          linkSpecs = [specs[i] for (i,) in specIndices[specOffset:specOffset + specCount]]
+          specOffset += specCount
+
+          link = factory.createLink(components[outputComponent], strings[outputNode], components[inputComponent], strings[inputNode], getSavedLength(length), startX, startY, endX, endY, linkSpecs)
+
+          scene.addLink(link)
+          links.append(link)
+      elif recordType == self.RECORD_LABEL:
+        (ownerType, ownerIndex, text, x, y, azimuth, offsetX, offsetY, contentCount) = self.unpack(self.label)
+
+        content = {}
+
+        for i in range(contentCount):
+          (key, valueType) = self.unpack(self.contentItem)
+
+          content[strings[key]] = self.readContentValue(strings, valueType)
+
+        label = optivis.bench.labels.Label(text=strings[text], position=optivis.geometry.Coordinates(x, y), azimuth=azimuth, offset=optivis.geometry.Coordinates(offsetX, offsetY), content=content)
+
+        # labels are attached once the whole scene has been read
+        labels.setdefault((ownerType, ownerIndex), []).append(label)
+      elif recordType == self.RECORD_CONSTRAINT:
+        (className, linkA, linkB, angle) = self.unpack(self.constraint)
+
+        scene.addConstraint(createConstraint(strings[className], links[linkA], links[linkB], angle))
+      elif recordType == self.RECORD_REFERENCE:
+        (reference,) = self.unpack(self.index)
+
+        scene.reference = components[reference]
+      elif recordType == self.RECORD_END:
+        break
+      else:
+        raise Exception('Invalid record type {0} in scene file'.format(recordType))
+
+    for (ownerType, ownerIndex), itemLabels in labels.iteritems():
+      if ownerType == self.OWNER_COMPONENT:
+        components[ownerIndex].labels = itemLabels
+      else:
+        links[ownerIndex].labels = itemLabels
+
+    return scene
+
+  def createSpec(self, width, color, offset, startMarker, endMarker, startMarkerRadius, endMarkerRadius, startMarkerColor, endMarkerColor, pattern):
+    return optivis.bench.links.LinkSpec(width=width, color=color, pattern=list(pattern), offset=offset, startMarker=startMarker, endMarker=endMarker, startMarkerRadius=startMarkerRadius, endMarkerRadius=endMarkerRadius, startMarkerColor=startMarkerColor, endMarkerColor=endMarkerColor)
+
+  def getString(self, strings, index):
+    if index == self.NONE:
+      return None
+
+    return strings[index]
+
+  def readContentValue(self, strings, valueType):
+    if valueType == self.VALUE_NONE:
+      return None
+    elif valueType == self.VALUE_BOOL:
+      return bool(self.unpack(self.boolValue)[0])
+    elif valueType == self.VALUE_INT:
+      return self.unpack(self.intValue)[0]
+    elif valueType == self.VALUE_FLOAT:
+      return self.unpack(self.floatValue)[0]
+    elif valueType == self.VALUE_STRING:
+      return strings[self.unpack(self.index)[0]]
+    else:
+      raise Exception('Invalid label content type {0} in scene file'.format(valueType))
+
+  def readArray(self, arrayFormat, count):
+    """
+    Read array of count rows.
+    """
+
+    (dtype, width) = arrayFormat
+
+    data = self.readBytes(count * width * dtype.itemsize)
+
+    return numpy.frombuffer(data, dtype=dtype).reshape(count, width)
+
+  def unpack(self, recordStruct):
+    if self.offset + recordStruct.size > len(self.buffer):
+      self.fill(recordStruct.size)
+
+    values = recordStruct.unpack_from(self.buffer, self.offset)
+    self.offset += recordStruct.size
+
+    return values
+
+  def readBytes(self, length):
+    if self.offset + length > len(self.buffer):
+      self.fill(length)
+
+    data = self.buffer[self.offset:self.offset + length]
+    self.offset += length
+
+    return data
+
+  def fill(self, size):
+    """
+    Read the next chunk of the file, keeping any unread data, so at least size bytes are available.
+    """
+
+    remaining = self.buffer[self.offset:]
+
+    self.buffer = remaining + self.file.read(max(self.chunkSize, size - len(remaining)))
+    self.offset = 0
+
+    if len(self.buffer) < size:
+      raise Exception('Unexpected end of scene file')
@@ -0,0 +1,256 @@
+"""
+Uniform grid spatial index for finding bench items whose bounding boxes or segments are
+near each other without comparing every pair of items.
+
+Boxes are stored as (x1, y1, x2, y2) tuples with x1 <= x2 and y1 <= y2.
+"""
+
+from __future__ import unicode_literals, division
+
+import math
+
+def getBox(lowerBound, upperBound):
+  return (lowerBound.x, lowerBound.y, upperBound.x, upperBound.y)
+
+def getSegmentBox(start, end):
+  return (min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y))
+
+def getBoxOverlap(boxA, boxB):
+  """
+  Get the (width, height) of the intersection of two boxes, which are negative if the
+  boxes don't intersect in that direction.
+  """
+
+  return (min(boxA[2], boxB[2]) - max(boxA[0], boxB[0]), min(boxA[3], boxB[3]) - max(boxA[1], boxB[1]))
+
+def boxesOverlap(boxA, boxB, tolerance=0):
+  (width, height) = getBoxOverlap(boxA, boxB)
+
+  return width > tolerance and height > tolerance
+
+def segmentIntersectsBox(start, end, box, tolerance=0):
+  """
+  Check if the segment between the start and end (x, y) tuples passes through the box
+  (shrunk by the tolerance), by clipping the segment to the box.
+  """
+
+  (x1, y1, x2, y2) = (box[0] + tolerance, box[1] + tolerance, box[2] - tolerance, box[3] - tolerance)
+
+  if x1 > x2 or y1 > y2:
+    return False
+
+  (lower, upper) = (0, 1)
+  (dx, dy) = (end[0] - start[0], end[1] - start[1])
+
+  for delta, distanceToLower, distanceToUpper in ((dx, start[0] - x1, x2 - start[0]), (dy, start[1] - y1, y2 - start[1])):
+    if delta == 0:
+      if distanceToLower < 0 or distanceToUpper < 0:
+        # parallel to and outside this pair of edges
+        return False
+
+      continue
+
+    # parameters where the segment crosses the lower and upper edges
+    (t1, t2) = (-distanceToLower / delta, distanceToUpper / delta)
+
+    if t1 > t2:
+      (t1, t2) = (t2, t1)
+
+    (lower, upper) = (max(lower, t1), min(upper, t2))
+
+    if lower > upper:
+      return False
+
+  return True
+
+def segmentsIntersect(startA, endA, startB, endB, tolerance=0):
+  """
+  Check if two segments, with (x, y) tuple ends, cross each other. Segments which only
+  touch at their ends, within the tolerance, don't count.
+  """
+
+  def cross(origin, a, b):
+    return (a[0] - origin[0]) * (b[1] - origin[1]) - (a[1] - origin[1]) * (b[0] - origin[0])
+
+  d1 = cross(startB, endB, startA)
+  d2 = cross(startB, endB, endA)
+  d3 = cross(startA, endA, startB)
+  d4 = cross(startA, endA, endB)
+
+  # scale tolerance by the segment lengths, as the cross products are areas
+  scale = math.hypot(endA[0] - startA[0], endA[1] - startA[1]) * math.hypot(endB[0] - startB[0], endB[1] - startB[1])
+  tolerance *= max(scale, 1)
+
+  return ((d1 > tolerance and d2 < -tolerance) or (d1 < -tolerance and d2 > tolerance)) and ((d3 > tolerance and d4 < -tolerance) or (d3 < -tolerance and d4 > tolerance))
+
+class GridIndex(object):
+  """
+  Spatial index which puts items into the cells of a uniform grid covered by their
+  bounding boxes, or by their segments for long thin items such as links. Queries only
+  look at items in the cells they cover, so with a cell size similar to the size of the
+  items, finding the neighbours of an item takes roughly constant time.
+  """
+
+  def __init__(self, cellSize):
+    if cellSize <= 0:
+      raise Exception('Cell size must be greater than 0')
+
+    self.cellSize = float(cellSize)
+
+    # lists of item keys by cell
+    self.cells = {}
+
+    # (item, box, segment, cells) by item key
+    self.items = {}
+
+  def getCellRange(self, box):
+    return (int(math.floor(box[0] / self.cellSize)), int(math.floor(box[1] / self.cellSize)), int(math.floor(box[2] / self.cellSize)), int(math.floor(box[3] / self.cellSize)))
+
+  def getBoxCells(self, box):
+    (i1, j1, i2, j2) = self.getCellRange(box)
+
+    return [(i, j) for i in range(i1, i2 + 1) for j in range(j1, j2 + 1)]
+
+  def getSegmentCells(self, start, end):
+    # step along the segment in pieces shorter than a cell, adding the cells covered by
+    # each piece's box, so that long diagonal segments don't cover their whole box
+    length = math.hypot(end[0] - start[0], end[1] - start[1])
+    steps = max(1, int(math.ceil(length / self.cellSize)))
+
+    cells = set([])
+    previous = start
+
+    for step in range(1, steps + 1):
+      point = (start[0] + (end[0] - start[0]) * step / steps, start[1] + (end[1] - start[1]) * step / steps)
+
+      cells.update(self.getBoxCells((min(previous[0], point[0]), min(previous[1], point[1]), max(previous[0], point[0]), max(previous[1], point[1]))))
+
+      previous = point
+
+    return cells
+
+  def addItem(self, item, box, segment, cells):
+    key = id(item)
+
+    if key in self.items:
+      self.remove(item)
+
+    self.items[key] = (item, box, segment, cells)
+
+    for cell in cells:
+      self.cells.setdefault(cell, []).append(key)
+
+  def insert(self, item, lowerBound, upperBound):
+    """
+    Add item with the specified bounding box.
+    """
+
+    box = getBox(lowerBound, upperBound)
+
+    self.addItem(item, box, None, self.getBoxCells(box))
+
+  def insertSegment(self, item, start, end):
+    """
+    Add item which is a line segment between the specified start and end.
+    """
+
+    segment = ((start.x, start.y), (end.x, end.y))
+
+    self.addItem(item, getSegmentBox(start, end), segment, self.getSegmentCells(*segment))
+
+  def remove(self, item):
+    (item, box, segment, cells) = self.items.pop(id(item))
+
+    for cell in cells:
+      keys = self.cells[cell]
+      keys.remove(id(item))
+
+      if len(keys) == 0:
+        del(self.cells[cell])
+
+  def getBox(self, item):
+    return self.items[id(item)][1]
+
+  def getSegment(self, item):
+    """
+    Get ((x1, y1), (x2, y2)) segment of item, or None if it was inserted as a box.
+    """
+
+    return self.items[id(item)][2]
+
+  def __len__(self):
+    return len(self.items)
+
+  def __contains__(self, item):
+    return id(item) in self.items
+
+  def queryBox(self, box):
+    """
+    Get list of items with bounding boxes intersecting the specified (x1, y1, x2, y2) box.
+    """
+
+    found = set([])
+    items = []
+
+    for cell in self.getBoxCells(box):
+      for key in self.cells.get(cell, []):
+        if key in found:
+          continue
+
+        found.add(key)
+
+        (item, itemBox, segment, cells) = self.items[key]
+
+        if itemBox[0] <= box[2] and box[0] <= itemBox[2] and itemBox[1] <= box[3] and box[1] <= itemBox[3]:
+          items.append(item)
+
+    return items
+
+  def query(self, lowerBound, upperBound):
+    """
+    Get list of items with bounding boxes intersecting the specified box.
+    """
+
+    return self.queryBox(getBox(lowerBound, upperBound))
+
+  def getCandidatePairs(self):
+    """
+    Get list of (item, item) pairs that share a cell and have intersecting bounding
+    boxes. Each pair appears once.
+    """
+
+    pairs = set([])
+    candidates = []
+
+    for keys in self.cells.itervalues():
+      for i in range(len(keys)):
+        boxA = self.items[keys[i]][1]
+
+        for j in range(i + 1, len(keys)):
+          pair = (keys[i], keys[j]) if keys[i] < keys[j] else (keys[j], keys[i])
+
+          if pair in pairs:
+            continue
+
+          pairs.add(pair)
+
+          boxB = self.items[keys[j]][1]
+
+          if boxA[0] <= boxB[2] and boxB[0] <= boxA[2] and boxA[1] <= boxB[3] and boxB[1] <= boxA[3]:
+            candidates.append((self.items[pair[0]][0], self.items[pair[1]][0]))
+
+    return candidates
+
+def getCellSize(boxes):
+  """
+  Get a grid cell size suited to the specified boxes: the median of their larger
+  dimensions.
+  """
+
+  sizes = sorted(max(box[2] - box[0], box[3] - box[1]) for box in boxes)
+  sizes = [size for size in sizes if size > 0]
+
+  if len(sizes) == 0:
+    return 1
+
+  return sizes[len(sizes) // 2]
@@ -0,0 +1,263 @@
+"""
+Array backed (struct-of-arrays) storage of component geometry.
+
+A component added to a ComponentStore keeps its position, azimuth, angle of incidence
+and size in rows of a single NumPy array shared by every component in the store, at the
+component's integer index, instead of in its own attributes. The component's properties
+read and write the arrays, so it is used in the same way as any other component, while
+operations on many components at once (bounding boxes, translations, parameter sweeps)
+work on whole arrays rather than looping over components.
+
+Scenes create a store with Scene.useStore().
+"""
+
+from __future__ import unicode_literals, division
+
+import numpy
+
+import optivis.geometry
+
+# rows of the store's array, each also available as an attribute of the store
+FIELDS = ('x', 'y', 'azimuth', 'aoi', 'width', 'height')
+
+# fields which are angles, kept between 0 and 360 like the component properties
+ANGLE_FIELDS = set(['azimuth', 'aoi'])
+
+# fields which must not be negative
+SIZE_FIELDS = set(['width', 'height'])
+
+class ComponentStore(object):
+  def __init__(self, capacity=64):
+    """
+    capacity is the number of components space is initially made for, which grows as
+    components are added
+    """
+
+    # components by index, with None where components have been removed
+    self.components = []
+
+    self.allocate(max(capacity, 1))
+
+  def allocate(self, capacity):
+    """
+    Make space for capacity components, keeping the current values.
+    """
+
+    data = numpy.zeros((len(FIELDS), capacity))
+    active = numpy.zeros(capacity, dtype=bool)
+
+    if hasattr(self, 'data'):
+      data[:, :len(self.components)] = self.data[:, :len(self.components)]
+      active[:len(self.components)] = self.active[:len(self.components)]
+
+    self.data = data
+    self.active = active
+
+    # each field is a view of its row
+    for row, field in enumerate(FIELDS):
+      setattr(self, field, data[row])
+
+  def __getstate__(self):
+    # fields are views of the array, so are made again rather than copied
+    return (self.components, self.data, self.active)
+
+  def __setstate__(self, state):
+    (self.components, data, active) = state
+
+    self.data = data
+    self.active = active
+
+    for row, field in enumerate(FIELDS):
+      setattr(self, field, data[row])
+
+  def fork(self):
+    """
+    Get a copy of this store with copies of the arrays, for forks of its components, which
+    are made with AbstractComponent.fork() and keep their geometry in it at the same
+    indices. Components which aren't forked are left out of the copy.
+    """
+
+    componentStore = ComponentStore.__new__(ComponentStore)
+    componentStore.__setstate__(([None] * len(self.components), self.data.copy(), numpy.zeros_like(self.active)))
+
+    return componentStore
+
+  def addFork(self, component, index):
+    """
+    Keep the geometry of component, a fork of the component at index in the store this
+    store is a fork of, at index, where it has already been copied. Called by
+    AbstractComponent.fork().
+    """
+
+    self.components[index] = component
+    self.active[index] = True
+
+    component.attachStore(self, index)
+
+  def __len__(self):
+    return int(numpy.count_nonzero(self.active))
+
+  def add(self, component):
+    """
+    Store component's geometry in the arrays, returning its index.
+    """
+
+    if component.store is self:
+      return component.storeIndex
+
+    if component.store is not None:
+      raise Exception('Specified component is already in another store')
+
+    index = len(self.components)
+
+    if index == self.data.shape[1]:
+      self.allocate(2 * index)
+
+    (self.x[index], self.y[index]) = (component.position.x, component.position.y)
+    (self.width[index], self.height[index]) = (component.size.x, component.size.y)
+    self.azimuth[index] = component.azimuth
+    self.aoi[index] = component.aoi
+    self.active[index] = True
+
+    self.components.append(component)
+
+    component.attachStore(self, index)
+
+    return index
+
+  def remove(self, component):
+    """
+    Move component's geometry back to its own attributes. Its index is not reused.
+    """
+
+    if component.store is not self:
+      raise Exception('Specified component is not in this store')
+
+    index = component.storeIndex
+
+    component.detachStore()
+
+    self.components[index] = None
+    self.active[index] = False
+
+  def getComponents(self):
+    return [component for component in self.components if component is not None]
+
+  def getIndices(self, components=None):
+    """
+    Get array of the indices of components, by default all of the components in the
+    store.
+    """
+
+    if components is None:
+      return numpy.flatnonzero(self.active[:len(self.components)])
+
+    indices = []
+
+    for component in components:
+      if component.store is not self:
+        raise Exception('Specified component is not in this store')
+
+      indices.append(component.storeIndex)
+
+    return numpy.array(indices, dtype=int)
+
+  def invalidateTransforms(self, indices):
+    """
+    Make the components at indices forget geometry they have cached, after their values
+    are changed in the arrays.
+    """
+
+    for index in indices:
+      self.components[index].invalidateTransform()
+
+  def getValues(self, field, indices=None):
+    """
+    Get array of field for the components at indices, by default all components.
+    """
+
+    if indices is None:
+      indices = self.getIndices()
+
+    return getattr(self, checkField(field))[indices]
+
+  def setValues(self, field, values, indices=None):
+    """
+    Set field of the components at indices, by default all components, to values (a
+    number or a sequence with one value for each index), e.g. to sweep the angle of
+    incidence of many components at once.
+    """
+
+    field = checkField(field)
+
+    if indices is None:
+      indices = self.getIndices()
+
+    values = numpy.asarray(values, dtype=float)
+
+    if field in ANGLE_FIELDS:
+      values = values % 360
+    elif field in SIZE_FIELDS and numpy.any(values < 0):
+      raise Exception('Size dimensions must be positive')
+
+    getattr(self, field)[indices] = values
+
+    self.invalidateTransforms(indices)
+
+  def translate(self, offset, indices=None):
+    """
+    Move the components at indices, by default all components, by offset.
+    """
+
+    if indices is None:
+      indices = self.getIndices()
+
+    self.x[indices] += offset.x
+    self.y[indices] += offset.y
+
+    self.invalidateTransforms(indices)
+
+  def getBoundingBoxes(self, indices=None):
+    """
+    Get array of (minimum x, minimum y, maximum x, maximum y) of the bounding box of each
+    component at indices, by default all components, the same as each component's
+    getBoundingBox().
+    """
+
+    if indices is None:
+      indices = self.getIndices()
+
+    azimuths = numpy.radians(self.azimuth[indices])
+    (cos, sin) = (numpy.abs(numpy.cos(azimuths)), numpy.abs(numpy.sin(azimuths)))
+
+    halfWidths = self.width[indices] / 2
+    halfHeights = self.height[indices] / 2
+
+    # half the size of the rotated rectangles
+    extentX = halfWidths * cos + halfHeights * sin
+    extentY = halfWidths * sin + halfHeights * cos
+
+    (x, y) = (self.x[indices], self.y[indices])
+
+    return numpy.column_stack((x - extentX, y - extentY, x + extentX, y + extentY))
+
+  def getBoundingBox(self, indices=None):
+    """
+    Get (lower bound, upper bound) of the components at indices, by default all
+    components. Bounds are infinite if there are no components.
+    """
+
+    boxes = self.getBoundingBoxes(indices)
+
+    if len(boxes) == 0:
+      return (optivis.geometry.Coordinates(float('inf'), float('inf')), optivis.geometry.Coordinates(float('-inf'), float('-inf')))
+
+    (lower, upper) = (boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0))
+
+    return (optivis.geometry.Coordinates(float(lower[0]), float(lower[1])), optivis.geometry.Coordinates(float(upper[0]), float(upper[1])))
+
+def checkField(field):
+  if field not in FIELDS:
+    raise Exception('Specified field is not one of {0}'.format(', '.join(FIELDS)))
+
+  return field
@@ -0,0 +1,275 @@
+"""
+Reduction of the size of component SVG graphics, without visibly changing them.
+"""
+
+from __future__ import unicode_literals, division
+
+import re
+import math
+
+# version of the optimisation, changed whenever optimised output changes so that cached
+# versions are made again
+VERSION = 2
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+XLINK_NAMESPACE = 'http://www.w3.org/1999/xlink'
+
+XLINK_HREF = '{{{0}}}href'.format(XLINK_NAMESPACE)
+
+# attributes holding numbers, or lists of numbers, which can be rounded
+NUMERIC_ATTRIBUTES = set(['x', 'y', 'width', 'height', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'fx', 'fy', 'offset', 'stroke-width', 'stroke-miterlimit', 'points', 'viewBox'])
+
+# attributes holding transforms, whose scale factors multiply everything they apply to, so
+# small factors keep their significant digits
+TRANSFORM_ATTRIBUTES = set(['transform', 'gradientTransform', 'patternTransform'])
+
+# line caps which draw zero length path segments
+DRAWN_CAPS = set(['round', 'square'])
+
+# elements which are only drawn where they are referenced
+DEFINITION_TAGS = set(['linearGradient', 'radialGradient', 'clipPath', 'mask', 'pattern', 'filter', 'marker', 'symbol'])
+
+NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+PATH_TOKEN_PATTERN = re.compile(r'[MmZzLlHhVvCcSsQqTtAa]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+REFERENCE_PATTERN = re.compile(r'url\(#([^)]+)\)')
+LINE_CAP_PATTERN = re.compile(r'(?:^|;)\s*stroke-linecap\s*:\s*([a-z]+)')
+
+# number of arguments of each path command
+PATH_ARGUMENTS = {'m': 2, 'z': 0, 'l': 2, 'h': 1, 'v': 1, 'c': 6, 's': 4, 'q': 4, 't': 2, 'a': 7}
+
+class SvgOptimiser(object):
+  def __init__(self, precision=3):
+    """
+    precision is the number of decimal places numbers are rounded to, and the minimum
+    number of significant digits transforms are rounded to
+    """
+
+    self.precision = precision
+
+  def optimise(self, svgElement):
+    """
+    Optimise the SVG element tree in place: remove whitespace between elements,
+    definitions and IDs which aren't referenced, round numbers and simplify paths.
+    """
+
+    self.removeWhitespace(svgElement)
+    self.removeUnusedDefinitions(svgElement)
+    self.optimiseNumbers(svgElement, 'butt')
+
+    return svgElement
+
+  def optimiseNumbers(self, element, lineCap):
+    """
+    Round numbers and simplify paths of element and its children. lineCap is the line cap
+    inherited from element's parent.
+    """
+
+    lineCap = getLineCap(element, lineCap)
+
+    for (attrKey, attrVal) in element.attrib.items():
+      if attrKey == 'd':
+        # zero length segments are drawn as dots with some line caps
+        element.attrib[attrKey] = self.simplifyPath(attrVal, keepZeroLength=lineCap in DRAWN_CAPS)
+      elif attrKey in TRANSFORM_ATTRIBUTES:
+        element.attrib[attrKey] = self.roundNumbers(attrVal, significant=True)
+      elif attrKey in NUMERIC_ATTRIBUTES:
+        element.attrib[attrKey] = self.roundNumbers(attrVal)
+
+    for child in element:
+      self.optimiseNumbers(child, lineCap)
+
+  def removeWhitespace(self, svgElement):
+    for element in svgElement.iter():
+      if element.text is not None and len(element.text.strip()) == 0:
+        element.text = None
+
+      if element.tail is not None and len(element.tail.strip()) == 0:
+        element.tail = None
+
+  def removeUnusedDefinitions(self, svgElement):
+    """
+    Remove definitions (e.g. gradients) which aren't referenced, and IDs of other
+    elements which aren't referenced. Elements are matched by local name, so this works
+    on files in the SVG namespace as well as on normalised ones.
+    """
+
+    while True:
+      referencedIds = getReferencedIds(svgElement)
+
+      removed = False
+
+      for element in list(svgElement.iter()):
+        for child in list(element):
+          localName = getLocalName(child.tag)
+
+          if localName in DEFINITION_TAGS and child.attrib.get('id', None) not in referencedIds:
+            element.remove(child)
+            removed = True
+          elif localName == 'defs' and len(child) == 0:
+            element.remove(child)
+
+      # definitions may only have been referenced by removed definitions
+      if not removed:
+        break
+
+    for element in svgElement.iter():
+      if 'id' in element.attrib and element.attrib['id'] not in referencedIds:
+        del(element.attrib['id'])
+
+  def formatNumber(self, value, significant=False):
+    """
+    Format value rounded to the precision, or if significant is True, to whichever of the
+    precision in decimal places or significant digits keeps more digits.
+    """
+
+    value = float(value)
+    decimals = self.precision
+
+    if significant and value != 0 and not math.isinf(value) and not math.isnan(value):
+      decimals = max(decimals, self.precision - 1 - int(math.floor(math.log10(abs(value)))))
+
+    number = '{0:.{1}f}'.format(value, decimals)
+
+    if '.' in number:
+      number = number.rstrip('0').rstrip('.')
+
+    if number in ('-0', ''):
+      number = '0'
+
+    # leading zeros aren't needed
+    if number.startswith('0.'):
+      number = number[1:]
+    elif number.startswith('-0.'):
+      number = '-' + number[2:]
+
+    return number
+
+  def roundNumbers(self, value, significant=False):
+    return NUMBER_PATTERN.sub(lambda match: self.formatNumber(match.group(0), significant), value)
+
+  def simplifyPath(self, pathData, keepZeroLength=False):
+    """
+    Get path data with numbers rounded, zero length relative lines removed (unless
+    keepZeroLength is True) and separators and repeated commands left out.
+    """
+
+    tokens = PATH_TOKEN_PATTERN.findall(pathData)
+
+    # arc flags can be written without separators, so aren't reliably split into tokens
+    if len(tokens) == 0 or tokens[0] not in 'Mm' or any(token in ('A', 'a') for token in tokens):
+      return self.roundNumbers(pathData)
+
+    # split into (command, arguments) segments
+    segments = []
+    command = None
+    arguments = []
+
+    for token in tokens:
+      if token.lower() in PATH_ARGUMENTS:
+        command = token
+        arguments = []
+
+        if command in 'Zz':
+          segments.append((command, []))
+
+        continue
+
+      if command is None or command in 'Zz':
+        # invalid path
+        return self.roundNumbers(pathData)
+
+      arguments.append(self.formatNumber(token))
+
+      if len(arguments) == PATH_ARGUMENTS[command.lower()]:
+        segments.append((command, arguments))
+
+        # further coordinates after a move are lines
+        if command == 'M':
+          command = 'L'
+        elif command == 'm':
+          command = 'l'
+
+        arguments = []
+
+    if len(arguments) > 0:
+      # incomplete segment
+      return self.roundNumbers(pathData)
+
+    simplified = []
+    lastCommand = None
+
+    for command, arguments in segments:
+      if not keepZeroLength and command in 'lhv' and all(argument == '0' for argument in arguments):
+        continue
+
+      # repeated commands are implied, except for moves (where they are lines)
+      if command != lastCommand or command in 'Mm':
+        simplified.append(command)
+      elif len(arguments) > 0 and not arguments[0].startswith('-'):
+        simplified.append(' ')
+
+      for i, argument in enumerate(arguments):
+        if i > 0 and not argument.startswith('-'):
+          simplified.append(' ')
+
+        simplified.append(argument)
+
+      lastCommand = command
+
+    return ''.join(simplified)
+
+def splitName(name):
+  """
+  Get (namespace, local name) of an element tag or attribute name as given by
+  ElementTree, with a namespace of None if it has none.
+  """
+
+  if name.startswith('{'):
+    (namespace, localName) = name[1:].split('}', 1)
+
+    return (namespace, localName)
+
+  return (None, name)
+
+def getLocalName(name):
+  """
+  Get name without its namespace, if it has none or is in the SVG namespace, or None if
+  it is in another namespace (e.g. an element specific to a drawing program).
+  """
+
+  (namespace, localName) = splitName(name)
+
+  if namespace not in (None, SVG_NAMESPACE):
+    return None
+
+  return localName
+
+def getLineCap(element, inheritedLineCap):
+  """
+  Get the line cap element's paths are drawn with, from its style or attributes, or the
+  one it inherits.
+  """
+
+  match = LINE_CAP_PATTERN.search(element.attrib.get('style', ''))
+
+  if match is not None:
+    lineCap = match.group(1)
+  else:
+    lineCap = element.attrib.get('stroke-linecap', 'inherit')
+
+  if lineCap == 'inherit':
+    return inheritedLineCap
+
+  return lineCap
+
+def getReferencedIds(svgElement):
+  referencedIds = set()
+
+  for element in svgElement.iter():
+    for (attrKey, attrVal) in element.attrib.iteritems():
+      referencedIds.update(REFERENCE_PATTERN.findall(attrVal))
+
+      if attrKey in (XLINK_HREF, 'href') and attrVal.startswith('#'):
+        referencedIds.add(attrVal[1:])
+
+  return referencedIds
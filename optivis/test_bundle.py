@@ -0,0 +1,180 @@
+from __future__ import unicode_literals, division
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+from xml.etree import ElementTree as et
+import optivis.bundle as bundle
+
+TEST_SVG = """<?xml version="1.0" encoding="utf-8"?>
+<!-- made by a drawing program -->
+<svg xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="10" height="20">
+  <metadata>author</metadata>
+  <g id="body" inkscape:label="Body">
+    <linearGradient id="body-grad"/>
+    <rect fill="url(#body-grad)" width="10" height="20"/>
+  </g>
+</svg>
+"""
+
+# as saved by Inkscape, with everything in the SVG namespace
+NAMESPACED_SVG = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg
+   xmlns="http://www.w3.org/2000/svg"
+   xmlns:xlink="http://www.w3.org/1999/xlink"
+   xmlns:dc="http://purl.org/dc/elements/1.1/"
+   xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+   xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+   xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+   width="10" height="20" sodipodi:docname="test.svg" inkscape:version="0.92">
+  <sodipodi:namedview id="base" pagecolor="#ffffff" inkscape:zoom="4"/>
+  <metadata id="metadata1"><rdf:RDF><dc:format>image/svg+xml</dc:format></rdf:RDF></metadata>
+  <defs id="defs1">
+    <linearGradient id="stops"><stop offset="0" style="stop-color:#89A4B6"/></linearGradient>
+    <linearGradient id="body-grad" xlink:href="#stops"/>
+    <radialGradient id="unused"/>
+  </defs>
+  <g id="layer1" inkscape:label="Body" inkscape:groupmode="layer">
+    <rect fill="url(#body-grad)" width="10" height="20"/>
+  </g>
+</svg>
+"""
+
+class TestNormalise(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'test.svg')
+    
+    with open(self.path, 'w') as f:
+      f.write(TEST_SVG)
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def test_normalise(self):
+    markup = bundle.normaliseSvg(self.path)
+    
+    self.assertNotIn('metadata', markup)
+    self.assertNotIn('inkscape', markup)
+    self.assertNotIn('made by', markup)
+    
+    svgElement = et.fromstring(markup)
+    
+    self.assertEqual(svgElement.attrib['width'], '10')
+    # only referenced IDs are kept
+    self.assertEqual([element.attrib['id'] for element in svgElement.iter() if 'id' in element.attrib], [bundle.ID_PLACEHOLDER + '0'])
+    self.assertEqual(svgElement.find('g/rect').attrib['fill'], 'url(#{0}0)'.format(bundle.ID_PLACEHOLDER))
+  
+  def test_namespaced(self):
+    with open(self.path, 'w') as f:
+      f.write(NAMESPACED_SVG)
+    
+    markup = bundle.AssetLoader(cacheDir=False).getMarkup(self.directory, 'test.svg')
+    
+    for name in ('sodipodi', 'inkscape', 'metadata', 'rdf', 'namedview', '2000/svg'):
+      self.assertNotIn(name, markup)
+    
+    # elements are kept, without the SVG namespace, as are links
+    svgElement = et.fromstring(markup)
+    
+    self.assertEqual(svgElement.tag, 'svg')
+    self.assertEqual(svgElement.attrib['width'], '10')
+    self.assertEqual(svgElement.find('g/rect').attrib['fill'], 'url(#{0}1)'.format(bundle.ID_PLACEHOLDER))
+    self.assertEqual(svgElement.find('defs/linearGradient[@id="{0}1"]'.format(bundle.ID_PLACEHOLDER)).attrib['{http://www.w3.org/1999/xlink}href'], '#{0}0'.format(bundle.ID_PLACEHOLDER))
+  
+  def test_not_optimised(self):
+    svgElement = et.fromstring(bundle.normaliseSvg(self.path, optimiser=None))
+    
+    self.assertEqual(len([element for element in svgElement.iter() if 'id' in element.attrib]), 2)
+  
+  def test_xlink_references(self):
+    with open(self.path, 'w') as f:
+      f.write('<svg xmlns:xlink="http://www.w3.org/1999/xlink"><linearGradient id="a"/><linearGradient id="b" xlink:href="#a"/><rect fill="url(#b)"/></svg>')
+    
+    svgElement = et.fromstring(bundle.normaliseSvg(self.path))
+    gradients = svgElement.findall('linearGradient')
+    
+    self.assertEqual(len(gradients), 2)
+    self.assertEqual(gradients[1].attrib['{http://www.w3.org/1999/xlink}href'], '#' + gradients[0].attrib['id'])
+  
+  def test_unique_markup(self):
+    markup = bundle.normaliseSvg(self.path)
+    
+    idsA = [element.attrib['id'] for element in et.fromstring(bundle.getUniqueMarkup(markup)).iter() if 'id' in element.attrib]
+    idsB = [element.attrib['id'] for element in et.fromstring(bundle.getUniqueMarkup(markup)).iter() if 'id' in element.attrib]
+    
+    self.assertEqual(len(set(idsA + idsB)), 2)
+  
+  def test_duplicate_ids(self):
+    with open(self.path, 'w') as f:
+      f.write('<svg><g id="a"/><g id="a"/></svg>')
+    
+    self.assertRaises(Exception, bundle.normaliseSvg, self.path)
+
+class TestBundle(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, bundle.BUNDLE_FILENAME)
+    
+    bundle.writeBundle(self.path)
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def test_bundle(self):
+    assetBundle = bundle.AssetBundle.open(self.path)
+    
+    filenames = [filename for filename in os.listdir(bundle.ASSET_DIR) if filename.endswith('.svg')]
+    
+    self.assertEqual(sorted(assetBundle.getFilenames()), sorted(filenames))
+    
+    for filename in filenames:
+      self.assertEqual(assetBundle.getMarkup(filename), bundle.normaliseSvg(os.path.join(bundle.ASSET_DIR, filename)))
+    
+    self.assertIsNone(assetBundle.getMarkup('missing.svg'))
+  
+  def test_bundle_data(self):
+    # as read by the package loader
+    with open(self.path, 'rb') as f:
+      assetBundle = bundle.AssetBundle(f.read())
+    
+    self.assertEqual(assetBundle.getMarkup('b-mir.svg'), bundle.normaliseSvg(os.path.join(bundle.ASSET_DIR, 'b-mir.svg')))
+    
+    self.assertRaises(Exception, bundle.AssetBundle, b'not a bundle')
+  
+  def test_loader(self):
+    loader = bundle.AssetLoader(bundle.AssetBundle.open(self.path), cacheDir=False)
+    
+    # built in assets come from the bundle, others from their files
+    loader.bundle.index['b-mir.svg'] = loader.bundle.index['b-bsp.svg']
+    
+    self.assertEqual(loader.getMarkup(bundle.ASSET_DIR, 'b-mir.svg'), bundle.normaliseSvg(os.path.join(bundle.ASSET_DIR, 'b-bsp.svg')))
+    
+    shutil.copy(os.path.join(bundle.ASSET_DIR, 'b-mir.svg'), self.directory)
+    
+    self.assertEqual(loader.getMarkup(self.directory, 'b-mir.svg'), bundle.normaliseSvg(os.path.join(bundle.ASSET_DIR, 'b-mir.svg')))
+  
+  def test_cache(self):
+    cacheDir = os.path.join(self.directory, 'cache')
+    
+    shutil.copy(os.path.join(bundle.ASSET_DIR, 'b-mir.svg'), self.directory)
+    path = os.path.join(self.directory, 'b-mir.svg')
+    
+    loader = bundle.AssetLoader(cacheDir=cacheDir)
+    markup = loader.getMarkup(self.directory, 'b-mir.svg')
+    
+    cachePath = loader.getCachePath(path)
+    
+    with open(cachePath, 'rb') as f:
+      self.assertEqual(f.read().decode('utf-8'), markup)
+    
+    # cached versions are used by other loaders
+    with open(cachePath, 'wb') as f:
+      f.write(b'<svg/>')
+    
+    self.assertEqual(bundle.AssetLoader(cacheDir=cacheDir).getMarkup(self.directory, 'b-mir.svg'), '<svg/>')
+    
+    # and not used by loaders with different optimisation
+    self.assertNotEqual(bundle.AssetLoader(cacheDir=cacheDir, optimiser=None).getCachePath(path), cachePath)
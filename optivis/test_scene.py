@@ -1,10 +1,16 @@
 from __future__ import unicode_literals, division
 
+import copy
+import pickle
+import weakref
 from unittest import TestCase
 
 import optivis.scene
+import optivis.layout
+import optivis.layout.constraints as constraints
 import optivis.bench.components as components
 import optivis.bench.links as links
+import optivis.bench.labels as labels
 
 class TestSceneSetTitle(TestCase):
   def setUp(self):
@@ -34,6 +40,20 @@ class TestSceneSetReference(TestCase):
     # can't add a component of type link
     self.assertRaises(Exception, setattr, self.scene, 'reference', self.link)
     
+class TestSceneInstances(TestCase):
+  def test_separate_links(self):
+    sceneA = optivis.scene.Scene()
+    sceneB = optivis.scene.Scene()
+    
+    componentA = components.Laser()
+    componentB = components.CavityMirror()
+    
+    sceneA.link(componentA.getOutputNode('out'), componentB.getInputNode('fr'), 10)
+    
+    self.assertEqual(len(sceneA.links), 1)
+    self.assertEqual(sceneB.links, [])
+    self.assertEqual(sceneB.constraints, [])
+
 class TestSceneAddLink(TestCase):
   def setUp(self):
     self.scene = optivis.scene.Scene()
@@ -42,4 +62,237 @@ class TestSceneAddLink(TestCase):
   
   def test_add_invalid_link(self):    
     # can't add a link of type Laser
-    self.assertRaises(Exception, self.scene.addLink, self.componentA)
\ No newline at end of file
+    self.assertRaises(Exception, self.scene.addLink, self.componentA)
+
+class TestSceneGeometry(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.componentA = components.Laser()
+    self.componentB = components.CavityMirror(aoi=30)
+    
+    self.scene.link(self.componentA.getOutputNode('out'), self.componentB.getInputNode('fr'), 10)
+  
+  def test_set_geometry_from_copy(self):
+    sceneCopy = copy.deepcopy(self.scene)
+    
+    optivis.layout.StandardLayout(sceneCopy).arrange()
+    
+    self.scene.setGeometry(sceneCopy.getGeometry())
+    
+    for component, componentCopy in zip(self.scene.getComponents(), sceneCopy.getComponents()):
+      self.assertIsNot(component, componentCopy)
+      self.assertEqual(component.position, componentCopy.position)
+      self.assertEqual(component.azimuth, componentCopy.azimuth)
+    
+    self.assertEqual(self.scene.links[0].end, sceneCopy.links[0].end)
+  
+  def test_set_invalid_geometry(self):
+    self.assertRaises(Exception, self.scene.setGeometry, ([], []))
+
+class TestSceneStore(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.laser = components.Laser()
+    self.mirrorA = components.CavityMirror(aoi=30)
+    self.mirrorB = components.SteeringMirror(aoi=20)
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.mirrorA.getInputNode('fr'), 10)
+    self.scene.link(self.mirrorA.getOutputNode('fr'), self.mirrorB.getInputNode('fr'), 20)
+    self.scene.reference = self.laser
+  
+  def test_components_added(self):
+    self.scene.useStore()
+    
+    mirrorC = components.CavityMirror()
+    self.scene.link(self.mirrorB.getOutputNode('fr'), mirrorC.getInputNode('fr'), 5)
+    
+    for component in self.scene.getComponents():
+      self.assertIs(component.store, self.scene.store)
+    
+    self.assertEqual(len(self.scene.store), 4)
+  
+  def test_store_indices(self):
+    componentStore = self.scene.useStore()
+    
+    indices = self.scene.getStoreIndices()
+    
+    self.assertEqual(list(indices), [component.storeIndex for component in self.scene.getComponents()])
+    
+    # indices are cached until links are added
+    self.assertIs(self.scene.getStoreIndices(), indices)
+    
+    mirrorC = components.CavityMirror()
+    self.scene.link(self.mirrorB.getOutputNode('fr'), mirrorC.getInputNode('fr'), 5)
+    
+    self.assertEqual(list(self.scene.getStoreIndices()), [0, 1, 2, 3])
+    
+    # components of links appended directly are added to the store
+    mirrorD = components.CavityMirror()
+    self.scene.links.append(links.Link(mirrorC.getOutputNode('fr'), mirrorD.getInputNode('fr'), 5))
+    
+    self.assertEqual(list(self.scene.getStoreIndices()), [0, 1, 2, 3, 4])
+    self.assertIs(mirrorD.store, componentStore)
+    
+    # and removed links are noticed
+    del(self.scene.links[-2:])
+    
+    self.assertEqual(list(self.scene.getStoreIndices()), [0, 1, 2])
+  
+  def test_same_layout(self):
+    sceneCopy = copy.deepcopy(self.scene)
+    sceneCopy.useStore()
+    
+    optivis.layout.StandardLayout(self.scene).arrange()
+    optivis.layout.StandardLayout(sceneCopy).arrange()
+    
+    for component, componentCopy in zip(self.scene.getComponents(), sceneCopy.getComponents()):
+      self.assertAlmostEqual(component.position.x, componentCopy.position.x)
+      self.assertAlmostEqual(component.position.y, componentCopy.position.y)
+      self.assertAlmostEqual(component.azimuth, componentCopy.azimuth)
+    
+    (lowerBound, upperBound) = self.scene.getBoundingBox()
+    (lowerBoundCopy, upperBoundCopy) = sceneCopy.getBoundingBox()
+    
+    for value, valueCopy in zip((lowerBound.x, lowerBound.y, upperBound.x, upperBound.y), (lowerBoundCopy.x, lowerBoundCopy.y, upperBoundCopy.x, upperBoundCopy.y)):
+      self.assertAlmostEqual(value, valueCopy)
+  
+  def test_copy(self):
+    self.scene.useStore()
+    
+    sceneCopy = copy.deepcopy(self.scene)
+    
+    self.assertIsNot(sceneCopy.store, self.scene.store)
+    
+    for component in sceneCopy.getComponents():
+      self.assertIs(component.store, sceneCopy.store)
+    
+    sceneCopy.getComponents()[0].aoi = 10
+    
+    self.assertEqual(self.scene.getComponents()[0].aoi, 30)
+
+class TestScenePickle(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene(title="Pickled")
+    
+    self.laser = components.Laser(tooltip=lambda: "Laser")
+    self.mirror = components.CavityMirror(aoi=30, tooltip="Mirror")
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.mirror.getInputNode('fr'), 10)
+    self.scene.reference = self.laser
+    
+    optivis.layout.StandardLayout(self.scene).arrange()
+  
+  def assertSceneEqual(self, scene, sceneCopy):
+    self.assertEqual(sceneCopy.title, scene.title)
+    
+    for component, componentCopy in zip(scene.getComponents(), sceneCopy.getComponents()):
+      self.assertIs(componentCopy.__class__, component.__class__)
+      self.assertEqual(componentCopy.position, component.position)
+      self.assertEqual(componentCopy.aoi, component.aoi)
+    
+    linkCopy = sceneCopy.links[0]
+    
+    self.assertEqual((linkCopy.start, linkCopy.end), (scene.links[0].start, scene.links[0].end))
+    self.assertIn(linkCopy.outputNode, linkCopy.outputNode.component.outputNodes)
+    self.assertIs(sceneCopy.reference, linkCopy.outputNode.component)
+  
+  def test_round_trip(self):
+    for protocol in (0, pickle.HIGHEST_PROTOCOL):
+      self.assertSceneEqual(self.scene, pickle.loads(pickle.dumps(self.scene, protocol)))
+  
+  def test_external_objects_dropped(self):
+    pykatObject = set()
+    self.mirror.pykatObject = weakref.ref(pykatObject)
+    
+    sceneCopy = pickle.loads(pickle.dumps(self.scene, pickle.HIGHEST_PROTOCOL))
+    (mirror, laser) = sceneCopy.getComponents()
+    
+    self.assertRaises(Exception, getattr, mirror, 'pykatObject')
+    self.assertEqual(mirror.tooltip, "Mirror")
+    self.assertIsNone(laser.tooltip)
+  
+  def test_store(self):
+    self.scene.useStore()
+    
+    sceneCopy = pickle.loads(pickle.dumps(self.scene, pickle.HIGHEST_PROTOCOL))
+    
+    self.assertSceneEqual(self.scene, sceneCopy)
+    
+    for component in sceneCopy.getComponents():
+      self.assertIs(component.store, sceneCopy.store)
+
+class TestSceneFork(TestCase):
+  def setUp(self):
+    self.scene = optivis.scene.Scene()
+    
+    self.laser = components.Laser()
+    self.mirrorA = components.CavityMirror(aoi=30, labels=[labels.Label(text="M1")])
+    self.mirrorB = components.CavityMirror()
+    
+    self.scene.link(self.laser.getOutputNode('out'), self.mirrorA.getInputNode('fr'), 10)
+    self.scene.link(self.mirrorA.getOutputNode('fr'), self.mirrorB.getInputNode('fr'), 20)
+    self.scene.addConstraint(constraints.LinkAngularConstraint(60, self.scene.links[0], self.scene.links[1]))
+    self.scene.reference = self.laser
+  
+  def test_independent(self):
+    fork = self.scene.fork()
+    
+    (mirrorA, laser, mirrorB) = fork.getComponents()
+    
+    self.assertIs(fork.reference, laser)
+    self.assertIs(fork.constraints[0].linkA, fork.links[0])
+    self.assertIs(fork.links[0].inputNode, mirrorA.getInputNode('fr'))
+    self.assertIs(mirrorA.labels[0].item, mirrorA)
+    
+    fork.constraints[0].angle = 90
+    fork.links[1].length = 40
+    
+    optivis.layout.ConstrainedLayout(self.scene).arrange()
+    optivis.layout.ConstrainedLayout(fork).arrange()
+    
+    # constraint applied to each scene separately
+    self.assertNotEqual(mirrorA.aoi, self.mirrorA.aoi)
+    self.assertNotEqual(mirrorB.position, self.mirrorB.position)
+    self.assertEqual(self.scene.links[1].length, 20)
+  
+  def test_shared_structure(self):
+    fork = self.scene.fork()
+    mirrorA = fork.getComponents()[0]
+    
+    self.assertIs(mirrorA.getInputNode('fr').definition, self.mirrorA.getInputNode('fr').definition)
+    self.assertIs(fork.links[0].specs, self.scene.links[0].specs)
+    self.assertIsNot(mirrorA.labels[0], self.mirrorA.labels[0])
+    self.assertIs(mirrorA.labels[0].content, self.mirrorA.labels[0].content)
+  
+  def test_shared_attributes(self):
+    fork = self.scene.fork()
+    mirrorA = fork.getComponents()[0]
+    
+    # forks hold every attribute themselves
+    self.assertEqual(sorted(mirrorA.__dict__.keys()), sorted(self.mirrorA.__dict__.keys()))
+    self.assertEqual(mirrorA.name, self.mirrorA.name)
+    
+    mirrorA.name = 'Forked'
+    
+    self.assertNotEqual(self.mirrorA.name, 'Forked')
+    self.assertEqual(fork.fork().getComponents()[0].name, 'Forked')
+    
+    mirrorCopy = copy.deepcopy(mirrorA)
+    
+    self.assertEqual((mirrorCopy.name, mirrorCopy.aoi), ('Forked', 30))
+    self.assertEqual(mirrorCopy.getInputNode('fr').component, mirrorCopy)
+  
+  def test_store(self):
+    self.scene.useStore()
+    
+    fork = self.scene.fork()
+    mirrorA = fork.getComponents()[0]
+    
+    self.assertIs(mirrorA.store, fork.store)
+    
+    fork.store.setValues('aoi', 10, fork.getStoreIndices())
+    
+    self.assertEqual(mirrorA.aoi, 10)
+    self.assertEqual(self.mirrorA.aoi, 30)
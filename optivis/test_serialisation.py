@@ -0,0 +1,161 @@
+from __future__ import unicode_literals, division
+
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+import optivis.scene
+import optivis.geometry
+import optivis.serialisation
+import optivis.bench.components as components
+import optivis.bench.links as links
+import optivis.bench.labels as labels
+import optivis.layout.constraints as constraints
+
+class TestSceneSaveLoad(TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    
+    self.scene = optivis.scene.Scene(title="Saved scene")
+    
+    laser = components.Laser(name="L1", tooltip="A laser", labels=[labels.Label(text="Laser", position=optivis.geometry.Coordinates(0, 1), offset=optivis.geometry.Coordinates(3, 4), content={"power": 1.5, "on": True})])
+    beamSplitter = components.BeamSplitter(name="BS", aoi=30)
+    mirror = components.CavityMirror(name="M1", aoi=10)
+    mirror.size = optivis.geometry.Coordinates(5, 60)
+    
+    self.scene.link(laser.getOutputNode('out'), beamSplitter.getInputNode('frA'), 100, specs=[links.LinkSpec(color="green", pattern=[2, 3]), links.LinkSpec(offset=2)])
+    self.scene.link(beamSplitter.getOutputNode('bkA'), mirror.getInputNode('fr'), 50, labels=[labels.Label(text="Arm", azimuth=90, content={"loss": "low"})])
+    
+    self.scene.addConstraint(constraints.LinkAngularConstraint(60, self.scene.links[0], self.scene.links[1]))
+    
+    self.scene.reference = beamSplitter
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def assertScenesEqual(self, scene, loaded):
+    self.assertEqual(loaded.title, scene.title)
+    self.assertEqual(len(loaded.links), len(scene.links))
+    self.assertEqual(len(loaded.constraints), 1)
+    
+    for component, loadedComponent in zip(scene.getComponents(), loaded.getComponents()):
+      self.assertIs(type(loadedComponent), type(component))
+      self.assertEqual(loadedComponent.name, component.name)
+      self.assertEqual(loadedComponent.aoi, component.aoi)
+      self.assertEqual(loadedComponent.tooltip, component.tooltip)
+      self.assertEqual(loadedComponent.filename, component.filename)
+      self.assertEqual(loadedComponent.size, component.size)
+      self.assertEqual([node.name for node in loadedComponent.outputNodes], [node.name for node in component.outputNodes])
+      self.assertIs(loadedComponent.outputNodes[0].component, loadedComponent)
+      self.assertEqual([label.text for label in loadedComponent.labels], [label.text for label in component.labels])
+    
+    for link, loadedLink in zip(scene.links, loaded.links):
+      self.assertEqual(str(loadedLink), str(link))
+      self.assertEqual(loadedLink.length, link.length)
+      self.assertEqual([(spec.color, spec.pattern, spec.offset) for spec in loadedLink.specs], [(spec.color, spec.pattern, spec.offset) for spec in link.specs])
+    
+    label = loaded.getComponents()[1].labels[0]
+    self.assertIs(label.item, loaded.getComponents()[1])
+    self.assertEqual(label.offset, optivis.geometry.Coordinates(3, 4))
+    self.assertEqual(label.content, {"power": 1.5, "on": True})
+    
+    self.assertEqual(loaded.links[1].labels[0].azimuth, 90)
+    self.assertEqual(loaded.links[1].labels[0].content, {"loss": "low"})
+    
+    self.assertEqual(loaded.constraints[0].angle, 60)
+    self.assertIs(loaded.constraints[0].linkA, loaded.links[0])
+    
+    self.assertEqual(loaded.reference.name, "BS")
+  
+  def test_json(self):
+    path = os.path.join(self.directory, 'scene.json')
+    
+    self.scene.save(path)
+    
+    self.assertScenesEqual(self.scene, optivis.scene.Scene.load(path))
+  
+  def test_binary(self):
+    path = os.path.join(self.directory, 'scene.optivis')
+    
+    self.scene.save(path)
+    
+    self.assertScenesEqual(self.scene, optivis.scene.Scene.load(path))
+  
+  def test_invalid_format(self):
+    self.assertRaises(Exception, self.scene.save, os.path.join(self.directory, 'scene.txt'))
+    self.assertRaises(Exception, self.scene.save, os.path.join(self.directory, 'scene.json'), fileFormat='xml')
+  
+  def test_invalid_binary_file(self):
+    path = os.path.join(self.directory, 'scene.optivis')
+    
+    with open(path, 'wb') as f:
+      f.write(b'not a scene')
+    
+    self.assertRaises(Exception, optivis.scene.Scene.load, path)
+  
+  def test_invalid_component_class(self):
+    data = optivis.serialisation.sceneToDict(self.scene)
+    data['components'][0]['class'] = 'Scene'
+    
+    self.assertRaises(Exception, optivis.serialisation.sceneFromDict, data)
+  
+  def test_class_outside_optivis(self):
+    # loading a file mustn't import modules other than Optivis's
+    moduleName = 'wsgiref.simple_server'
+    self.assertNotIn(moduleName, sys.modules)
+    
+    data = optivis.serialisation.sceneToDict(self.scene)
+    data['components'][0]['class'] = moduleName + '.WSGIServer'
+    
+    self.assertRaises(Exception, optivis.serialisation.sceneFromDict, data)
+    self.assertNotIn(moduleName, sys.modules)
+  
+  def test_negative_size(self):
+    data = optivis.serialisation.sceneToDict(self.scene)
+    data['components'][2]['size'] = [-1, 10]
+    
+    self.assertRaises(Exception, optivis.serialisation.sceneFromDict, data)
+  
+  def test_binary_shares_specs(self):
+    path = os.path.join(self.directory, 'scene.optivis')
+    
+    self.scene.link(self.scene.links[1].inputNode.component.getOutputNode('fr'), components.Photodiode(name="PD").getInputNode('in'), 10)
+    self.scene.save(path)
+    
+    loaded = optivis.scene.Scene.load(path)
+    
+    # default specs are identical, so are stored once and shared
+    self.assertIs(loaded.links[1].specs[0], loaded.links[2].specs[0])
+    self.assertIsNot(loaded.links[1].specs, loaded.links[2].specs)
+  
+  def test_binary_version_1(self):
+    # files with a record for each component and link
+    path = os.path.join(self.directory, 'scene.optivis')
+    
+    fileFormat = optivis.serialisation.BinarySceneFormat
+    
+    with open(path, 'wb') as f:
+      f.write(fileFormat.header.pack(fileFormat.MAGIC, 1))
+      
+      for string in ("Old scene", "Laser", "L1", "CavityMirror", "M1", "out", "fr", "red", "blue"):
+        data = string.encode('utf-8')
+        f.write(fileFormat.recordType.pack(fileFormat.RECORD_STRING) + fileFormat.index.pack(len(data)) + data)
+      
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_TITLE) + fileFormat.index.pack(0))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_COMPONENT) + fileFormat.component.pack(1, 2, fileFormat.NONE, 0, 0, 0, 0, 62, 46))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_COMPONENT) + fileFormat.component.pack(3, 4, fileFormat.NONE, 10, 90, 100, 0, 15, 50))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_SPEC) + fileFormat.spec.pack(1, 7, 0, 0, 0, 3, 2, 7, 8, 0))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_LINK) + fileFormat.link.pack(0, 5, 1, 6, 100, 0, 0, 0, 0, 1) + fileFormat.index.pack(0))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_REFERENCE) + fileFormat.index.pack(0))
+      f.write(fileFormat.recordType.pack(fileFormat.RECORD_END))
+    
+    loaded = optivis.scene.Scene.load(path)
+    
+    self.assertEqual(loaded.title, "Old scene")
+    self.assertEqual(str(loaded.links[0]), "L1->out --> M1<-fr")
+    self.assertEqual(loaded.links[0].length, 100)
+    self.assertEqual(loaded.links[0].inputNode.component.azimuth, 90)
+    self.assertEqual(loaded.links[0].inputNode.component.size, optivis.geometry.Coordinates(15, 50))
+    self.assertEqual(loaded.reference.name, "L1")
@@ -0,0 +1,71 @@
+from __future__ import unicode_literals, division
+
+import random
+from unittest import TestCase
+
+import optivis.spatial as spatial
+from optivis.geometry import Coordinates
+
+class TestGridIndex(TestCase):
+  def setUp(self):
+    random.seed(0)
+    
+    self.boxes = []
+    
+    for i in range(300):
+      (x, y) = (random.uniform(0, 1000), random.uniform(0, 1000))
+      (width, height) = (random.uniform(1, 50), random.uniform(1, 50))
+      
+      self.boxes.append((x, y, x + width, y + height))
+    
+    self.index = spatial.GridIndex(spatial.getCellSize(self.boxes))
+    
+    for i, box in enumerate(self.boxes):
+      self.index.insert(i, Coordinates(box[0], box[1]), Coordinates(box[2], box[3]))
+  
+  def test_candidate_pairs(self):
+    expected = set([(i, j) for i in range(len(self.boxes)) for j in range(i + 1, len(self.boxes)) if spatial.boxesOverlap(self.boxes[i], self.boxes[j])])
+    found = set([tuple(sorted(pair)) for pair in self.index.getCandidatePairs() if spatial.boxesOverlap(self.boxes[pair[0]], self.boxes[pair[1]])])
+    
+    self.assertEqual(found, expected)
+  
+  def test_query(self):
+    box = (400, 400, 600, 500)
+    
+    expected = set([i for i in range(len(self.boxes)) if spatial.boxesOverlap(self.boxes[i], box)])
+    found = set([i for i in self.index.query(Coordinates(400, 400), Coordinates(600, 500)) if spatial.boxesOverlap(self.boxes[i], box)])
+    
+    self.assertEqual(found, expected)
+  
+  def test_remove(self):
+    self.index.remove(0)
+    
+    self.assertNotIn(0, self.index)
+    self.assertEqual(len(self.index), len(self.boxes) - 1)
+    self.assertNotIn(0, self.index.queryBox(self.boxes[0]))
+  
+  def test_segment(self):
+    index = spatial.GridIndex(10)
+    index.insertSegment('diagonal', Coordinates(0, 0), Coordinates(1000, 1000))
+    
+    # only the cells along the diagonal are used, not its whole bounding box
+    self.assertLess(len(index.cells), 400)
+    
+    self.assertIn('diagonal', index.query(Coordinates(495, 495), Coordinates(505, 505)))
+    self.assertNotIn('diagonal', index.queryBox((900, 0, 950, 50)))
+
+class TestIntersections(TestCase):
+  def test_segment_box(self):
+    box = (10, 10, 20, 20)
+    
+    self.assertTrue(spatial.segmentIntersectsBox((0, 0), (30, 30), box))
+    self.assertTrue(spatial.segmentIntersectsBox((15, 0), (15, 30), box))
+    self.assertFalse(spatial.segmentIntersectsBox((0, 0), (30, 5), box))
+    self.assertFalse(spatial.segmentIntersectsBox((0, 15), (15, 0), box))
+  
+  def test_segments(self):
+    self.assertTrue(spatial.segmentsIntersect((0, 0), (10, 10), (0, 10), (10, 0)))
+    self.assertFalse(spatial.segmentsIntersect((0, 0), (10, 0), (0, 1), (10, 1)))
+    
+    # touching at ends
+    self.assertFalse(spatial.segmentsIntersect((0, 0), (10, 0), (10, 0), (10, 10), tolerance=1e-9))
@@ -0,0 +1,79 @@
+from __future__ import unicode_literals, division
+
+import copy
+from unittest import TestCase
+
+import numpy
+
+import optivis.geometry
+import optivis.store
+import optivis.bench.components as components
+
+class TestComponentStore(TestCase):
+  def setUp(self):
+    self.store = optivis.store.ComponentStore(capacity=1)
+    
+    self.laser = components.Laser(position=optivis.geometry.Coordinates(10, 20), azimuth=30)
+    self.mirror = components.CavityMirror(aoi=45)
+    
+    self.store.add(self.laser)
+    self.store.add(self.mirror)
+  
+  def test_properties(self):
+    self.assertEqual(self.laser.position, optivis.geometry.Coordinates(10, 20))
+    self.assertEqual(self.laser.azimuth, 30)
+    self.assertEqual(self.mirror.aoi, 45)
+    
+    self.mirror.position = optivis.geometry.Coordinates(5, 6)
+    self.mirror.aoi = 370
+    
+    self.assertEqual((self.store.x[self.mirror.storeIndex], self.store.y[self.mirror.storeIndex]), (5, 6))
+    self.assertEqual(self.store.aoi[self.mirror.storeIndex], 10)
+  
+  def test_in_another_store(self):
+    self.assertRaises(Exception, optivis.store.ComponentStore().add, self.laser)
+  
+  def test_remove(self):
+    self.store.remove(self.laser)
+    
+    self.assertIsNone(self.laser.store)
+    self.assertEqual(self.laser.position, optivis.geometry.Coordinates(10, 20))
+    self.assertEqual(len(self.store), 1)
+    self.assertEqual(list(self.store.getIndices()), [self.mirror.storeIndex])
+  
+  def test_bounding_boxes(self):
+    for component, box in zip(self.store.getComponents(), self.store.getBoundingBoxes()):
+      (lowerBound, upperBound) = component.getBoundingBox()
+      
+      numpy.testing.assert_allclose(box, (lowerBound.x, lowerBound.y, upperBound.x, upperBound.y), atol=1e-9)
+  
+  def test_translate(self):
+    # cached geometry is forgotten
+    self.laser.getBoundingBox()
+    
+    self.store.translate(optivis.geometry.Coordinates(1, 2))
+    
+    self.assertEqual(self.laser.position, optivis.geometry.Coordinates(11, 22))
+    self.assertAlmostEqual(self.laser.getBoundingBox()[0].x, self.store.getBoundingBoxes()[0][0])
+  
+  def test_sweep(self):
+    node = self.mirror.getOutputNode('fr')
+    azimuth = node.getAbsoluteAzimuth()
+    
+    self.store.setValues('aoi', [60], self.store.getIndices([self.mirror]))
+    
+    self.assertEqual(self.mirror.aoi, 60)
+    self.assertNotEqual(node.getAbsoluteAzimuth(), azimuth)
+    
+    self.assertRaises(Exception, self.store.setValues, 'width', -1)
+    self.assertRaises(Exception, self.store.setValues, 'colour', 1)
+  
+  def test_copy(self):
+    storeCopy = copy.deepcopy(self.store)
+    (laser, mirror) = storeCopy.getComponents()
+    
+    laser.position = optivis.geometry.Coordinates(1, 2)
+    
+    # fields are still views of the array
+    self.assertEqual(tuple(storeCopy.data[:2, laser.storeIndex]), (1, 2))
+    self.assertEqual(self.laser.position, optivis.geometry.Coordinates(10, 20))
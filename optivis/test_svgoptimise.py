@@ -0,0 +1,81 @@
+from __future__ import unicode_literals, division
+
+from unittest import TestCase
+from xml.etree import ElementTree as et
+import optivis.svgoptimise as svgoptimise
+
+class TestSvgOptimiser(TestCase):
+  def setUp(self):
+    self.optimiser = svgoptimise.SvgOptimiser(precision=2)
+  
+  def test_round_numbers(self):
+    self.assertEqual(self.optimiser.roundNumbers('matrix(0.8 0 0 0.8 -33.0283 -62.3896)'), 'matrix(.8 0 0 .8 -33.03 -62.39)')
+    self.assertEqual(self.optimiser.roundNumbers('10.000'), '10')
+    self.assertEqual(self.optimiser.roundNumbers('-0.001'), '0')
+    self.assertEqual(self.optimiser.roundNumbers('1e-3,2'), '0,2')
+  
+  def test_simplify_path(self):
+    self.assertEqual(self.optimiser.simplifyPath('M 10.123 20 L 30 40 L 50 -60 l 0 0 Z'), 'M10.12 20L30 40 50-60Z')
+    self.assertEqual(self.optimiser.simplifyPath('m0,0 1,1 2,2'), 'm0 0l1 1 2 2')
+    
+    # arcs are only rounded
+    self.assertEqual(self.optimiser.simplifyPath('M0 0 A 1.234 1 0 0 1 2 2'), 'M0 0 A 1.23 1 0 0 1 2 2')
+  
+  def test_small_transform(self):
+    svgElement = et.fromstring('<svg><g transform="matrix(0.0004 0 0 0.00041234 1.2345 -33.0283)"/></svg>')
+    
+    self.optimiser.optimise(svgElement)
+    
+    # scale factors keep their significant digits
+    self.assertEqual(svgElement.find('g').attrib['transform'], 'matrix(.0004 0 0 .00041 1.23 -33.03)')
+  
+  def test_zero_length_segments(self):
+    svgElement = et.fromstring('<svg><path d="M1 1l0 0"/><path d="M1 1l0 0" stroke-linecap="round"/><g style="fill:none;stroke-linecap:square"><path d="M1 1l0 0"/></g></svg>')
+    
+    self.optimiser.optimise(svgElement)
+    
+    # dots are drawn for zero length segments with round or square caps
+    self.assertEqual([element.attrib['d'] for element in svgElement.iter('path')], ['M1 1', 'M1 1l0 0', 'M1 1l0 0'])
+  
+  def test_remove_unused_definitions(self):
+    svgElement = et.fromstring('<svg><g id="group"><linearGradient id="used"/><linearGradient id="unused"/><rect fill="url(#used)"/></g><defs><radialGradient id="other"/></defs></svg>')
+    
+    self.optimiser.optimise(svgElement)
+    
+    self.assertEqual([element.attrib.get('id', None) for element in svgElement.iter() if element.tag.endswith('Gradient')], ['used'])
+    self.assertNotIn('id', svgElement.find('g').attrib)
+    self.assertIsNone(svgElement.find('defs'))
+  
+  def test_namespaced_definitions(self):
+    # as saved by Inkscape
+    svgElement = et.fromstring(b"""<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" width="10.004" height="20">
+  <sodipodi:namedview id="base" inkscape:zoom="4"/>
+  <metadata id="metadata1"><rdf:RDF/></metadata>
+  <defs id="defs1">
+    <linearGradient id="stops"><stop offset="0.5001" style="stop-color:#89A4B6"/></linearGradient>
+    <linearGradient id="body-grad" xlink:href="#stops"/>
+    <radialGradient id="unused"/>
+  </defs>
+  <defs id="defs2"><clipPath id="unused-clip"/></defs>
+  <g id="layer1" inkscape:label="Body"><rect fill="url(#body-grad)" width="10" height="20.123"/></g>
+</svg>""")
+    
+    self.optimiser.optimise(svgElement)
+    
+    svgNamespace = '{http://www.w3.org/2000/svg}'
+    
+    # unused definitions, and definitions left empty, are removed
+    self.assertEqual([element.attrib['id'] for element in svgElement.iter() if 'id' in element.attrib], ['stops', 'body-grad'])
+    self.assertEqual(len(svgElement.findall(svgNamespace + 'defs')), 1)
+    self.assertIsNone(svgElement.find('.//' + svgNamespace + 'radialGradient'))
+    self.assertEqual(svgElement.find('.//' + svgNamespace + 'stop').attrib['offset'], '.5')
+    self.assertEqual(svgElement.find(svgNamespace + 'g/' + svgNamespace + 'rect').attrib['height'], '20.12')
+    self.assertEqual(svgElement.attrib['width'], '10')
+  
+  def test_remove_whitespace(self):
+    svgElement = et.fromstring('<svg>\n  <g>\n    <text> label </text>\n  </g>\n</svg>')
+    
+    self.optimiser.optimise(svgElement)
+    
+    self.assertEqual(et.tostring(svgElement), b'<svg><g><text> label </text></g></svg>')
@@ -1,7 +1,6 @@
 from __future__ import unicode_literals, division
 
 import abc
-import inspect
 from collections import OrderedDict
 
 import optivis.geometry
@@ -9,6 +8,9 @@ import optivis.scene
 import optivis.bench.components
 import optivis.bench.links
 import optivis.layout
+import optivis.layout.scale
+import optivis.layout.labels
+import optivis.layout.registry
 
 class AbstractView(object):
   __metaclass__ = abc.ABCMeta
@@ -22,9 +24,7 @@ class AbstractView(object):
   # 'show all'
   SHOW_MAX = (1 << 5) - 1
   
-  labelFlags = OrderedDict()
-  
-  def __init__(self, scene, size=None, zoom=1.0, layoutManager=None, showFlags=None, startMarkers=False, endMarkers=False, startMarkerRadius=5, endMarkerRadius=3, startMarkerColor=None, endMarkerColor=None):
+  def __init__(self, scene, size=None, zoom=1.0, layoutManager=None, scaleFunc=None, showFlags=None, startMarkers=False, endMarkers=False, startMarkerRadius=5, endMarkerRadius=3, startMarkerColor=None, endMarkerColor=None, labelPlacement=False):
     if not isinstance(scene, optivis.scene.Scene):
       raise Exception('Specified scene is not of type optivis.scene.Scene')
     
@@ -47,6 +47,7 @@ class AbstractView(object):
     self.size = size
     self.zoom = zoom
     self.layoutManager = layoutManager
+    self.scaleFunc = scaleFunc
     self.showFlags = showFlags
     self.startMarkers = startMarkers
     self.endMarkers = endMarkers
@@ -54,18 +55,15 @@ class AbstractView(object):
     self.endMarkerRadius = endMarkerRadius
     self.startMarkerColor = startMarkerColor
     self.endMarkerColor = endMarkerColor
+    self.labelPlacement = labelPlacement
+    
+    # label content to show, by content key
+    self.labelFlags = OrderedDict()
     
     return
   
-  def getLayoutManagerClasses(self):    
-    managers = []
-    
-    # http://stackoverflow.com/questions/1796180/how-can-i-get-a-list-of-all-classes-within-current-module-in-python
-    for name, obj in inspect.getmembers(optivis.layout):
-      if inspect.isclass(obj) and not inspect.isabstract(obj):
-        managers.append(obj)
-    
-    return managers
+  def getLayoutManagerClasses(self):
+    return optivis.layout.registry.getLayoutManagerClasses()
 
   @property
   def scene(self):
@@ -111,10 +109,58 @@ class AbstractView(object):
 
   @layoutManager.setter
   def layoutManager(self, layoutManager):
+    if isinstance(layoutManager, basestring):
+      # title of a registered layout manager
+      layoutManager = optivis.layout.registry.getLayoutManagerClass(layoutManager)
+    
     if not issubclass(layoutManager, optivis.layout.AbstractLayout):
       raise Exception('Specified layout manager class is not of type AbstractLayout')
 
     self.__layoutManager = layoutManager
+  
+  @property
+  def scaleFunc(self):
+    """
+    Scale function used by the layout manager, or None to use its default.
+    """
+    
+    return self.__scaleFunc
+  
+  @scaleFunc.setter
+  def scaleFunc(self, scaleFunc):
+    if scaleFunc is not None and not isinstance(scaleFunc, optivis.layout.scale.ScaleFunction):
+      raise Exception('Specified scale function is not of type ScaleFunction')
+    
+    self.__scaleFunc = scaleFunc
+  
+  def getLayout(self, **kwargs):
+    """
+    Create a layout manager for the scene, using this view's scale function.
+    """
+    
+    return self.layoutManager(self.scene, scaleFunc=self.scaleFunc, **kwargs)
+  
+  def placeLabels(self, textMetrics, labelFlags=None, fixedLabels=None):
+    """
+    Move labels so that they avoid other labels, components and links, measuring their
+    text with the specified text metrics. Labels in fixedLabels are not moved.
+    """
+    
+    placer = optivis.layout.labels.LabelPlacer(self.scene, textMetrics, labelFlags=labelFlags, fixedLabels=fixedLabels)
+    
+    return placer.apply()
+  
+  @property
+  def labelPlacement(self):
+    """
+    Whether labels are placed automatically when they are drawn.
+    """
+    
+    return self.__labelPlacement
+  
+  @labelPlacement.setter
+  def labelPlacement(self, labelPlacement):
+    self.__labelPlacement = bool(labelPlacement)
     
   @property
   def showFlags(self):
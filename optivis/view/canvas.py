@@ -3,10 +3,15 @@ from __future__ import unicode_literals, division
 import os
 import os.path
 import sys
+import atexit
+import subprocess
+import distutils.spawn
 
 import abc
+import copy
 import math
 import weakref
+from collections import OrderedDict
 
 import PyQt4.Qt
 import PyQt4.QtCore
@@ -15,11 +20,72 @@ import PyQt4.QtSvg
 
 import optivis.view
 import optivis.view.svg
+import optivis.bundle
 import optivis.layout
+import optivis.layout.state
+import optivis.layout.optimise
+import optivis.layout.labels
 import optivis.bench.components
 import optivis.bench.links
 import optivis.geometry
 
+def getApplication():
+  """
+  Get the Qt application, creating it if necessary. Qt only allows one application per
+  process, so this is shared between all canvases.
+  
+  Qt 4 has no offscreen platform, so on X11 the application needs an X server even to
+  render without a window. If there is no display (e.g. on continuous integration
+  servers), a virtual one is started with startVirtualDisplay().
+  """
+  
+  qApplication = PyQt4.Qt.QApplication.instance()
+  
+  if qApplication is None:
+    if os.name == 'posix' and sys.platform != 'darwin' and 'DISPLAY' not in os.environ:
+      startVirtualDisplay()
+    
+    qApplication = PyQt4.Qt.QApplication(sys.argv)
+  
+  return qApplication
+
+def startVirtualDisplay():
+  """
+  Start a virtual X server (Xvfb) for Qt to draw on, and set DISPLAY to it. The server is
+  stopped when the process exits. An exception is raised if Xvfb is not installed or does
+  not start, rather than letting Qt abort the process.
+  """
+  
+  executable = distutils.spawn.find_executable('Xvfb')
+  
+  if executable is None:
+    raise Exception('No display is available for Qt, and Xvfb is not installed to start a virtual one. Install Xvfb, or export with optivis.view.svg instead.')
+  
+  # Xvfb picks a free display number, and writes it to the pipe when it is ready
+  (readFd, writeFd) = os.pipe()
+  
+  with open(os.devnull, 'w') as devnull:
+    try:
+      process = subprocess.Popen([executable, '-displayfd', str(writeFd), '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'], stdout=devnull, stderr=devnull, close_fds=False)
+    finally:
+      os.close(writeFd)
+  
+  with os.fdopen(readFd) as displayFile:
+    displayNumber = displayFile.readline().strip()
+  
+  def stop():
+    if process.poll() is None:
+      process.terminate()
+  
+  if not displayNumber.isdigit():
+    stop()
+    
+    raise Exception('Could not start Xvfb for Qt to draw on. Xvfb 1.13 or later is needed.')
+  
+  atexit.register(stop)
+  
+  os.environ['DISPLAY'] = ':' + displayNumber
+
 class AbstractCanvas(optivis.view.AbstractView):
   __metaclass__ = abc.ABCMeta
   
@@ -36,13 +102,37 @@ class AbstractCanvas(optivis.view.AbstractView):
     self.canvasComponents = []
     self.canvasLabels = []
 
+    # background layout worker, and any cancelled workers that have not yet stopped
+    self.layoutWorker = None
+    self.retiredLayoutWorkers = []
+
+    # whether the scene's geometry is a finished layout, which is worth saving
+    self.layoutCompleted = False
+    
+    # whether labels have been placed since the scene was laid out or their content changed,
+    # and labels moved by the user, which are not placed again
+    self.labelsPlaced = False
+    self.movedLabels = []
+
+    # zoom thresholds for simplified drawing; replace before show() to configure
+    self.levelOfDetail = LevelOfDetail()
+    self.lowDetail = False
+    self.outlined = False
+    self.labelsSimplified = False
+
+    # file to save layout and label offsets to on exit, and restore them from when next shown
+    self.layoutStatePath = None
+
     # create and initialise GUI
     self.create()
     self.initialise()
 
+    # measures label text for automatic label placement (needs the application created above)
+    self.textMetrics = QtTextMetrics()
+
   def create(self):
     # create application
-    self.qApplication = PyQt4.Qt.QApplication(sys.argv)
+    self.qApplication = getApplication()
     self.qMainWindow = MainWindow()
     
     # set close behaviour to prevent zombie processes
@@ -76,7 +166,11 @@ class AbstractCanvas(optivis.view.AbstractView):
   def initialise(self):
     # set view antialiasing
     self.qView.setRenderHints(PyQt4.QtGui.QPainter.Antialiasing | PyQt4.Qt.QPainter.TextAntialiasing | PyQt4.Qt.QPainter.SmoothPixmapTransform | PyQt4.QtGui.QPainter.HighQualityAntialiasing)
-  
+
+    # the render hints are now those for full detail, so simplify them again if zoomed out
+    self.lowDetail = False
+    self.applyLevelOfDetail()
+
   def calibrateView(self):
     """
     Sets the view box and other rendering gubbins.
@@ -121,15 +215,23 @@ class AbstractCanvas(optivis.view.AbstractView):
       else:
 	canvasComponent.graphicsItem.setVisible(False)
     
+    # move labels clear of each other before drawing them
+    self.updateLabelPlacement()
+    
     # draw labels
     for canvasLabel in self.canvasLabels:
-      canvasLabel.draw(self.qScene, self.labelFlags)
+      canvasLabel.draw(self.qScene, self.getLabelFlags(), levelOfDetail=self.levelOfDetail)
       
       if self.showFlags & AbstractCanvas.SHOW_LABELS:
 	canvasLabel.graphicsItem.setVisible(True)
       else:
 	canvasLabel.graphicsItem.setVisible(False)
 
+    # simplify graphics if drawing zoomed out; the new items are drawn in full detail
+    self.lowDetail = False
+    self.outlined = False
+    self.applyLevelOfDetail()
+
   def redraw(self, *args, **kwargs):    
     # update links
     for canvasLink in self.canvasLinks:      
@@ -156,22 +258,138 @@ class AbstractCanvas(optivis.view.AbstractView):
       else:
 	canvasComponent.graphicsItem.setVisible(False)
     
+    # place labels if the layout or label content has changed
+    self.updateLabelPlacement()
+    
     # update labels
     for canvasLabel in self.canvasLabels:
       if self.showFlags & AbstractCanvas.SHOW_LABELS:
-	canvasLabel.redraw(self.labelFlags)
+	canvasLabel.redraw(self.getLabelFlags())
 	canvasLabel.graphicsItem.setVisible(True)
       else:
 	canvasLabel.graphicsItem.setVisible(False)
 
   def layout(self):
     # instantiate layout manager and arrange objects
-    layout = self.layoutManager(self.scene)
+    layout = self.getLayout()
     layout.arrange()
+    
+    self.layoutCompleted = True
+    self.labelsPlaced = False
+  
+  def updateLabelPlacement(self):
+    """
+    Place labels, if automatic placement is on and they haven't been placed since the scene
+    was laid out or label content changed. Labels moved by the user are left where they are.
+    """
+    
+    if not self.labelPlacement or self.labelsPlaced:
+      return
+    
+    # place labels with the content shown at full detail, so zooming doesn't move them
+    self.placeLabels(self.textMetrics, self.labelFlags, fixedLabels=self.movedLabels)
+    
+    self.labelsPlaced = True
+  
+  def layoutAsync(self, fitSize=None):
+    """
+    Lay out the scene on a background thread, cancelling any layout already in progress.
+    The resulting geometry is applied to the scene on the GUI thread once it is ready.
+    
+    If fitSize is specified, the worker first finds the scale function which fits the scene
+    to that size, which becomes the canvas's scale function. An exception is raised if the
+    canvas's scale function can't be fitted (see ScaleOptimiser.checkScaleFunction()).
+    """
+    
+    if fitSize is not None and self.scaleFunc is not None:
+      optivis.layout.optimise.ScaleOptimiser.checkScaleFunction(self.scaleFunc)
+    
+    if self.layoutWorker is not None:
+      # stop the current layout; keep a reference to its thread until it has finished
+      self.layoutWorker.cancel()
+      self.retiredLayoutWorkers.append(self.layoutWorker)
+    
+    self.layoutCompleted = False
+    
+    # copy the scene here, so the copy isn't taken while the scene is being edited
+    self.layoutWorker = LayoutWorker(copy.deepcopy(self.scene), self.layoutManager, self.scaleFunc, fitSize)
+    self.layoutWorker.scaleFitted.connect(self.scaleFittedHandler)
+    self.layoutWorker.layoutProgress.connect(self.layoutProgressHandler)
+    self.layoutWorker.layoutFinished.connect(self.layoutFinishedHandler)
+    self.layoutWorker.finished.connect(self.layoutWorkerStoppedHandler)
+    
+    self.layoutWorker.start()
+  
+  def scaleFittedHandler(self, scaleFunc):
+    if self.qMainWindow.sender() is not self.layoutWorker:
+      # scale fitted by a cancelled layout
+      return
+    
+    self.scaleFunc = scaleFunc
+  
+  def layoutProgressHandler(self, linkCount, totalLinks):
+    if self.qMainWindow.sender() is not self.layoutWorker:
+      # progress from a cancelled layout
+      return
+    
+    self.qMainWindow.statusBar().showMessage('Laying out {0} of {1} links'.format(linkCount, totalLinks))
+  
+  def layoutFinishedHandler(self, geometry):
+    if self.qMainWindow.sender() is not self.layoutWorker:
+      # result of a layout that has since been superseded
+      return
+    
+    self.layoutWorker = None
+    
+    # apply layout to the scene on the GUI thread
+    self.scene.setGeometry(geometry)
+    
+    self.layoutCompleted = True
+    self.labelsPlaced = False
+    
+    self.qMainWindow.statusBar().clearMessage()
+    
+    # redraw
+    self.redraw()
+    
+    # reset view
+    self.calibrateView()
+  
+  def layoutWorkerStoppedHandler(self):
+    worker = self.qMainWindow.sender()
+    
+    if worker in self.retiredLayoutWorkers:
+      self.retiredLayoutWorkers.remove(worker)
+  
+  def restoreLayoutState(self):
+    """
+    Restore label offsets and, if the scene has not changed, the layout saved by a previous
+    session. Returns True if the layout was restored, so the scene doesn't need laying out.
+    """
+    
+    if self.layoutStatePath is None or not os.path.exists(self.layoutStatePath):
+      return False
+    
+    state = optivis.layout.state.LayoutState.load(self.layoutStatePath)
+    
+    self.layoutCompleted = state.apply(self.getLayout())
+    
+    # restored label offsets are where they were left, including by the user
+    self.labelsPlaced = self.layoutCompleted
+    
+    return self.layoutCompleted
+  
+  def saveLayoutState(self):
+    # the geometry of a scene still being laid out would be restored as if it were finished
+    if self.layoutStatePath is None or not self.layoutCompleted:
+      return
+    
+    state = optivis.layout.state.LayoutState.fromLayout(self.getLayout())
+    state.save(self.layoutStatePath)
   
   def show(self):
-    # layout scene
-    self.layout()
+    # restore the previous session's layout, if there is one and it's still valid
+    layoutRestored = self.restoreLayoutState()
     
     # create canvas items
     self.createCanvasLinks()
@@ -184,6 +402,13 @@ class AbstractCanvas(optivis.view.AbstractView):
     # draw GUI
     self.initialise()
 
+    if not layoutRestored:
+      # layout scene in the background, redrawing when finished
+      self.layoutAsync()
+
+    # save layout and label offsets for next time
+    self.qApplication.aboutToQuit.connect(self.saveLayoutState)
+
     # show on screen
     self.qMainWindow.show()
     
@@ -230,6 +455,64 @@ class AbstractCanvas(optivis.view.AbstractView):
     self.zoom = zoom
     
     self.qView.setScale(self.zoom)
+    
+    self.applyLevelOfDetail()
+  
+  def getLabelFlags(self):
+    """
+    Label content flags to draw labels with. Label content is not drawn when labels are simplified.
+    """
+    
+    if self.labelsSimplified:
+      return None
+    
+    return self.labelFlags
+  
+  def applyLevelOfDetail(self):
+    """
+    Switch between full and simplified graphics depending on the current zoom level.
+    
+    Below levelOfDetail.pixmapZoom, components are drawn from a cached pixmap without
+    antialiasing, and below levelOfDetail.outlineZoom they are drawn as outlines. Below
+    levelOfDetail.labelContentZoom, labels are drawn without their content. Hidden labels
+    at lower zoom levels are handled by the label items themselves when they are painted.
+    """
+    
+    lowDetail = self.zoom < self.levelOfDetail.pixmapZoom
+    outlined = self.zoom < self.levelOfDetail.outlineZoom
+    labelsSimplified = self.zoom < self.levelOfDetail.labelContentZoom
+    
+    if lowDetail != self.lowDetail or outlined != self.outlined:
+      self.lowDetail = lowDetail
+      self.outlined = outlined
+      
+      if self.outlined:
+        # cached pixmaps are painted at item scale, so items can't tell how small they are
+        # drawn; they are told to draw outlines instead, which are cheap without a cache
+        cacheMode = PyQt4.QtGui.QGraphicsItem.NoCache
+      elif self.lowDetail:
+        # render each SVG once into a pixmap in item coordinates and scale that
+        cacheMode = PyQt4.QtGui.QGraphicsItem.ItemCoordinateCache
+      else:
+        cacheMode = PyQt4.QtGui.QGraphicsItem.NoCache
+      
+      for canvasComponent in self.canvasComponents:
+        if canvasComponent.graphicsItem is not None:
+          canvasComponent.graphicsItem.setCacheMode(cacheMode)
+          canvasComponent.graphicsItem.setOutlined(self.outlined)
+      
+      if self.qView is not None:
+        # antialiasing makes no visible difference to a zoomed out view
+        self.qView.setRenderHint(PyQt4.QtGui.QPainter.Antialiasing, not self.lowDetail)
+        self.qView.setRenderHint(PyQt4.QtGui.QPainter.SmoothPixmapTransform, not self.lowDetail)
+        self.qView.setRenderHint(PyQt4.QtGui.QPainter.HighQualityAntialiasing, not self.lowDetail)
+    
+    if labelsSimplified != self.labelsSimplified:
+      self.labelsSimplified = labelsSimplified
+      
+      for canvasLabel in self.canvasLabels:
+        if canvasLabel.graphicsItem is not None:
+          canvasLabel.redraw(self.getLabelFlags())
   
   def export(self):
     # generate file path
@@ -278,9 +561,218 @@ class AbstractCanvas(optivis.view.AbstractView):
     return self.exportSvg(path=path + extension, fileFormat=fileFormat)
   
   def exportSvg(self, *args, **kwargs):
-    svgView = optivis.view.svg.Svg(self.scene, layoutManager=self.layoutManager)
+    svgView = optivis.view.svg.Svg(self.scene, layoutManager=self.layoutManager, scaleFunc=self.scaleFunc, labelPlacement=self.labelPlacement)
+    
+    # export the label content shown on the canvas
+    svgView.labelFlags = OrderedDict(self.labelFlags)
     svgView.export(*args, **kwargs)
 
+class Headless(AbstractCanvas):
+  """
+  Canvas without a window, for rendering scenes to images. Scenes are drawn exactly as on
+  the other canvases, honouring show flags, label flags and marker settings, but no main
+  window, menus or controls are created.
+  
+  Qt 4 still needs an X server to render on X11, so on machines without a display (e.g.
+  continuous integration servers) a virtual one is started, which needs Xvfb to be
+  installed (see getApplication()).
+  
+  All headless canvases in a process share one Qt application, so many scenes can be
+  rendered in turn:
+  
+    for scene in scenes:
+      Headless(scene=scene).snapshot('{0}.png'.format(scene.title))
+  """
+  
+  def __init__(self, *args, **kwargs):
+    super(Headless, self).__init__(*args, **kwargs)
+  
+  def create(self):
+    # create application, or reuse the existing one
+    self.qApplication = getApplication()
+    
+    # create drawing area
+    self.qScene = GraphicsScene()
+  
+  def initialise(self):
+    # there is no view to initialise; render hints are set on the painter when rendering
+    return
+  
+  def show(self):
+    raise Exception('Headless canvases cannot be shown. Use render() or snapshot() instead.')
+
+  def setZoom(self, zoom):
+    # no view to scale; zoom is applied when rendering
+    self.zoom = zoom
+
+    self.applyLevelOfDetail()
+
+  def render(self):
+    """
+    Lay out and draw the scene, and return it rendered into a QImage. The image is the
+    size of the drawn items multiplied by the zoom level.
+    """
+    
+    # layout scene
+    self.layout()
+    
+    # clear anything drawn by a previous render
+    self.qScene.clear()
+    
+    # create canvas items
+    self.createCanvasLinks()
+    self.createCanvasComponents()
+    self.createCanvasLabels()
+    
+    # draw scene
+    self.draw()
+    
+    # area to render
+    sourceRect = self.qScene.itemsBoundingRect()
+    
+    width = int(math.ceil(sourceRect.width() * self.zoom))
+    height = int(math.ceil(sourceRect.height() * self.zoom))
+    
+    image = PyQt4.QtGui.QImage(width, height, PyQt4.QtGui.QImage.Format_ARGB32_Premultiplied)
+    image.fill(PyQt4.QtGui.QColor(PyQt4.QtCore.Qt.white).rgba())
+    
+    painter = PyQt4.QtGui.QPainter(image)
+    
+    # use the same render hints as an interactive view at this zoom level
+    painter.setRenderHint(PyQt4.QtGui.QPainter.TextAntialiasing, True)
+    painter.setRenderHint(PyQt4.QtGui.QPainter.Antialiasing, not self.lowDetail)
+    painter.setRenderHint(PyQt4.QtGui.QPainter.SmoothPixmapTransform, not self.lowDetail)
+    painter.setRenderHint(PyQt4.QtGui.QPainter.HighQualityAntialiasing, not self.lowDetail)
+    
+    self.qScene.render(painter, PyQt4.QtCore.QRectF(0, 0, width, height), sourceRect)
+    
+    painter.end()
+    
+    return image
+  
+  def snapshot(self, path, fileFormat="png"):
+    """
+    Render the scene and save it as an image in the specified format (any format supported by QImage).
+    """
+    
+    image = self.render()
+    
+    if not image.save(path, fileFormat.upper()):
+      raise Exception('Could not save snapshot to {0}'.format(path))
+
+class LayoutWorker(PyQt4.QtCore.QThread):
+  """
+  Thread to lay out a copy of a scene, leaving the original free to be drawn by the GUI thread.
+  The copy is taken by the GUI thread, as the original may be edited there while laying out,
+  and belongs to the worker.
+  
+  The laid out geometry is emitted as a snapshot created by Scene.getGeometry(), to be applied
+  to the original scene with Scene.setGeometry() on the GUI thread.
+  
+  If fitSize is specified, the scale function which fits the copy to that size is found and
+  emitted before laying out with it.
+  """
+  
+  # signal emitted with the fitted scale function
+  scaleFitted = PyQt4.QtCore.pyqtSignal(object)
+  
+  # signal emitted with the number of links laid out so far and the total number of links
+  layoutProgress = PyQt4.QtCore.pyqtSignal(int, int)
+  
+  # signal emitted with the geometry snapshot once layout has completed
+  layoutFinished = PyQt4.QtCore.pyqtSignal(object)
+  
+  def __init__(self, scene, layoutManager, scaleFunc=None, fitSize=None, *args, **kwargs):
+    super(LayoutWorker, self).__init__(*args, **kwargs)
+    
+    self.scene = scene
+    self.layoutManager = layoutManager
+    self.scaleFunc = scaleFunc
+    self.fitSize = fitSize
+    self.cancelled = False
+    self.layout = None
+  
+  def cancel(self):
+    self.cancelled = True
+    
+    if self.layout is not None:
+      self.layout.cancel()
+  
+  def run(self):
+    scene = self.scene
+    
+    # created before fitting the scale, so cancel() also stops the fit
+    self.layout = self.layoutManager(scene, scaleFunc=self.scaleFunc, progressCallback=self.layoutProgress.emit)
+    
+    if self.cancelled:
+      # cancelled before starting
+      return
+    
+    try:
+      if self.fitSize is not None:
+        self.scaleFunc = optivis.layout.optimise.ScaleOptimiser(self.layout, self.fitSize).optimise()
+        self.layout.scaleFunc = self.scaleFunc
+        
+        self.scaleFitted.emit(self.scaleFunc)
+      
+      self.layout.arrange()
+    except optivis.layout.LayoutCancelledException:
+      return
+    
+    self.layoutFinished.emit(scene.getGeometry())
+
+class LevelOfDetail(object):
+  """
+  Zoom levels below which the canvas draws simplified graphics.
+  
+  pixmapZoom: components are drawn from a cached pixmap, without antialiasing
+  outlineZoom: components are drawn as outlines of their bounding boxes
+  labelContentZoom: labels are drawn without their content
+  labelZoom: labels are not drawn
+  """
+  
+  def __init__(self, pixmapZoom=0.5, outlineZoom=0.2, labelContentZoom=0.5, labelZoom=0.3):
+    self.pixmapZoom = pixmapZoom
+    self.outlineZoom = outlineZoom
+    self.labelContentZoom = labelContentZoom
+    self.labelZoom = labelZoom
+  
+  @property
+  def pixmapZoom(self):
+    return self.__pixmapZoom
+  
+  @pixmapZoom.setter
+  def pixmapZoom(self, pixmapZoom):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    self.__pixmapZoom = float(pixmapZoom)
+  
+  @property
+  def outlineZoom(self):
+    return self.__outlineZoom
+  
+  @outlineZoom.setter
+  def outlineZoom(self, outlineZoom):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    self.__outlineZoom = float(outlineZoom)
+  
+  @property
+  def labelContentZoom(self):
+    return self.__labelContentZoom
+  
+  @labelContentZoom.setter
+  def labelContentZoom(self, labelContentZoom):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    self.__labelContentZoom = float(labelContentZoom)
+  
+  @property
+  def labelZoom(self):
+    return self.__labelZoom
+  
+  @labelZoom.setter
+  def labelZoom(self, labelZoom):
+    # raises TypeError if input is invalid, or ValueError if a string input can't be interpreted
+    self.__labelZoom = float(labelZoom)
+
 class MainWindow(PyQt4.Qt.QMainWindow):
   def __init__(self, *args, **kwargs):
     super(MainWindow, self).__init__(*args, **kwargs)
@@ -518,6 +1010,10 @@ class Full(AbstractCanvas):
     # set label offset
     canvasLabel.item.offset = canvasLabel.item.offset + projection
     
+    # keep the label where the user moved it when labels are placed again
+    if not any(label is canvasLabel.item for label in self.movedLabels):
+      self.movedLabels.append(canvasLabel.item)
+    
     # redraw scene
     self.redraw()
     
@@ -535,6 +1031,10 @@ class Full(AbstractCanvas):
     sender = self.qMainWindow.sender()
     label = sender.data
     self.labelFlags[label] = checked
+    
+    # label sizes have changed
+    self.labelsPlaced = False
+    
     self.redraw(refreshLabelMenu=False)
     
   def wheelHandler(self, event):
@@ -646,11 +1146,9 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     layoutManagerClasses = self.canvas.getLayoutManagerClasses()
 
     for i in range(0, len(layoutManagerClasses)):
-      # instantiate layout manager correctly
-      layoutManager = layoutManagerClasses[i](self.canvas.scene)
-
-      # add this layout to the combobox, setting the userData to the class name of this layout
-      self.layoutComboBox.addItem(layoutManager.title, i)
+      # add this layout to the combobox, setting the userData to the index of this layout
+      self.layoutComboBox.addItem(layoutManagerClasses[i].title, i)
+      self.layoutComboBox.setItemData(i, layoutManagerClasses[i].description, PyQt4.QtCore.Qt.ToolTipRole)
 
     # set selected layout
     self.layoutComboBox.setCurrentIndex(self.layoutComboBox.findText(self.canvas.layoutManager.title))
@@ -662,10 +1160,15 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     layoutEditButton = PyQt4.QtGui.QPushButton("Edit")
     layoutEditButton.clicked.connect(self.layoutEditButtonClickHandler)
 
+    # create button to fit the scale function to the view
+    layoutFitButton = PyQt4.QtGui.QPushButton("Fit")
+    layoutFitButton.clicked.connect(self.layoutFitButtonClickHandler)
+
     # add combo box to group box
     layoutContainerLayout.addWidget(layoutLabel, 1)
     layoutContainerLayout.addWidget(self.layoutComboBox, 4)
     layoutContainerLayout.addWidget(layoutEditButton, 1)
+    layoutContainerLayout.addWidget(layoutFitButton, 1)
     
     # set layout container layout
     layoutContainer.setLayout(layoutContainerLayout)
@@ -782,8 +1285,7 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     """
     
     # an edited parameter might have changed the look of the view, so lay it out again and redraw
-    self.canvas.layout()
-    self.canvas.redraw()
+    self.canvas.layoutAsync()
   
   def layoutComboBoxChangeHandler(self):
     # get combo box
@@ -799,20 +1301,26 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     # update canvas layout
     self.canvas.layoutManager = layoutManagerClasses[layoutIndex]
 
-    # re-layout
-    self.canvas.layout()
-
-    # redraw
-    self.canvas.redraw()
-    
-    # reset view
-    self.canvas.calibrateView()
+    # re-layout in the background, which redraws and resets the view when finished
+    self.canvas.layoutAsync()
   
   def layoutEditButtonClickHandler(self):
     print self.canvas.layoutManager.title
     layoutEditWindow = CanvasScaleFunctionEditor(self.canvas.qMainWindow, self.canvas.layoutManager)
     layoutEditWindow.show()
     
+  def layoutFitButtonClickHandler(self):
+    # fit the scene to the visible area of the view
+    viewportSize = self.canvas.qView.viewport().size()
+    targetSize = optivis.geometry.Coordinates(viewportSize.width(), viewportSize.height())
+    
+    # fit and re-layout in the background, cancelling any layout in progress, which redraws
+    # and resets the view when finished
+    try:
+      self.canvas.layoutAsync(fitSize=targetSize)
+    except Exception as e:
+      PyQt4.Qt.QMessageBox.critical(self.canvas.qMainWindow, 'Cannot fit scene', str(e))
+  
   def referenceComboBoxChangeHandler(self):
     # get combo box
     referenceComboBox = self.sender()
@@ -831,14 +1339,8 @@ class ControlPanel(PyQt4.QtGui.QWidget):
     else:
       self.canvas.scene.reference = canvasComponents[componentIndex].item
 
-    # re-layout
-    self.canvas.layout()
-
-    # redraw
-    self.canvas.redraw()
-    
-    # reset view
-    self.canvas.calibrateView()
+    # re-layout in the background, which redraws and resets the view when finished
+    self.canvas.layoutAsync()
 
   def zoomSliderChanged(self, value):
     # scale value by zoom step (sliders only support int increments)
@@ -861,6 +1363,28 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
     # set layout
     self.setLayout(self.vBox) 
 
+    # group boxes for built-in and external parameters, reused for every item
+    self.parameterGroupBox = PyQt4.QtGui.QGroupBox()
+    self.parameterLayout = PyQt4.QtGui.QVBoxLayout()
+    self.parameterLayout.setAlignment(PyQt4.QtCore.Qt.AlignTop)
+    self.parameterGroupBox.setLayout(self.parameterLayout)
+
+    self.externalParameterGroupBox = PyQt4.QtGui.QGroupBox(title='External Parameters')
+    self.externalLayout = PyQt4.QtGui.QVBoxLayout()
+    self.externalLayout.setAlignment(PyQt4.QtCore.Qt.AlignTop)
+    self.externalParameterGroupBox.setLayout(self.externalLayout)
+
+    self.vBox.addWidget(self.parameterGroupBox)
+    self.vBox.addWidget(self.externalParameterGroupBox)
+
+    # nothing to edit until an item is selected
+    self.parameterGroupBox.hide()
+    self.externalParameterGroupBox.hide()
+
+    # edit containers bound to the current item, and free containers keyed by data type
+    self.activeParamEditContainers = []
+    self.paramEditContainerPool = {}
+
   def paramEditWidgetChanged(self, *args, **kwargs):    
     # get widget that sent the signal
     sender = self.sender()
@@ -909,185 +1433,162 @@ class OptivisItemEditPanel(PyQt4.QtGui.QWidget):
       widget.setStyleSheet("background-color: yellow;")
 
   def setContentFromCanvasItem(self, canvasItem):
-    # empty current contents
-    # from http://stackoverflow.com/questions/4528347/clear-all-widgets-in-a-layout-in-pyqt
-    for i in reversed(range(self.vBox.count())): 
-      self.vBox.itemAt(i).widget().setParent(None)
+    # return the edit containers for the previous item to the pool
+    self.releaseParamEditContainers()
 
     ### Add built-in attributes.
     
-    # Create a group box for built-in parameters
-    parameterGroupBox = PyQt4.QtGui.QGroupBox(title=str(canvasItem.item))
-    layout = PyQt4.QtGui.QVBoxLayout()
-    layout.setAlignment(PyQt4.QtCore.Qt.AlignTop)
-
-    # set layout
-    parameterGroupBox.setLayout(layout)
+    self.parameterGroupBox.setTitle(str(canvasItem.item))
     
     # Component specific controls.
     if isinstance(canvasItem.item, optivis.bench.components.AbstractComponent):
       # Add aoi control
-      aoiEditWidget = OptivisCanvasItemDataType.getCanvasWidget('aoi', OptivisCanvasItemDataType.SPINBOX, acceptRange=[-360, 360], increment=1)
-      
-      # set data
-      aoiEditWidget.data = ('aoi', OptivisCanvasItemDataType.SPINBOX, weakref.ref(canvasItem.item))
-      
-      # connect edit widget text change signal to a slot that deals with it
-      aoiEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
-      
-      OptivisCanvasItemDataType.setCanvasWidgetValue(aoiEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'aoi'))
-      
-      # create a container for this edit widget
-      container = PyQt4.QtGui.QWidget()
-      containerLayout = PyQt4.QtGui.QHBoxLayout()
-
-      # remove padding between widgets
-      containerLayout.setContentsMargins(0, 0, 0, 0)
-
-      # create label
-      label = PyQt4.QtGui.QLabel(text="{0} aoi".format(canvasItem.item))
+      container = self.getParamEditContainer(OptivisCanvasItemDataType.SPINBOX, self.parameterLayout)
+      container.bind('aoi', "{0} aoi".format(canvasItem.item), weakref.ref(canvasItem.item), getattr(canvasItem.item, 'aoi'), acceptRange=[-360, 360], increment=1)
 
-      # add label and edit widget to layout
-      containerLayout.addWidget(label, 2) # stretch 2
-      containerLayout.addWidget(aoiEditWidget, 1) # stretch 1
-
-      # set layout of container
-      container.setLayout(containerLayout)
-
-      # add container to edit panel
-      layout.addWidget(container)
-	
     # Link specific controls.
     if isinstance(canvasItem.item, optivis.bench.links.AbstractLink):
       # Add length control
-      lengthEditWidget = OptivisCanvasItemDataType.getCanvasWidget('length', OptivisCanvasItemDataType.SPINBOX, acceptRange=[0, float('inf')], increment=1)
-      
-      # set data
-      lengthEditWidget.data = ('length', OptivisCanvasItemDataType.SPINBOX, weakref.ref(canvasItem.item))
-      
-      # connect edit widget text change signal to a slot that deals with it
-      lengthEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
+      container = self.getParamEditContainer(OptivisCanvasItemDataType.SPINBOX, self.parameterLayout)
+      container.bind('length', 'Length', weakref.ref(canvasItem.item), getattr(canvasItem.item, 'length'), acceptRange=[0, float('inf')], increment=1)
       
-      OptivisCanvasItemDataType.setCanvasWidgetValue(lengthEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'length'))
-      
-      # create a container for this edit widget
-      container = PyQt4.QtGui.QWidget()
-      containerLayout = PyQt4.QtGui.QHBoxLayout()
+    # Label specific controls.
+    elif isinstance(canvasItem.item, optivis.bench.labels.AbstractLabel):
+      container = self.getParamEditContainer(OptivisCanvasItemDataType.SPINBOX, self.parameterLayout)
+      container.bind('azimuth', 'azimuth', weakref.ref(canvasItem.item), getattr(canvasItem.item, 'azimuth'), acceptRange=[-360, 360], increment=1)
+    
+    self.parameterGroupBox.show()
 
-      # remove padding between widgets
-      containerLayout.setContentsMargins(0, 0, 0, 0)
+    # Add external parameters, if available.
+    # These are only available on AbstractBenchItems, so components and links (but not labels).
+    if isinstance(canvasItem.item, optivis.bench.AbstractBenchItem) and canvasItem.item.paramList is not None:
+      # external edit controls provided
+
+      # get attributes and external item
+      attributes = canvasItem.item.paramList
+      pykatObject = canvasItem.item.pykatObject
+
+      # loop over attributes from external object and bind an edit container to each
+      for paramName in attributes:
+        dataType = attributes[paramName]
+
+        # get attribute value
+        try:
+          paramValue = getattr(pykatObject, paramName)
+        except AttributeError, e:
+          print "[GUI] WARNING: the value of a parameter specified in the parameter list with this object is not available. Skipping."
+          continue
+
+        # give the edit widget knowledge of its external item
+        # use a weak reference to avoid making the external item a zombie if it is deleted
+        container = self.getParamEditContainer(dataType, self.externalLayout)
+        container.bind(paramName, paramName, weakref.ref(pykatObject), paramValue)
+
+      self.externalParameterGroupBox.show()
+    else:
+      self.externalParameterGroupBox.hide()
 
-      # create label
-      label = PyQt4.QtGui.QLabel(text='Length')
+  def getParamEditContainer(self, dataType, layout):
+    """
+    Get an edit container for the specified data type from the pool, creating one
+    if none are free, and add it to the specified layout.
+    """
+    
+    if len(self.paramEditContainerPool.get(dataType, [])) > 0:
+      container = self.paramEditContainerPool[dataType].pop()
+    else:
+      container = OptivisParamEditContainer(dataType)
 
-      # add label and edit widget to layout
-      containerLayout.addWidget(label, 2) # stretch 2
-      containerLayout.addWidget(lengthEditWidget, 1) # stretch 1
+      # connect edit widget change signal to a slot that deals with it
+      if dataType == OptivisCanvasItemDataType.SPINBOX:
+        container.editWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
+      else:
+        self.connect(container.editWidget, PyQt4.QtCore.SIGNAL("textChanged(QString)"), self.paramEditWidgetChanged)
 
-      # set layout of container
-      container.setLayout(containerLayout)
+    layout.addWidget(container)
+    container.show()
 
-      # add container to edit panel
-      layout.addWidget(container)
-      
-    # Label specific controls.
-    elif isinstance(canvasItem.item, optivis.bench.labels.AbstractLabel):
-      azimuthEditWidget = OptivisCanvasItemDataType.getCanvasWidget('azimuth', OptivisCanvasItemDataType.SPINBOX, acceptRange=[-360, 360], increment=1)
-      
-      # set data
-      azimuthEditWidget.data = ('azimuth', OptivisCanvasItemDataType.SPINBOX, weakref.ref(canvasItem.item))
-      
-      # connect edit widget text change signal to a slot that deals with it
-      azimuthEditWidget.valueChanged[float].connect(self.paramEditWidgetChanged)
-      
-      OptivisCanvasItemDataType.setCanvasWidgetValue(azimuthEditWidget, OptivisCanvasItemDataType.SPINBOX, getattr(canvasItem.item, 'azimuth'))
-      
-      # create a container for this edit widget
-      container = PyQt4.QtGui.QWidget()
-      containerLayout = PyQt4.QtGui.QHBoxLayout()
+    self.activeParamEditContainers.append(container)
 
-      # remove padding between widgets
-      containerLayout.setContentsMargins(0, 0, 0, 0)
+    return container
 
-      # create label
-      label = PyQt4.QtGui.QLabel(text='azimuth')
+  def releaseParamEditContainers(self):
+    """
+    Remove the edit containers in use from their layouts and return them to the pool.
+    """
+    
+    for container in self.activeParamEditContainers:
+      # drop reference to the edited item
+      container.unbind()
+      container.hide()
 
-      # add label and edit widget to layout
-      containerLayout.addWidget(label, 2) # stretch 2
-      containerLayout.addWidget(azimuthEditWidget, 1) # stretch 1
+      container.parentWidget().layout().removeWidget(container)
 
-      # set layout of container
-      container.setLayout(containerLayout)
+      self.paramEditContainerPool.setdefault(container.dataType, []).append(container)
 
-      # add container to edit panel
-      layout.addWidget(container)
-    
-    # Now that we've added built-in edit controls, add the layout to the panel
-    self.vBox.addWidget(parameterGroupBox)
+    self.activeParamEditContainers = []
 
-    # Add external parameters, if available.
-    # These are only available on AbstractBenchItems, so components and links (but not labels).
-    if isinstance(canvasItem.item, optivis.bench.AbstractBenchItem):
-      # Create a group box for these external parameters
-      externalParameterGroupBox = PyQt4.QtGui.QGroupBox(title='External Parameters')
-      externalLayout = PyQt4.QtGui.QVBoxLayout()
-      externalLayout.setAlignment(PyQt4.QtCore.Qt.AlignTop)
-
-      # set layout
-      externalParameterGroupBox.setLayout(externalLayout)
-      
-      if canvasItem.item.paramList is not None:
-	# external edit controls provided
+class OptivisParamEditContainer(PyQt4.QtGui.QWidget):
+  """
+  Label and edit widget for a parameter of a given data type. Containers are pooled by
+  OptivisItemEditPanel and bound to the parameters of whichever item is being edited.
+  """
+  
+  def __init__(self, dataType, *args, **kwargs):
+    super(OptivisParamEditContainer, self).__init__(*args, **kwargs)
 
-	# get attributes and external item
-	attributes = canvasItem.item.paramList
-	pykatObject = canvasItem.item.pykatObject
+    self.dataType = dataType
 
-	# loop over attributes from external object and create
-	for paramName in attributes:
-	  dataType = attributes[paramName]
+    self.label = PyQt4.QtGui.QLabel()
+    self.editWidget = OptivisCanvasItemDataType.getCanvasWidget(None, dataType, acceptRange=[float('-inf'), float('inf')], increment=1)
+    self.editWidget.data = None
 
-	  # get attribute value
-	  paramValue = getattr(pykatObject, paramName)
+    layout = PyQt4.QtGui.QHBoxLayout()
 
-	  # get widget for this parameter
-	  try:
-	    paramEditWidget = OptivisCanvasItemDataType.getCanvasWidget(paramName, dataType)
+    # remove padding between widgets
+    layout.setContentsMargins(0, 0, 0, 0)
 
-	    # give the edit widget knowledge of its canvas item
-	    # use a weak reference to avoid making the canvas item a zombie if it is deleted
-	    paramEditWidget.data = (paramName, dataType, weakref.ref(pykatObject))
-	  except AttributeError, e:
-	    print "[GUI] WARNING: the value of a parameter specified in the parameter list with this object is not available. Skipping."
-	    continue
+    # add label and edit widget to layout
+    layout.addWidget(self.label, 2) # stretch 2
+    layout.addWidget(self.editWidget, 1) # stretch 1
 
-	  # connect edit widget text change signal to a slot that deals with it
-	  self.connect(paramEditWidget, PyQt4.QtCore.SIGNAL("textChanged(QString)"), self.paramEditWidgetChanged)
-	      
-	  OptivisCanvasItemDataType.setCanvasWidgetValue(paramEditWidget, dataType, paramValue)
+    self.setLayout(layout)
 
-	  # create a container for this edit widget
-	  container = PyQt4.QtGui.QWidget()
-	  containerLayout = PyQt4.QtGui.QHBoxLayout()
+  def bind(self, paramName, labelText, target, value, acceptRange=None, increment=None):
+    """
+    Bind this container to the parameter with the specified name on the target, which
+    can be a weak reference.
+    """
+    
+    self.label.setText(labelText)
 
-	  # remove padding between widgets
-	  containerLayout.setContentsMargins(0, 0, 0, 0)
+    # clear any invalid value highlighting left over from the previous parameter
+    self.editWidget.setStyleSheet("")
 
-	  # create label
-	  label = PyQt4.QtGui.QLabel(text=paramName)
+    # set range and value without emitting change signals, since the parameter has not been
+    # edited; changing the range can clamp the previous parameter's value, which would
+    # otherwise be written to the previous (or no) target
+    self.editWidget.blockSignals(True)
 
-	  # add label and edit widget to layout
-	  containerLayout.addWidget(label, 2) # stretch 2
-	  containerLayout.addWidget(paramEditWidget, 1) # stretch 1
+    try:
+      if self.dataType == OptivisCanvasItemDataType.SPINBOX:
+        if acceptRange is None:
+          acceptRange = [float('-inf'), float('inf')]
 
-	  # set layout of container
-	  container.setLayout(containerLayout)
+        if increment is None:
+          increment = 1
 
-	  # add container to edit panel
-	  externalLayout.addWidget(container)
-	  
-	# Now that we've added external edit controls, add the layout to the panel
-	self.vBox.addWidget(externalParameterGroupBox)
+        OptivisCanvasItemDataType.setCanvasWidgetRange(self.editWidget, self.dataType, acceptRange, increment)
+
+      OptivisCanvasItemDataType.setCanvasWidgetValue(self.editWidget, self.dataType, value)
+    finally:
+      self.editWidget.blockSignals(False)
+
+    # only bind to the new target once the widget shows its value
+    self.editWidget.data = (paramName, self.dataType, target)
+
+  def unbind(self):
+    self.editWidget.data = None
 
 class AbstractCanvasItem(object):
   """
@@ -1136,11 +1637,9 @@ class CanvasComponent(AbstractCanvasItem):
   def draw(self, qScene):
     print "[GUI] Drawing component {0} at {1}".format(self.item, self.item.position)
     
-    # Create full system path from filename and SVG directory.
-    path = os.path.join(self.item.svgDir, self.item.filename)
-    
-    # Create graphical representation of SVG image at path.
-    self.graphicsItem = OptivisSvgItem(path)
+    # Create graphical representation of SVG image, sharing the renderer of the component's asset.
+    self.graphicsItem = OptivisSvgItem()
+    self.graphicsItem.setSharedRenderer(getSvgRenderer(self.item.svgDir, self.item.filename))
     
     # reference this CanvasComponent in the data payload
     self.graphicsItem.data = self
@@ -1176,13 +1675,49 @@ class CanvasComponent(AbstractCanvasItem):
       else:
 	self.graphicsItem.setToolTip(str(self.item.tooltip))
 
+# SVG renderers of component assets, by directory and filename
+svgRenderers = {}
+
+def getSvgRenderer(svgDir, filename):
+  """
+  Get renderer of the asset at svgDir and filename, shared by all components drawn with it.
+  """
+  
+  key = (svgDir, filename)
+  
+  if key not in svgRenderers:
+    markup = optivis.bundle.getMarkup(svgDir, filename)
+    
+    svgRenderers[key] = PyQt4.QtSvg.QSvgRenderer(PyQt4.QtCore.QByteArray(markup.encode('utf-8')))
+  
+  return svgRenderers[key]
+
 class OptivisSvgItem(PyQt4.QtSvg.QGraphicsSvgItem):
   mousePressed = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
   mouseReleased = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
   
+  # whether to draw only the outline, set by the canvas when zoomed out
+  outlined = False
+  
   def __init__(self, *args, **kwargs):
     super(OptivisSvgItem, self).__init__(*args, **kwargs)
 
+  def setOutlined(self, outlined):
+    if outlined != self.outlined:
+      self.outlined = outlined
+      
+      self.update()
+
+  def paint(self, painter, option, widget=None):
+    if self.outlined:
+      # too small to make out, so just draw the outline
+      painter.setPen(PyQt4.QtGui.QPen(PyQt4.QtCore.Qt.darkGray, 0))
+      painter.drawRect(self.boundingRect())
+      
+      return
+    
+    super(OptivisSvgItem, self).paint(painter, option, widget)
+
   def mousePressEvent(self, event, *args, **kwargs):
     # accept the event
     # this is the default, but we'll call it anyway
@@ -1312,17 +1847,18 @@ class CanvasLabel(AbstractCanvasItem):
                     
     super(CanvasLabel, self).__init__(item=label, *args, **kwargs)
 
-  def draw(self, qScene, *args, **kwargs):
+  def draw(self, qScene, labelFlags=None, levelOfDetail=None):
     print "[GUI] Drawing label {0}".format(self.item)
 
     # create label
     self.graphicsItem = OptivisLabelItem()
+    self.graphicsItem.levelOfDetail = levelOfDetail
     
     # reference this CanvasLabel in the data payload
     self.graphicsItem.comms.data = self
     
     # set graphics information
-    self.setGraphicsFromItem()
+    self.setGraphicsFromItem(labelFlags)
 
     # add to scene
     qScene.addItem(self.graphicsItem)
@@ -1336,41 +1872,40 @@ class CanvasLabel(AbstractCanvasItem):
   def setGraphicsFromItem(self, labelFlags=None):
     ### Set label text.
     # Label text is set first so we can calculate the label's boundingRect() below.
+    self.graphicsItem.setText(self.item.getText(labelFlags))
     
-    content = []
-    
-    # Create label sub-content
-    if labelFlags is not None:
-      for kv in self.item.content.items():
-	if kv[0] in labelFlags.keys():
-	  if labelFlags[kv[0]]:
-	    # label is turned on
-	    content.append("{0} = {1}".format(kv[0], kv[1]))
-    
-    # Set text
-    self.graphicsItem.setText(self.item.text + "\n" + "\n".join(content))
-    
-    ### Calculate label size and azimuth.
+    ### Calculate label size.
     labelSize = optivis.geometry.Coordinates(self.graphicsItem.boundingRect().width(), self.graphicsItem.boundingRect().height())
-    labelAzimuth = self.item.item.getLabelAzimuth() + self.item.azimuth
     
     ### Draw label at the correct position and orientation.
+    labelPosition = self.item.getPosition(labelSize)
     
-    # get nominal position
-    labelPosition = self.item.item.getLabelOrigin()
-    
-    # translate to user-defined position
-    labelPosition = labelPosition.translate((self.item.position * self.item.item.getSize()).rotate(self.item.item.getLabelAzimuth()))
+    # set position and angle
+    self.graphicsItem.setPos(labelPosition.x, labelPosition.y)
+    self.graphicsItem.setRotation(self.item.getAzimuth())
+
+class QtTextMetrics(optivis.layout.labels.AbstractTextMetrics):
+  """
+  Measures label text as drawn on the canvas.
+  """
+  
+  def __init__(self, font=None, *args, **kwargs):
+    super(QtTextMetrics, self).__init__(*args, **kwargs)
     
-    # move label such that the text is y-centered
-    labelPosition = labelPosition.translate(optivis.geometry.Coordinates(0, labelSize.y / 2).flip().rotate(labelAzimuth))
+    if font is None:
+      # font labels are drawn in by default
+      font = PyQt4.QtGui.QGraphicsSimpleTextItem().font()
     
-    # add user-defined offset
-    labelPosition = labelPosition.translate(self.item.offset.rotate(self.item.item.getLabelAzimuth()))
+    self.font = font
+  
+  def getFont(self):
+    return unicode(self.font.toString())
+  
+  def measure(self, text):
+    textItem = PyQt4.QtGui.QGraphicsSimpleTextItem(text)
+    textItem.setFont(self.font)
     
-    # set position and angle
-    self.graphicsItem.setPos(labelPosition.x, labelPosition.y)
-    self.graphicsItem.setRotation(labelAzimuth)
+    return optivis.geometry.Coordinates(textItem.boundingRect().width(), textItem.boundingRect().height())
 
 class OptivisLabelItemCommunicator(PyQt4.QtCore.QObject):
   """
@@ -1382,6 +1917,9 @@ class OptivisLabelItemCommunicator(PyQt4.QtCore.QObject):
   mouseReleased = PyQt4.QtCore.pyqtSignal(PyQt4.QtGui.QGraphicsSceneMouseEvent)
 
 class OptivisLabelItem(PyQt4.QtGui.QGraphicsSimpleTextItem):
+  # zoom thresholds for simplified drawing (None to always draw in full)
+  levelOfDetail = None
+  
   def __init__(self, *args, **kwargs):
     # Create a communicator.
     # This is necessary because QGraphicsSimpleTextItem does not inherit from QObject, so it does
@@ -1391,6 +1929,14 @@ class OptivisLabelItem(PyQt4.QtGui.QGraphicsSimpleTextItem):
     
     super(OptivisLabelItem, self).__init__(*args, **kwargs)
   
+  def paint(self, painter, option, widget=None):
+    if self.levelOfDetail is not None:
+      if option.levelOfDetailFromTransform(painter.worldTransform()) < self.levelOfDetail.labelZoom:
+        # text would be unreadable, so don't lay it out at all
+        return
+    
+    super(OptivisLabelItem, self).paint(painter, option, widget)
+  
   def mousePressEvent(self, event, *args, **kwargs):
     # Accept the event.
     # this is the default, but we'll call it anyway
@@ -1488,17 +2034,21 @@ class OptivisCanvasItemDataType(OptivisItemDataType):
       widget = PyQt4.QtGui.QDoubleSpinBox()
       
       # set range and increment
-      acceptRange = kwargs['acceptRange']
-      increment = kwargs['increment']
+      OptivisCanvasItemDataType.setCanvasWidgetRange(widget, itemDataType, kwargs['acceptRange'], kwargs['increment'])
       
+      return widget
+    else:
+      raise Exception('Specified item data type is invalid')
+
+  @staticmethod
+  def setCanvasWidgetRange(widget, itemDataType, acceptRange, increment):
+    if itemDataType == OptivisCanvasItemDataType.SPINBOX:
       widget.setMinimum(acceptRange[0])
       widget.setMaximum(acceptRange[1])
       
       widget.setSingleStep(increment)
-      
-      return widget
     else:
-      raise Exception('Specified item data type is invalid')
+      raise Exception('Specified item data type does not have a range')
 
   @staticmethod
   def getCanvasWidgetValue(widget, itemDataType):
@@ -9,9 +9,12 @@ import cairosvg
 from xml.etree import ElementTree as et
 
 import optivis.geometry
+import optivis.bundle
 import optivis.bench.components
 import optivis.bench.links
+import optivis.bench.labels
 import optivis.layout
+import optivis.layout.labels
 
 class Svg(optivis.view.AbstractView):
   # supported file formats, extensions and file select filters
@@ -21,6 +24,9 @@ class Svg(optivis.view.AbstractView):
   
   def __init__(self, *args, **kwargs):
     super(Svg, self).__init__(*args, **kwargs)
+    
+    # font labels are drawn in, and the estimate of their size used to place them
+    self.textMetrics = optivis.layout.labels.EstimatedTextMetrics()
   
   def getDrawableComponents(self):
     drawableComponents = []
@@ -40,8 +46,20 @@ class Svg(optivis.view.AbstractView):
     
     return drawableLinks
   
+  def getDrawableLabels(self):
+    drawableLabels = []
+    
+    # labels of links, then of components, as drawn on the canvas
+    for item in list(self.scene.links) + self.scene.getComponents():
+      if item.labels is not None:
+        for label in item.labels:
+          # Add label to list of SVG labels.
+          drawableLabels.append(SvgLabel(label))
+    
+    return drawableLabels
+  
   def layout(self):
-    layout = self.layoutManager(self.scene)
+    layout = self.getLayout()
     layout.arrange()
     
     return
@@ -112,7 +130,28 @@ class Svg(optivis.view.AbstractView):
     return
 
   def getSvgString(self, size=None):
-    sceneSize = self.scene.getSize()
+    svgLabels = []
+    
+    if self.showFlags & optivis.view.AbstractView.SHOW_LABELS:
+      # move labels clear of each other before drawing them
+      if self.labelPlacement:
+        self.placeLabels(self.textMetrics, self.labelFlags)
+      
+      svgLabels = self.getDrawableLabels()
+    
+    # area to draw, including labels drawn outside the components
+    (lowerBound, upperBound) = self.scene.getBoundingBox()
+    
+    for svgLabel in svgLabels:
+      labelBounds = svgLabel.getBoundingBox(self.textMetrics, self.labelFlags)
+      
+      if labelBounds is None:
+        continue
+      
+      lowerBound = optivis.geometry.Coordinates(min(lowerBound.x, labelBounds[0].x), min(lowerBound.y, labelBounds[0].y))
+      upperBound = optivis.geometry.Coordinates(max(upperBound.x, labelBounds[1].x), max(upperBound.y, labelBounds[1].y))
+    
+    sceneSize = upperBound.translate(lowerBound.flip())
     
     if size is None:
       size = sceneSize
@@ -120,20 +159,12 @@ class Svg(optivis.view.AbstractView):
     if not isinstance(size, optivis.geometry.Coordinates):
       raise Exception('Specified size is not of type Coordinates.')
     
-    # scaling factor
-    scaling = size / sceneSize
+    # the view box maps the drawn area onto the document size
+    rootElement = et.Element('svg', width='{0}'.format(size.x), height='{0}'.format(size.y), viewBox='{0} {1} {2} {3}'.format(lowerBound.x, lowerBound.y, sceneSize.x, sceneSize.y), version='1.1', xmlns='http://www.w3.org/2000/svg')
     
-    rootElement = et.Element('svg', width='{0}'.format(size.x), height='{0}'.format(size.y), version='1.1', xmlns='http://www.w3.org/2000/svg')
-    
-    # by default, we attach drawables to root
+    # we attach drawables to root
     drawElement = rootElement
     
-    if scaling != 1.0:
-      # make the draw element a scale group
-      drawElement = et.Element('g', transform='scale({0})'.format(scaling))
-      
-      rootElement.append(drawElement)
-    
     for svgLink in self.getDrawableLinks():
       svgLink.draw(drawElement)
     
@@ -141,6 +172,9 @@ class Svg(optivis.view.AbstractView):
       # draw component with offset applied to centre everything in the SVG canvas
       svgComponent.draw(drawElement)
     
+    for svgLabel in svgLabels:
+      svgLabel.draw(drawElement, self.textMetrics, self.labelFlags)
+    
     docStr = '<?xml version=\"1.0\" encoding=\"utf-8\" standalone=\"no\"?>\n<!DOCTYPE svg PUBLIC \"-//W3C//DTD SVG 1.1//EN\"\n\"http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd\">\n' + et.tostring(rootElement)
     
     return docStr
@@ -172,61 +206,18 @@ class SvgComponent(AbstractSvgItem):
     if not isinstance(document, et.Element):
       raise Exception('Specified document is not of type ElementTree')
     
-    # create full path to SVG file
-    path = os.path.join(self.component.svgDir, self.component.filename)
-    
-    # parse SVG file into an element tree
-    svgFile = et.parse(path)
-    
-    # get root element from tree
-    svgElement = svgFile.getroot()
+    # get SVG markup, with IDs replaced with unique strings (this allows the same SVG images to be used multiple times in a document)
+    markup = optivis.bundle.getUniqueMarkup(optivis.bundle.getMarkup(self.component.svgDir, self.component.filename))
     
-    # make sure we've got an SVG element as root
-    if svgElement.tag != 'svg':
-      raise Exception('Root element of SVG file %s is not an \'svg\' tag'.format(path))
+    # parse SVG markup into an element tree
+    svgElement = et.fromstring(markup)
     
     # put contents of SVG element in new group to keep it unaltered
     graphicGroup = et.Element('g')
     
-    for child in svgElement:
+    for child in list(svgElement):
       graphicGroup.append(child)
     
-    # map of unique IDs
-    uniqueIds = {}
-
-    # loop over all subelements of the root, replacing ID with a unique string (this allows the same SVG images to be used multiple times in a document)
-    for element in list(graphicGroup.iter()):
-      if 'id' in element.attrib:
-	# element has an ID associated with it - check if it's been seen already	
-	currentId = element.attrib['id']
-	
-	if currentId in uniqueIds:
-	  raise Exception('Found duplicate ID in SVG file %s'.format(path))
-	
-	# current ID has not yet been seen - generate a unique alternative
-	uniqueId = 'e{0}'.format(id(element))
-	
-	# map unique ID to current ID
-	uniqueIds[currentId] = uniqueId
-
-    # loop over all subelements again, replacing IDs with unique equivalents
-    for element in list(graphicGroup.iter()):
-      if 'id' in element.attrib:
-	element.attrib['id'] = uniqueIds[element.attrib['id']]
-      
-      # check any attributes for references to IDs
-      for (attrKey, attrVal) in element.attrib.iteritems():
-	# loop over all entries of map
-	for thisId in uniqueIds:
-	  # form string with hash at beginning to search for references to IDs
-	  needle = 'url(#{0})'.format(thisId)
-	  if needle in attrVal:
-	    # found reference to ID - create replacement
-	    newNeedle = 'url(#{0})'.format(uniqueIds[thisId])
-	  
-	    # replace with unique ID
-	    element.attrib[attrKey] = attrVal.replace(needle, newNeedle)
-
     # now graphicGroup contains content with unique IDs, ready to be combined with other SVG markup.
     # create a new group to control this SVG image's global position (accounting for centre of rotation)
     group1 = et.Element('g', transform='translate({0} {1})'.format(self.component.position.x - self.component.size.x / 2, self.component.position.y - self.component.size.y / 2))
@@ -278,3 +269,58 @@ class SvgLink(AbstractSvgItem):
       pattern = ', '.join(str(item) for item in self.link.specs[0].pattern)
     
     line = et.SubElement(document, 'line', x1=str(self.link.start.x), x2=str(self.link.end.x), y1=str(self.link.start.y), y2=str(self.link.end.y), style='stroke: {0}; stroke-width: {1}; stroke-dasharray: {2}'.format(color, width, pattern))
+
+class SvgLabel(AbstractSvgItem):
+  # height of the text above the baseline, as a multiple of the font size
+  ascent = 0.8
+  
+  def __init__(self, label, *args, **kwargs):
+    if not isinstance(label, optivis.bench.labels.AbstractLabel):
+      raise Exception('Specified label is not of type AbstractLabel')
+    
+    self.label = label
+    
+    super(SvgLabel, self).__init__(*args, **kwargs)
+  
+  def getBoundingBox(self, textMetrics, labelFlags=None):
+    """
+    Get (lower, upper) bounds of the drawn label, or None if it isn't attached to an item.
+    """
+    
+    if self.label.item is None:
+      return None
+    
+    return self.label.getBoundingBox(textMetrics.getSize(self.label.getText(labelFlags)))
+  
+  def draw(self, document, textMetrics, labelFlags=None):
+    if not isinstance(document, et.Element):
+      raise Exception('Specified document is not of type ElementTree')
+    
+    if self.label.item is None:
+      # label isn't attached to anything, so has no position
+      return
+    
+    text = self.label.getText(labelFlags)
+    
+    # position the text as the canvas does, with the top left corner of the text at the
+    # label position, rotated by the label azimuth
+    position = self.label.getPosition(textMetrics.getSize(text))
+    
+    group = et.SubElement(document, 'g', transform='translate({0} {1}) rotate({2})'.format(position.x, position.y, self.label.getAzimuth()))
+    
+    textElement = et.SubElement(group, 'text', style='font-family: {0}; font-size: {1}px'.format(textMetrics.fontFamily, textMetrics.fontSize))
+    
+    lineHeight = textMetrics.lineHeight * textMetrics.fontSize
+    
+    # SVG text is positioned by its baseline, so move each line down by the font ascent
+    # plus half the line spacing
+    baseline = self.ascent * textMetrics.fontSize + (lineHeight - textMetrics.fontSize) / 2
+    
+    for i, line in enumerate(text.split("\n")):
+      if len(line) == 0:
+        continue
+      
+      lineElement = et.SubElement(textElement, 'tspan', x='0', y=str(baseline + i * lineHeight))
+      lineElement.text = line
+    
+    return
@@ -35,4 +35,126 @@ Not yet implemented, but here are the tests previously written for markers (take
     self.assertRaises(Exception, setattr, self.link, 'color', None)
     self.assertRaises(Exception, setattr, self.link, 'startMarkerColor', None)
     self.assertRaises(Exception, setattr, self.link, 'endMarkerColor', None)
-"""
\ No newline at end of file
+"""
+from __future__ import unicode_literals, division
+
+import os
+import shutil
+import tempfile
+import weakref
+from unittest import TestCase, skipIf
+
+import optivis.scene
+import optivis.geometry
+import optivis.layout
+import optivis.bench.components as components
+import optivis.bench.links as links
+
+try:
+  import optivis.view.canvas as canvas
+except ImportError:
+  # the GUI is optional
+  canvas = None
+
+@skipIf(canvas is None, 'PyQt4 is not installed')
+class TestParamEditContainer(TestCase):
+  def setUp(self):
+    try:
+      self.application = canvas.getApplication()
+    except Exception as e:
+      # no display to create the application on
+      self.skipTest(str(e))
+    
+    self.laser = components.Laser()
+    self.mirror = components.CavityMirror(aoi=30)
+    self.link = links.Link(self.laser.getOutputNode('out'), self.mirror.getInputNode('fr'), 1000)
+    
+    self.container = canvas.OptivisParamEditContainer(canvas.OptivisCanvasItemDataType.SPINBOX)
+    
+    self.emitted = []
+    self.container.editWidget.valueChanged.connect(self.emitted.append)
+  
+  def bindLength(self):
+    self.container.bind('length', 'Length', weakref.ref(self.link), self.link.length, acceptRange=[0, float('inf')], increment=1)
+  
+  def bindAoi(self):
+    self.container.bind('aoi', 'aoi', weakref.ref(self.mirror), self.mirror.aoi, acceptRange=[-360, 360], increment=1)
+  
+  def test_rebind_length_to_aoi(self):
+    # the length is out of the aoi's range, so is clamped when the range is set
+    self.bindLength()
+    self.container.unbind()
+    self.bindAoi()
+    
+    self.assertEqual(self.emitted, [])
+    self.assertEqual(self.container.editWidget.value(), 30)
+  
+  def test_rebind_without_unbind(self):
+    self.bindLength()
+    self.bindAoi()
+    
+    self.assertEqual(self.emitted, [])
+    self.assertEqual(self.link.length, 1000)
+
+@skipIf(canvas is None, 'PyQt4 is not installed')
+class TestLayoutStateSaving(TestCase):
+  def setUp(self):
+    try:
+      canvas.getApplication()
+    except Exception as e:
+      # no display to create the application on
+      self.skipTest(str(e))
+    
+    self.directory = tempfile.mkdtemp()
+    
+    scene = optivis.scene.Scene(title="Saved layout")
+    scene.link(components.Laser(name="L1").getOutputNode('out'), components.CavityMirror(name="M1").getInputNode('fr'), 100)
+    
+    self.canvas = canvas.Headless(scene=scene)
+    self.canvas.layoutStatePath = os.path.join(self.directory, 'layout.json')
+  
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+  
+  def test_not_saved_before_layout(self):
+    self.canvas.saveLayoutState()
+    
+    self.assertFalse(os.path.exists(self.canvas.layoutStatePath))
+  
+  def test_saved_after_layout(self):
+    self.canvas.layout()
+    self.canvas.saveLayoutState()
+    
+    self.assertTrue(os.path.exists(self.canvas.layoutStatePath))
+
+
+@skipIf(canvas is None, 'PyQt4 is not installed')
+class TestLayoutWorker(TestCase):
+  def setUp(self):
+    try:
+      canvas.getApplication()
+    except Exception as e:
+      # no display to create the application on
+      self.skipTest(str(e))
+    
+    self.scene = optivis.scene.Scene()
+    self.scene.link(components.Laser(name="L1").getOutputNode('out'), components.CavityMirror(name="M1").getInputNode('fr'), 5000)
+  
+  def test_fit(self):
+    positions = [component.position for component in self.scene.getComponents()]
+    
+    worker = canvas.LayoutWorker(self.scene.fork(), optivis.layout.StandardLayout, fitSize=optivis.geometry.Coordinates(800, 600))
+    
+    (scaleFuncs, geometries) = ([], [])
+    worker.scaleFitted.connect(scaleFuncs.append)
+    worker.layoutFinished.connect(geometries.append)
+    
+    # run on this thread
+    worker.run()
+    
+    self.assertEqual(len(scaleFuncs), 1)
+    self.assertIs(worker.scaleFunc, scaleFuncs[0])
+    self.assertEqual(len(geometries), 1)
+    
+    # the fit and layout happen in the worker's copy
+    self.assertEqual([component.position for component in self.scene.getComponents()], positions)
@@ -1,4 +1,18 @@
+import os
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+class BuildPyWithAssetBundle(build_py):
+    """Also pack the component assets into a bundle, so they load from one file."""
+
+    def run(self):
+        build_py.run(self)
+
+        from optivis.bundle import writeBundle, BUNDLE_FILENAME
+
+        if not self.dry_run:
+            writeBundle(os.path.join(self.build_lib, 'optivis', BUNDLE_FILENAME))
 
 VERSION = '0.3.0'
 BASE_CVS_URL = 'https://github.com/carmelom/optivis'
@@ -14,6 +28,7 @@ setup(
     download_url='{}/tarball/{}'.format(BASE_CVS_URL, VERSION),
     test_suite='tests',
     tests_require=[x.strip() for x in open('requirements_test.txt').readlines()],
+    cmdclass={'build_py': BuildPyWithAssetBundle},
     keywords=[],
     classifiers=[
         "Development Status :: 1 - Planning",